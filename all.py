@@ -4,9 +4,43 @@ from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import
 from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarRing
 from sage.bijectivematrixalgebra.reduction_maps import ReductionMaps
 from sage.bijectivematrixalgebra.reduction_maps_dicts import ReductionMapsDict
+from sage.bijectivematrixalgebra.implicit_maps import IdentityMap
+from sage.bijectivematrixalgebra.implicit_maps import RelabelingMap
+from sage.bijectivematrixalgebra.map_methods import fixed_points
+from sage.bijectivematrixalgebra.pipeline import Stage
+from sage.bijectivematrixalgebra.pipeline import Pipeline
+from sage.bijectivematrixalgebra.instrumentation import Instrumentation
+from sage.bijectivematrixalgebra.checkpoint import Checkpoint
+from sage.bijectivematrixalgebra.serialization import save_reduction_archive
+from sage.bijectivematrixalgebra.serialization import open_reduction_archive
+from sage.bijectivematrixalgebra.serialization import ReductionArchive
+from sage.bijectivematrixalgebra.serialization import save_matrix_archive
+from sage.bijectivematrixalgebra.shared_archives import SharedArchive
+from sage.bijectivematrixalgebra.disk_cache import DiskCache
+from sage.bijectivematrixalgebra.involution_sampling import InvolutionSampler
+from sage.bijectivematrixalgebra.involution_sampling import random_involution_dict
+from sage.bijectivematrixalgebra.involution_sampling import InvolutionEnumerator
+from sage.bijectivematrixalgebra.reduction_diff import ReductionDiff
+from sage.bijectivematrixalgebra.reduction_diff import diff_reductions
+from sage.bijectivematrixalgebra.orbits import OrbitDecomposition
+from sage.bijectivematrixalgebra.orbits import orbit_decomposition
+from sage.bijectivematrixalgebra.exporters import export_involutions
+from sage.bijectivematrixalgebra.exporters import export_matrix
+from sage.bijectivematrixalgebra.progress import CancellationToken
+from sage.bijectivematrixalgebra.progress import OperationCancelled
 from sage.bijectivematrixalgebra.matrix_methods import *
-from sage.bijectivematrixalgebra.reduction_methods import *
-from sage.bijectivematrixalgebra.stirling import *
-from sage.bijectivematrixalgebra.testScript import *
-from sage.bijectivematrixalgebra.loehr_mendes import *
-from sage.bijectivematrixalgebra.involution_gui_methods import *
+from sage.misc.lazy_import import lazy_import
+lazy_import('sage.bijectivematrixalgebra.reduction_methods',
+            ['reduction_matrix_clean_up', 'reduction_identity_matrix', 'reduction_identity_entry',
+             'reduction_lemma_40', 'reduction_matrix_AIB_AB', 'reduction_matrix_IAB_AB',
+             'reduction_matrix_ABCD_to_ApBCpD', 'reduction_matrix_ABCD_to_pABpCD',
+             'reduction_lemma_28_23', 'reduction_lemma_28_23_entry', 'reduction_lemma_28_68'])
+lazy_import('sage.bijectivematrixalgebra.stirling',
+            ['Stirling1Matrix', 'Stirling2Matrix', 'Stirling12Matrix', 'Stirling21Matrix',
+             'get_matrix_cache', 'set_matrix_cache', 'find_row', 'find_col'])
+lazy_import('sage.bijectivematrixalgebra.loehr_mendes',
+            ['LoehrMendes', 'LoehrMendesMemo', 'LoehrMendesIteration', 'loehr_mendes_pipeline'])
+lazy_import('sage.bijectivematrixalgebra.involution_gui_methods',
+            ['tab_list', 'total_maps', 'reduction_identity', 'EditableInvolutionDict'])
+lazy_import('sage.bijectivematrixalgebra.experiments',
+            ['run_batch', 'run_enumeration', 'enumeration_cursor'])
@@ -0,0 +1,376 @@
+r"""
+Backend
+
+The Sage types used by the core of the package, namely combinatorial
+objects and scalars, maps, reductions and confluence, with plain Python
+replacements for processes which should not load Sage.
+
+The core only needs a base class for objects, weight monomials in x1, x2,
+... with signed sums and products, finite maps given by dictionaries and
+the parent of the scalars.  When Sage is available these are the Sage
+types; otherwise, or when the environment variable
+BIJECTIVEMATRIXALGEBRA_BACKEND is set to 'python', they are the classes
+below, and the package starts with nothing but the standard library.  The
+Stirling matrices, the set partitions, the matrices of scalars and the
+symbolic generating functions remain on the Sage side.
+
+The backends should not be mixed in one computation: a weight of one
+cannot be compared with a weight of the other.  Generating functions with
+several terms may print in a different order under the two backends, and
+so may the fingerprints of the matrices holding them.
+
+EXAMPLES::
+
+    sage: from sage.bijectivematrixalgebra.backend import WeightPolynomial, var
+    sage: x1, x2 = var('x1,x2')
+    sage: x1*x2**2 - x1*x2**2 == 0
+    True
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+import os
+import re
+
+BACKEND = os.environ.get('BIJECTIVEMATRIXALGEBRA_BACKEND', 'sage')
+if BACKEND not in ('sage', 'python'):
+    raise ValueError, "BIJECTIVEMATRIXALGEBRA_BACKEND must be 'sage' or 'python'"
+
+
+def _trim(exponents):
+    exponents = list(exponents)
+    while exponents and exponents[-1] == 0:
+        exponents.pop()
+    return tuple(exponents)
+
+class WeightPolynomial(object):
+    r"""
+    INPUT:
+     - terms (optional) a dictionary of the coefficients of the monomials,
+       each keyed by its tuple of exponents in x1, x2, ...
+
+    A polynomial with integer coefficients in x1, x2, ..., standing in for
+    the symbolic weights and generating functions of the Sage backend.
+    """
+    def __init__(self, terms=None):
+        self._terms = dict()
+        if terms is not None:
+            for exponents, c in terms.items():
+                exponents = _trim(exponents)
+                c = self._terms.get(exponents, 0) + c
+                if c:
+                    self._terms[exponents] = c
+                else:
+                    self._terms.pop(exponents, None)
+
+    @staticmethod
+    def _coerce(other):
+        if isinstance(other, WeightPolynomial):
+            return other
+        elif isinstance(other, (int, long)):
+            return WeightPolynomial({(): other})
+        return None
+
+    def __add__(self, other):
+        other = WeightPolynomial._coerce(other)
+        if other is None:
+            return NotImplemented
+        terms = dict(self._terms)
+        for exponents, c in other._terms.items():
+            terms[exponents] = terms.get(exponents, 0) + c
+        return WeightPolynomial(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return WeightPolynomial(dict((e, -c) for e, c in self._terms.items()))
+
+    def __sub__(self, other):
+        other = WeightPolynomial._coerce(other)
+        if other is None:
+            return NotImplemented
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        other = WeightPolynomial._coerce(other)
+        if other is None:
+            return NotImplemented
+        terms = dict()
+        for e1, c1 in self._terms.items():
+            for e2, c2 in other._terms.items():
+                n = max(len(e1), len(e2))
+                e = tuple([a + b for a, b in zip(e1 + (0,)*(n - len(e1)), e2 + (0,)*(n - len(e2)))])
+                terms[e] = terms.get(e, 0) + c1*c2
+        return WeightPolynomial(terms)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, n):
+        if not(isinstance(n, (int, long))) or n < 0:
+            raise ValueError, "The exponent must be a nonnegative integer"
+        result = WeightPolynomial({(): 1})
+        for i in range(n):
+            result = result * self
+        return result
+
+    def __eq__(self, other):
+        other = WeightPolynomial._coerce(other)
+        if other is None:
+            return False
+        return self._terms == other._terms
+
+    def __ne__(self, other):
+        return not(self == other)
+
+    def __hash__(self):
+        #constants hash as the integers they are equal to
+        if not(self._terms):
+            return hash(0)
+        elif self._terms.keys() == [()]:
+            return hash(self._terms[()])
+        return hash(frozenset(self._terms.items()))
+
+    def __nonzero__(self):
+        return bool(self._terms)
+
+    def __reduce__(self):
+        return (WeightPolynomial, (self._terms,))
+
+    def __repr__(self):
+        if not(self._terms):
+            return "0"
+        L = list()
+        for exponents in sorted(self._terms, key=lambda e: (-sum(e), [-a for a in e])):
+            c = self._terms[exponents]
+            monomial = '*'.join([('x' + str(i+1)) + ('^' + str(a) if a > 1 else '')
+                                 for i, a in enumerate(exponents) if a > 0])
+            if not(monomial):
+                term = str(abs(c))
+            elif abs(c) == 1:
+                term = monomial
+            else:
+                term = str(abs(c)) + '*' + monomial
+            if not(L):
+                L.append(term if c > 0 else '-' + term)
+            else:
+                L.append((' + ' if c > 0 else ' - ') + term)
+        return ''.join(L)
+
+    def terms(self):
+        r"""
+        Returns the dictionary of the coefficients keyed by exponent tuples.
+        """
+        return dict(self._terms)
+
+    def exponents(self):
+        r"""
+        Returns a dictionary of the exponents of a monomial, keyed by the
+        index of the variable.
+        """
+        if len(self._terms) != 1:
+            raise ValueError, "Only a monomial has exponents; found " + str(self)
+        exponents = self._terms.keys()[0]
+        return dict((i+1, a) for i, a in enumerate(exponents) if a > 0)
+
+def plain_var(names):
+    r"""
+    Returns the variables x<i> named in the comma separated string names,
+    as WeightPolynomials; a single variable for a single name.
+    """
+    L = list()
+    for name in names.split(','):
+        m = re.match(r"x(\d+)$", name.strip())
+        if m is None or int(m.group(1)) < 1:
+            raise ValueError, "Variables must be named x1, x2, ...; found " + name
+        i = int(m.group(1))
+        L.append(WeightPolynomial({(0,)*(i-1) + (1,): 1}))
+    if len(L) == 1:
+        return L[0]
+    return tuple(L)
+
+def weight_exponents(weight):
+    r"""
+    Returns a dictionary of the exponents of the weight monomial, keyed by
+    the index of the variable, under either backend.
+    """
+    if isinstance(weight, WeightPolynomial):
+        return weight.exponents()
+    exps = dict()
+    if not(hasattr(weight,'variables')):
+        return exps
+    for v in weight.variables():
+        m = re.match(r"x(\d+)$",str(v))
+        if m is None:
+            raise ValueError, "Weights must be monomials in x1, x2, ...; found " + str(v)
+        exps[int(m.group(1))] = int(weight.degree(v))
+    return exps
+
+
+class PlainObject(object):
+    r"""
+    The base class of the objects of the package, as is SageObject.
+    """
+    pass
+
+class PlainSet(frozenset):
+    def cardinality(self):
+        return len(self)
+
+class PlainFiniteSetMaps(object):
+    r"""
+    INPUT:
+     - domain an iterable
+     - codomain (optional) an iterable; by default the domain
+
+    The maps from domain to codomain, of which ``from_dict`` builds the
+    elements, as does FiniteSetMaps.
+    """
+    def __init__(self, domain, codomain=None):
+        self._domain = domain
+        if codomain is None:
+            codomain = domain
+        self._codomain = codomain
+
+    def __repr__(self):
+        return "Maps from " + str(self._domain) + " to " + str(self._codomain)
+
+    def domain(self):
+        return self._domain
+
+    def codomain(self):
+        return self._codomain
+
+    def from_dict(self, d):
+        return PlainFiniteSetMap(self, d)
+
+class PlainFiniteSetMap(object):
+    r"""
+    A map of PlainFiniteSetMaps, stored as a dictionary.
+    """
+    def __init__(self, parent, d):
+        self._parent = parent
+        self._images = dict(d)
+
+    def __call__(self, elm):
+        return self._images[elm]
+
+    def __iter__(self):
+        for elm in self._parent.domain():
+            yield self._images[elm]
+
+    def __eq__(self, other):
+        return isinstance(other, PlainFiniteSetMap) and self._images == other._images
+
+    def __ne__(self, other):
+        return not(self == other)
+
+    def __hash__(self):
+        return hash(frozenset(self._images.items()))
+
+    def __repr__(self):
+        return "map: " + ", ".join([str(x) + " -> " + str(self._images[x]) for x in self._parent.domain() if x in self._images])
+
+    def parent(self):
+        return self._parent
+
+    def domain(self):
+        return self._parent.domain()
+
+    def codomain(self):
+        return self._parent.codomain()
+
+    def image_set(self):
+        return PlainSet(self._images.values())
+
+    def fibers(self):
+        d = dict()
+        for elm, image in self._images.items():
+            d.setdefault(image, set()).add(elm)
+        return d
+
+class PlainParent(object):
+    r"""
+    A parent whose elements are built by ``_element_constructor_``.
+    """
+    def __init__(self, category=None):
+        self._category = category
+
+    def __call__(self, x):
+        return self._element_constructor_(x)
+
+    def zero(self):
+        return self._zero()
+
+    def one(self):
+        return self._one()
+
+class PlainRingElement(object):
+    def __init__(self, parent):
+        self._parent = parent
+
+    def parent(self):
+        return self._parent
+
+class PlainUniqueRepresentation(object):
+    r"""
+    Classes deriving from this one have one instance per tuple of arguments.
+    """
+    _instances = dict()
+    def __new__(cls, *args):
+        key = (cls,) + args
+        if key not in PlainUniqueRepresentation._instances:
+            PlainUniqueRepresentation._instances[key] = object.__new__(cls)
+        return PlainUniqueRepresentation._instances[key]
+
+def plain_rings():
+    return None
+
+
+if BACKEND == 'sage':
+    try:
+        from sage.structure.sage_object import SageObject
+        from sage.structure.element import RingElement
+        from sage.structure.parent import Parent
+        from sage.structure.unique_representation import UniqueRepresentation
+        from sage.rings.ring import Ring
+        from sage.categories.rings import Rings
+        from sage.symbolic.expression import Expression
+        from sage.calculus.var import var
+        from sage.sets.set import Set
+        from sage.sets.finite_set_maps import FiniteSetMaps
+        from sage.sets.finite_set_maps import FiniteSetMap_Set
+        from sage.sets.finite_set_map_cy import FiniteSetEndoMap_Set
+    except ImportError:
+        BACKEND = 'python'
+if BACKEND == 'python':
+    SageObject = PlainObject
+    RingElement = PlainRingElement
+    Parent = PlainParent
+    UniqueRepresentation = PlainUniqueRepresentation
+    Ring = PlainParent
+    Rings = plain_rings
+    Expression = WeightPolynomial
+    var = plain_var
+    Set = PlainSet
+    FiniteSetMaps = PlainFiniteSetMaps
+    FiniteSetMap_Set = PlainFiniteSetMap
+    FiniteSetEndoMap_Set = PlainFiniteSetMap
@@ -0,0 +1,136 @@
+r"""
+Checkpoint
+
+Persists the output of each completed stage of a ``Pipeline`` so that an
+interrupted construction resumes where it stopped.
+
+A checkpoint is a directory holding one file per completed stage, named
+after the outputs of the stage.  Each file is a compressed pickle, written
+to a temporary file and renamed into place, so that a crash while saving
+never leaves a truncated stage behind.  Checkpoints of the Loehr-Mendes
+construction live in a subdirectory named after the fingerprint of its
+inputs and LOEHR_MENDES_CODE_VERSION, so a restart with the same A, B and
+red_AB_to_I finds them, and neither a run with different inputs nor a
+later version of the construction does.
+
+EXAMPLES::
+
+    sage: m1 = Stirling1Matrix(3); m2 = Stirling2Matrix(3)
+    sage: P = Pipeline([Stage('AB', matrix_multiply, ('A','B'))])
+    sage: C = Checkpoint(tmp_dir())
+    sage: out = P.run({'A':m2,'B':m1}, checkpoint=C)
+    sage: C.completed_stages()
+    [['AB']]
+    sage: P.run({'A':m2,'B':m1}, checkpoint=C)['AB'][2,1].get_size()
+    2
+
+After a crash, the same construction loads the completed stages::
+
+    sage: red = reduction_identity_matrix(out['AB'])
+    sage: d = tmp_dir()
+    sage: L = LoehrMendes(m2,m1,red,checkpoint_dir=d)
+    sage: LoehrMendes(m2,m1,red,checkpoint_dir=d).get_confluence_reduction() == L.get_confluence_reduction()
+    True
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+import cPickle
+import os
+import tempfile
+import zlib
+
+
+def _stage_file(stage):
+    return "+".join(stage.get_outputs()) + ".pickle.z"
+
+def write_atomically(path, data):
+    r"""
+    Writes the string data to path, replacing any previous file only
+    once data has been written in full.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        out = os.fdopen(fd, 'wb')
+        try:
+            out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+        finally:
+            out.close()
+        os.rename(tmp, path)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Checkpoint(SageObject):
+    r"""
+    INPUT:
+     - path a directory, created if missing
+     - key (optional) the name of a subdirectory of path, such as the
+       fingerprint of the inputs of the construction
+    """
+    def __init__(self, path, key=None):
+        if key is not None:
+            path = os.path.join(path, key)
+        if not(os.path.isdir(path)):
+            os.makedirs(path)
+        self._path = path
+
+    def __repr__(self):
+        return "Checkpoint in " + self._path
+
+    def get_path(self):
+        return self._path
+
+    def has_stage(self, stage):
+        return os.path.exists(os.path.join(self._path, _stage_file(stage)))
+
+    def load_stage(self, stage):
+        r"""
+        Returns the saved result of stage.
+        """
+        inp = open(os.path.join(self._path, _stage_file(stage)), 'rb')
+        try:
+            return cPickle.loads(zlib.decompress(inp.read()))
+        finally:
+            inp.close()
+
+    def save_stage(self, stage, result):
+        data = zlib.compress(cPickle.dumps(result, cPickle.HIGHEST_PROTOCOL))
+        write_atomically(os.path.join(self._path, _stage_file(stage)), data)
+
+    def completed_stages(self):
+        r"""
+        Returns the list of the names of the outputs of the saved stages.
+        """
+        return sorted([name[:-len(".pickle.z")].split("+") for name in os.listdir(self._path)
+                       if name.endswith(".pickle.z")])
+
+    def clear(self):
+        r"""
+        Removes every saved stage.
+        """
+        for name in os.listdir(self._path):
+            if name.endswith(".pickle.z"):
+                os.remove(os.path.join(self._path, name))
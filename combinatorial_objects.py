@@ -28,8 +28,11 @@ AUTHORS:
 #from sage.rings import *
 #from sage.structure.unique_representation import UniqueRepresentation
 #from sage.structure.all import SageObject
-from sage.symbolic.expression import Expression
-from sage.all import *
+from sage.bijectivematrixalgebra.backend import SageObject
+from sage.bijectivematrixalgebra.backend import Expression
+from sage.bijectivematrixalgebra.backend import var
+from sage.bijectivematrixalgebra.backend import weight_exponents
+from copy import deepcopy
 
 class CombinatorialObject(SageObject):
     r"""
@@ -77,6 +80,7 @@ class CombinatorialObject(SageObject):
             self._weight_monomial = assign_weight_monomial(weight)
         self._row = row
         self._col = col
+        self._sort_key = None
 
     def __repr__(self):
         return str(self._object)
@@ -94,6 +98,26 @@ class CombinatorialObject(SageObject):
 
     def __hash__(self):
         return hash(self.get_tuple())
+
+    def __reduce__(self):
+        r"""
+        Pickles the weight as its list of exponents, which is much smaller
+        than a symbolic expression and does not depend on the backend.
+
+        EXAMPLES::
+
+            sage: C = CombinatorialObject("Rock",1,[0,1,1,2])
+            sage: D = loads(dumps(C))
+            sage: D == C, D.get_weight()
+            (True, x2*x3*x4^2)
+        """
+        exps = weight_exponents(self._weight_monomial)
+        monomial = [exps.get(i,0) for i in range(1,max(exps.keys() + [1])+1)]
+        return (CombinatorialObject,(self._object,self._sign,monomial,self._row,self._col))
+
+    def __deepcopy__(self,memo):
+        #weights are immutable, so only the object needs copying
+        return CombinatorialObject(deepcopy(self._object,memo),self._sign,self._weight_monomial,self._row,self._col)
         
     def get_detail(self):
         return "Combinatorial Object %s, sign %d, and weight %s." %(self._object, self._sign, str(self._weight_monomial))
@@ -109,8 +133,20 @@ class CombinatorialObject(SageObject):
     
     def set_object(self,obj):
         self._object = obj
+        self._sort_key = None
         return self
 
+    def get_sort_key(self):
+        r"""
+        Returns the key of this object in the canonical order of the
+        elements of a scalar: its encoding by object, sign and weight (see
+        ``element_encoding``), which is the same in every session.
+        """
+        if getattr(self,'_sort_key',None) is None:
+            from sage.bijectivematrixalgebra.fingerprints import element_encoding
+            self._sort_key = element_encoding(self)
+        return self._sort_key
+
     def set_row(self,row):
         self._row = row
         return self
@@ -27,11 +27,13 @@ AUTHORS:
 #from sage.structure.unique_representation import UniqueRepresentation
 #from sage.structure.all import SageObject
 #from sage.sets.all import *
-from sage.all import *
-from copy import deepcopy
+from sage.bijectivematrixalgebra.backend import RingElement
+from sage.bijectivematrixalgebra.backend import Parent
+from sage.bijectivematrixalgebra.backend import Ring
+from sage.bijectivematrixalgebra.backend import Rings
 from sage.bijectivematrixalgebra.combinatorial_objects import CombinatorialObject
 from sage.bijectivematrixalgebra.combinatorial_scalars import CombinatorialScalar
-from sage.structure.unique_representation import UniqueRepresentation
+from sage.bijectivematrixalgebra.backend import UniqueRepresentation
 
 
 class CombinatorialScalarWrapper(RingElement):
@@ -44,6 +46,10 @@ class CombinatorialScalarWrapper(RingElement):
     def __iter__(self):
         for this_entry in self.values:
             yield this_entry
+    def __contains__(self,elm):
+        return elm in self.values
+    def __len__(self):
+        return len(self.values)
     def get_set(self):
         return set(self.values)
     def get_scalar(self):
@@ -64,6 +70,9 @@ class CombinatorialScalarWrapper(CombinatorialScalarWrapper):
             return 1
     def __add__(self,other):
         return CombinatorialScalarWrapper(self.get_set().union(other.get_set()))
+    def __reduce__(self):
+        #the iterator attribute is a generator, which cannot be pickled
+        return (CombinatorialScalarWrapper,(list(self.values),))
     def __mul__(self,other):
         new_set = set()
         for s in self:
@@ -31,7 +31,7 @@ AUTHORS:
 #from sage.structure.unique_representation import UniqueRepresentation
 #from sage.structure.all import SageObject
 #from sage.sets.all import *
-from sage.all import *
+from sage.bijectivematrixalgebra.backend import FiniteSetMaps
 
 class CombinatorialScalar(set):
     r"""
@@ -89,6 +89,7 @@ class CombinatorialScalar(set):
         self._weight_dict = dict()
         self._generating_function = 0
         self._size = 0
+        self._sorted = None
         for i in l:
         	self._sign_dict[i] = i.get_sign()
         	self._weight_dict[i] = i.get_weight()
@@ -99,6 +100,78 @@ class CombinatorialScalar(set):
     def __repr__(self):
         return "Combinatorial Scalar of cardinality " + str(self._size) + "."
 
+    def __iter__(self):
+        r"""
+        Iterates over the elements in their canonical order (see
+        ``CombinatorialObject.get_sort_key``), sorting them on first use,
+        so that everything built by iterating over a scalar is the same
+        from one session to the next.
+        """
+        if self._sorted is None:
+            self._sorted = sorted(set.__iter__(self), key=lambda elm: elm.get_sort_key())
+        return iter(self._sorted)
+
+    def __reduce__(self):
+        return (CombinatorialScalar,(list(self),))
+
+    def add(self, elm):
+        self._sorted = None
+        set.add(self, elm)
+
+    def pop(self):
+        r"""
+        Removes and returns the first element in the canonical order.
+        """
+        elm = iter(self).next()
+        self.remove(elm)
+        return elm
+
+    def remove(self, elm):
+        self._sorted = None
+        set.remove(self, elm)
+
+    def discard(self, elm):
+        self._sorted = None
+        set.discard(self, elm)
+
+    #every other mutator also forgets the canonical order
+
+    def clear(self):
+        self._sorted = None
+        set.clear(self)
+
+    def update(self, *others):
+        self._sorted = None
+        set.update(self, *others)
+
+    def intersection_update(self, *others):
+        self._sorted = None
+        set.intersection_update(self, *others)
+
+    def difference_update(self, *others):
+        self._sorted = None
+        set.difference_update(self, *others)
+
+    def symmetric_difference_update(self, other):
+        self._sorted = None
+        set.symmetric_difference_update(self, other)
+
+    def __ior__(self, other):
+        self._sorted = None
+        return set.__ior__(self, other)
+
+    def __iand__(self, other):
+        self._sorted = None
+        return set.__iand__(self, other)
+
+    def __isub__(self, other):
+        self._sorted = None
+        return set.__isub__(self, other)
+
+    def __ixor__(self, other):
+        self._sorted = None
+        return set.__ixor__(self, other)
+
     def get_generating_function(self):
         r"""
         Returns the generating function of the combinatorial scalar.
@@ -124,6 +197,13 @@ class CombinatorialScalar(set):
         Returns the cardinality of the combinatorial scalar.
         """
         return self._size
+
+    def cardinality(self):
+        r"""
+        Returns the cardinality of the combinatorial scalar.
+        Provided so that scalars can be used as domains of maps.
+        """
+        return self._size
 		
     def is_fully_cancelled(self):
         r"""
@@ -148,19 +228,19 @@ class CombinatorialScalar(set):
     	WARNING: Should only be used in cases where there 
         are an equal number of positive and negative elements.
     	"""
-        pos = set()
-        neg = set()
+        pos = list()
+        neg = list()
         d = dict()
         for elm in self:
             if elm.get_sign() == 1:
-                pos.add(elm)
+                pos.append(elm)
             else:
-                neg.add(elm)
+                neg.append(elm)
         M = FiniteSetMaps(self,self)
-        for elm in pos:
-            a = neg.pop()
-            d[elm] = a
-            d[a] = elm
+        #match in canonical order, so that the involution is the same every time
+        for k in range(len(pos)):
+            d[pos[k]] = neg[k]
+            d[neg[k]] = pos[k]
         return M.from_dict(d)
 	
     def print_list(self):
@@ -0,0 +1,151 @@
+r"""
+Disk Cache
+
+A persistent, content-addressed cache of computed objects.
+
+Each value is stored as a compressed pickle in a file named after the
+digest of its key, a tuple of strings and numbers such as
+('Stirling1Matrix', 6, 1).  Keys should include the version of the code
+computing the value, so that a change to that code never returns a stale
+value.  A hit marks its file as recently used, and whenever a value is
+stored the least recently used files are removed until the cache fits in
+its size bound.
+
+EXAMPLES::
+
+    sage: from sage.bijectivematrixalgebra.stirling import STIRLING_CODE_VERSION
+    sage: cache = DiskCache(tmp_dir(), max_bytes=10**8)
+    sage: m1 = Stirling1Matrix(4, cache=cache)
+    sage: ('Stirling1Matrix', 4, STIRLING_CODE_VERSION) in cache
+    True
+    sage: Stirling1Matrix(4, cache=cache)[3,2].get_size()
+    3
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+from sage.bijectivematrixalgebra.checkpoint import write_atomically
+import cPickle
+import hashlib
+import os
+import zlib
+
+_SUFFIX = ".pickle.z"
+
+
+class DiskCache(SageObject):
+    r"""
+    INPUT:
+     - path a directory, created if missing
+     - max_bytes (optional) the bound on the total size of the stored files
+    """
+    def __init__(self, path, max_bytes=2**30):
+        if not(os.path.isdir(path)):
+            os.makedirs(path)
+        self._path = path
+        self._max_bytes = max_bytes
+
+    def __repr__(self):
+        return "Disk cache in " + self._path
+
+    def get_path(self):
+        return self._path
+
+    def _file(self, key):
+        return os.path.join(self._path, hashlib.sha1(repr(key)).hexdigest() + _SUFFIX)
+
+    def __contains__(self, key):
+        return os.path.exists(self._file(key))
+
+    def get(self, key):
+        r"""
+        Returns the value stored under key, raising KeyError if there is none.
+        """
+        path = self._file(key)
+        try:
+            inp = open(path, 'rb')
+        except IOError:
+            raise KeyError(key)
+        try:
+            value = cPickle.loads(zlib.decompress(inp.read()))
+        finally:
+            inp.close()
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        data = zlib.compress(cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL))
+        write_atomically(self._file(key), data)
+        self._evict()
+
+    def get_or_compute(self, key, function, *args):
+        r"""
+        Returns the value stored under key, or computes it as function(*args)
+        and stores it.
+        """
+        try:
+            return self.get(key)
+        except KeyError:
+            value = function(*args)
+            self.set(key, value)
+            return value
+
+    def _entries(self):
+        r"""
+        Returns the list of triples (last use, size, path) of the stored files.
+        """
+        L = list()
+        for name in os.listdir(self._path):
+            if name.endswith(_SUFFIX):
+                path = os.path.join(self._path, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                L.append((st.st_mtime, st.st_size, path))
+        return L
+
+    def size(self):
+        return sum([e[1] for e in self._entries()])
+
+    def _evict(self):
+        r"""
+        Removes the least recently used files until the cache fits in max_bytes.
+        """
+        entries = sorted(self._entries())
+        total = sum([e[1] for e in entries])
+        for used, size, path in entries:
+            if total <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for used, size, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,317 @@
+r"""
+Experiments
+
+Runs the Loehr-Mendes construction for many choices of the involutions
+showing that AB reduces to I, writing one JSON record per run.
+
+The choices come from a generator of involution dictionaries, as accepted
+by ``reduction_identity_matrix(mat, involution_dict=...)``.  On a process
+pool, at most ``window`` runs are in flight at any time and each record is
+written as soon as its run finishes, so memory stays bounded however many
+choices the generator yields.  Records may be written out of order; each
+carries the index of its choice.
+
+Given a timeout, each run is stopped by a ``CancellationToken`` once it has
+taken that many seconds, and recorded as a failure with 'timed_out' set.
+
+``run_enumeration`` instead runs every choice of ``InvolutionEnumerator``,
+or a range of them.  Each worker process builds its own enumerator and
+unranks the choices of the chunks it is given, so no involution crosses
+process boundaries, and a run resumes from ``enumeration_cursor``.
+
+EXAMPLES::
+
+    sage: m1 = Stirling1Matrix(4); m2 = Stirling2Matrix(4)
+    sage: dicts = InvolutionSampler(matrix_multiply(m2,m1)).samples(4,seed=0)
+    sage: path = tmp_filename(ext='.jsonl')
+    sage: run_batch(m2,m1,dicts,path,processes=2)
+    {'failures': 0, 'runs': 4}
+    sage: import json
+    sage: sorted([json.loads(line)['index'] for line in open(path)])
+    [0, 1, 2, 3]
+
+A run over its time budget is stopped and recorded as a failure::
+
+    sage: path = tmp_filename(ext='.jsonl')
+    sage: dicts = InvolutionSampler(matrix_multiply(m2,m1)).samples(1,seed=0)
+    sage: run_batch(m2,m1,dicts,path,timeout=0)
+    {'failures': 1, 'runs': 1}
+    sage: json.loads(open(path).readline())['timed_out']
+    True
+
+The 36 choices for these matrices are enumerated by rank, and a run
+stopped early resumes from the cursor::
+
+    sage: path = tmp_filename(ext='.jsonl')
+    sage: run_enumeration(m2,m1,path,stop=3)
+    {'failures': 0, 'runs': 3}
+    sage: enumeration_cursor(path)
+    3
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.bijectivematrixalgebra.matrix_methods import matrix_multiply
+from sage.bijectivematrixalgebra.reduction_methods import reduction_identity_matrix
+from sage.bijectivematrixalgebra.loehr_mendes import LoehrMendes
+from sage.bijectivematrixalgebra.loehr_mendes import LoehrMendesIteration
+from sage.bijectivematrixalgebra.instrumentation import Instrumentation
+from sage.bijectivematrixalgebra.fingerprints import loehr_mendes_fingerprint
+from sage.bijectivematrixalgebra.involution_sampling import InvolutionEnumerator
+from sage.bijectivematrixalgebra.progress import CancellationToken
+from sage.bijectivematrixalgebra.progress import OperationCancelled
+from multiprocessing import Pool
+import json
+import time
+import traceback
+
+#the matrices of a batch, and its enumerator, set once in each worker process
+_batch_matrices = None
+_batch_enumerator = None
+
+
+def _init_worker(A, B, AB):
+    global _batch_matrices
+    _batch_matrices = (A, B, AB)
+
+def _init_enumeration_worker(A, B, AB, relabelings):
+    global _batch_enumerator
+    _init_worker(A, B, AB)
+    _batch_enumerator = InvolutionEnumerator(AB, relabelings)
+
+def experiment_record(A, B, AB, involution_dict, check_involution=True, cancel=None):
+    r"""
+    Runs the construction for one involution dictionary and returns its
+    record: the fingerprints of the input and of the confluence reduction,
+    whether applying the construction twice returns the input (when
+    check_involution is True), and the wall and CPU time of each stage.
+
+    The constructions are stopped by the CancellationToken cancel.
+    """
+    wall = time.time()
+    red = reduction_identity_matrix(AB, involution_dict=involution_dict)
+    instrumentation = Instrumentation()
+    record = {'input_fingerprint': loehr_mendes_fingerprint(A, B, red)}
+    if check_involution:
+        it = LoehrMendesIteration(A, B, red, max_iterations=2, instrumentation=instrumentation, cancel=cancel)
+        #when A = B the output may repeat the input, ending the iteration at once
+        record['confluence_fingerprint'] = it.get_reductions()[-1 if it.get_cycle_length() == 1 else 1].get_fingerprint()
+        record['is_involution'] = it.is_involution()
+    else:
+        record['confluence_fingerprint'] = LoehrMendes(A, B, red, instrumentation=instrumentation,
+                                                       cancel=cancel).get_confluence_reduction().get_fingerprint()
+    record['stages'] = [dict((k, r[k]) for k in ('stage', 'wall_time', 'cpu_time', 'peak_memory', 'process_peak_rss'))
+                        for r in instrumentation.get_report()]
+    record['wall_time'] = time.time() - wall
+    return record
+
+def _run_experiment(index, involution_dict, check_involution, timeout=None):
+    r"""
+    Runs one choice in a worker process, returning failures rather than
+    raising them.  A run taking more than timeout seconds is stopped.
+    """
+    A, B, AB = _batch_matrices
+    if timeout is None:
+        cancel = None
+    else:
+        cancel = CancellationToken(timeout)
+    try:
+        record = experiment_record(A, B, AB, involution_dict, check_involution, cancel)
+    except OperationCancelled:
+        record = {'error': "The run took more than " + str(timeout) + " seconds", 'timed_out': True}
+    except Exception:
+        record = {'error': traceback.format_exc()}
+    record['index'] = index
+    return record
+
+def _run_chunk(start, stop, check_involution, timeout=None):
+    r"""
+    Runs the ranks from start to stop in a worker process.  A rank which
+    fails to unrank is recorded as a failure, as is a failed run.
+    """
+    records = list()
+    for rank in xrange(start, min(stop, _batch_enumerator.cardinality())):
+        try:
+            involution_dict = _batch_enumerator.unrank(rank)
+        except Exception:
+            records.append({'error': traceback.format_exc(), 'index': rank})
+            continue
+        records.append(_run_experiment(rank, involution_dict, check_involution, timeout))
+    return records
+
+def _handle_ready(pending, handle):
+    r"""
+    Waits for at least one of the AsyncResults pending to be ready, and
+    calls handle on the results of those which are, removing them.  An
+    error the worker could not report, such as a result which fails to
+    pickle, is raised here.
+    """
+    done = [result for result in pending if result.ready()]
+    if not(done):
+        pending[0].wait(0.1)
+        return
+    for result in done:
+        pending.remove(result)
+        handle(result.get())
+
+def _run_windowed(processes, initializer, initargs, tasks, window, handle):
+    r"""
+    Runs the tasks, pairs (function, args), on a pool with at most window
+    of them in flight, calling handle on each result as it arrives.
+    """
+    pending = list()
+    pool = Pool(processes, initializer, initargs)
+    try:
+        for function, args in tasks:
+            while len(pending) >= window:
+                _handle_ready(pending, handle)
+            pending.append(pool.apply_async(function, args))
+        while pending:
+            _handle_ready(pending, handle)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+class _RecordWriter(object):
+    r"""
+    Appends records to a file, one JSON object per line, and counts them.
+    """
+    def __init__(self, path):
+        self.counts = {'runs': 0, 'failures': 0}
+        self._out = open(path, 'a')
+
+    def write(self, record):
+        self.counts['runs'] += 1
+        if 'error' in record:
+            self.counts['failures'] += 1
+        self._out.write(json.dumps(record) + "\n")
+        self._out.flush()
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        self._out.close()
+
+def run_batch(A, B, involution_dicts, path, processes=None, window=None, check_involution=True, timeout=None):
+    r"""
+    INPUT:
+     - A a Combinatorial Matrix
+     - B a Combinatorial Matrix such that AB reduces to I
+     - involution_dicts an iterable of involution dictionaries on AB
+     - path the file to which the records are appended, one JSON object per line
+     - processes (optional) the number of worker processes; if missing or 1,
+       the runs are carried out one at a time in this process
+     - window (optional) the largest number of runs in flight, by default
+       twice the number of processes
+     - check_involution (optional) if True, also run the construction on
+       its own output to test whether it is an involution
+     - timeout (optional) the number of seconds after which a run is
+       stopped and recorded as a failure
+
+    Returns a dictionary counting the runs and the failures.
+    """
+    AB = matrix_multiply(A, B)
+    writer = _RecordWriter(path)
+    try:
+        if processes is None or processes <= 1:
+            _init_worker(A, B, AB)
+            for index, involution_dict in enumerate(involution_dicts):
+                writer.write(_run_experiment(index, involution_dict, check_involution, timeout))
+        else:
+            if window is None:
+                window = 2 * processes
+            tasks = ((_run_experiment, (index, involution_dict, check_involution, timeout))
+                     for index, involution_dict in enumerate(involution_dicts))
+            _run_windowed(processes, _init_worker, (A, B, AB), tasks, window, writer.write)
+    finally:
+        writer.close()
+    return writer.counts
+
+def run_enumeration(A, B, path, processes=None, start=0, stop=None, chunk=16, window=None,
+                    relabelings=None, check_involution=True, timeout=None):
+    r"""
+    INPUT:
+     - A a Combinatorial Matrix
+     - B a Combinatorial Matrix such that AB reduces to I
+     - path the file to which the records are appended, one JSON object per line
+     - processes (optional) the number of worker processes
+     - start, stop (optional) the range of ranks to run, by default all of them;
+       a shard of ``InvolutionEnumerator.shards``, or a cursor to resume from
+     - chunk (optional) the number of consecutive ranks given to a worker at once
+     - window (optional) the largest number of chunks in flight, by default
+       twice the number of processes
+     - relabelings (optional) the symmetries by which ``InvolutionEnumerator``
+       prunes the choices
+     - check_involution, timeout (optional) see ``run_batch``
+
+    Runs the construction for every involution dictionary of AB with rank
+    in the range, recording each as ``run_batch`` does with the rank as its
+    index.  Returns a dictionary counting the runs and the failures.
+    """
+    AB = matrix_multiply(A, B)
+    writer = _RecordWriter(path)
+    try:
+        if processes is None or processes <= 1:
+            _init_enumeration_worker(A, B, AB, relabelings)
+            if stop is None:
+                stop = _batch_enumerator.cardinality()
+            for first in xrange(start, stop, chunk):
+                writer.write_all(_run_chunk(first, min(first + chunk, stop), check_involution, timeout))
+        else:
+            if stop is None:
+                stop = InvolutionEnumerator(AB, relabelings).cardinality()
+            if window is None:
+                window = 2 * processes
+            tasks = ((_run_chunk, (first, min(first + chunk, stop), check_involution, timeout))
+                     for first in xrange(start, stop, chunk))
+            _run_windowed(processes, _init_enumeration_worker, (A, B, AB, relabelings), tasks, window, writer.write_all)
+    finally:
+        writer.close()
+    return writer.counts
+
+def enumeration_cursor(path, start=0):
+    r"""
+    Returns the least rank, at least start, without a record in path, from
+    which an interrupted ``run_enumeration`` resumes.  Ranks after it which
+    were already recorded are run again.
+    """
+    done = set()
+    try:
+        inp = open(path)
+    except IOError:
+        return start
+    try:
+        for line in inp:
+            line = line.strip()
+            if line:
+                try:
+                    done.add(json.loads(line)['index'])
+                except ValueError:
+                    #a line cut short by the interruption
+                    pass
+    finally:
+        inp.close()
+    while start in done:
+        start += 1
+    return start
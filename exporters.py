@@ -0,0 +1,204 @@
+r"""
+Exporters
+
+Writes the involutions of a reduction, or the elements of a matrix, as
+HTML, CSV or JSONL, one element at a time.
+
+The rows are generated lazily from the maps and written to the output as
+they are produced, so memory use does not depend on the size of the
+reduction.  The output is a file name, a file-like object or a socket.
+Rows may be restricted to some entries, and paginated with offset and
+limit, counted in rows after filtering.
+
+EXAMPLES:
+
+The reduction of Stirling21Matrix(4) to I has 18 elements: one in each
+diagonal entry, two in entry (2,1) and six in each of (3,1) and (3,2)::
+
+    sage: Ss = Stirling21Matrix(4)
+    sage: red = reduction_identity_matrix(Ss)
+    sage: export_involutions(red,tmp_filename(ext='.html'),format='html',offset=0,limit=10)
+    10
+    sage: export_involutions(red,tmp_filename(ext='.html'),format='html',offset=10,limit=10)
+    8
+    sage: export_involutions(red,tmp_filename(ext='.csv'),format='csv',entries=lambda i,j: i==j)
+    4
+    sage: import StringIO, json
+    sage: out = StringIO.StringIO()
+    sage: export_matrix(Ss,out,format='jsonl',entries=[(3,1)])
+    6
+    sage: sorted([json.loads(line)['sign'] for line in out.getvalue().splitlines()])
+    [-1, -1, -1, 1, 1, 1]
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from itertools import islice
+import cgi
+import csv
+import json
+
+INVOLUTION_COLUMNS = ('row', 'col', 'element', 'sign', 'weight', 'image', 'image_sign', 'fixed', 'spwp_image')
+MATRIX_COLUMNS = ('row', 'col', 'element', 'sign', 'weight')
+
+
+def _selected(keys, entries):
+    r"""
+    Returns the keys, in order, selected by entries: None for all of them,
+    a list of keys, or a function of the row and column.
+    """
+    keys = sorted(keys)
+    if entries is None:
+        return keys
+    elif callable(entries):
+        return [key for key in keys if entries(*key)]
+    else:
+        entries = set(entries)
+        return [key for key in keys if key in entries]
+
+def involution_rows(red, entries=None):
+    r"""
+    Returns an iterator over the rows describing the involutions of the
+    ReductionMapsDict red, one per element, with INVOLUTION_COLUMNS.
+    """
+    for key in _selected(red.keys(), entries):
+        f = red[key].get_SRWP()
+        f0 = red[key].get_SPWP()
+        for x in f.domain():
+            image = f(x)
+            fixed = image == x
+            if fixed:
+                spwp_image = str(f0(x))
+            else:
+                spwp_image = ''
+            yield (key[0], key[1], str(x), x.get_sign(), str(x.get_weight()),
+                   str(image), image.get_sign(), fixed, spwp_image)
+
+def matrix_rows(mat, entries=None):
+    r"""
+    Returns an iterator over the rows describing the elements of the
+    Combinatorial Matrix mat, with MATRIX_COLUMNS.
+    """
+    keys = [(i, j) for i in range(mat.nrows()) for j in range(mat.ncols())]
+    for key in _selected(keys, entries):
+        for x in mat[key]:
+            yield (key[0], key[1], str(x), x.get_sign(), str(x.get_weight()))
+
+
+class _SocketFile(object):
+    def __init__(self, sock):
+        self._sock = sock
+
+    def write(self, s):
+        self._sock.sendall(s)
+
+    def flush(self):
+        pass
+
+
+class _HTMLWriter(object):
+    def __init__(self, out, columns):
+        self._out = out
+        out.write('<table border = 1>')
+        out.write(''.join(['<th>' + cgi.escape(str(q)) + '</th>' for q in columns]))
+
+    def write_row(self, row):
+        self._out.write('<tr>' + ''.join(['<td>' + cgi.escape(str(q)) + '</td>' for q in row]) + '</tr>\n')
+
+    def close(self):
+        self._out.write('</table>\n')
+
+
+class _CSVWriter(object):
+    def __init__(self, out, columns):
+        self._writer = csv.writer(out)
+        self._writer.writerow(columns)
+
+    def write_row(self, row):
+        self._writer.writerow(row)
+
+    def close(self):
+        pass
+
+
+class _JSONLWriter(object):
+    def __init__(self, out, columns):
+        self._out = out
+        self._columns = columns
+
+    def write_row(self, row):
+        self._out.write(json.dumps(dict(zip(self._columns, row))) + '\n')
+
+    def close(self):
+        pass
+
+_WRITERS = {'html': _HTMLWriter, 'csv': _CSVWriter, 'jsonl': _JSONLWriter}
+
+def export_rows(rows, out, columns, format='jsonl', offset=0, limit=None):
+    r"""
+    INPUT:
+     - rows an iterable of tuples
+     - out a file name, a file-like object or a socket
+     - columns the names of the columns
+     - format (optional) 'html', 'csv' or 'jsonl'
+     - offset (optional) the number of rows to skip
+     - limit (optional) the largest number of rows to write
+
+    Writes the rows as they are produced and returns the number written.
+    """
+    if format not in _WRITERS:
+        raise ValueError, "The format must be one of " + str(sorted(_WRITERS))
+    if isinstance(out, basestring):
+        stream = open(out, 'wb' if format == 'csv' else 'w')
+    elif hasattr(out, 'write'):
+        stream = out
+    elif hasattr(out, 'sendall'):
+        stream = _SocketFile(out)
+    else:
+        raise ValueError, "Enter a file name, a file-like object or a socket"
+    if limit is None:
+        stop = None
+    else:
+        stop = offset + limit
+    count = 0
+    try:
+        writer = _WRITERS[format](stream, columns)
+        for row in islice(rows, offset, stop):
+            writer.write_row(row)
+            count += 1
+        writer.close()
+        stream.flush()
+    finally:
+        if isinstance(out, basestring):
+            stream.close()
+    return count
+
+def export_involutions(red, out, format='html', entries=None, offset=0, limit=None):
+    r"""
+    Writes the involutions of the ReductionMapsDict red, restricted to
+    entries, to out.  See ``export_rows`` and ``involution_rows``.
+    """
+    return export_rows(involution_rows(red, entries), out, INVOLUTION_COLUMNS, format, offset, limit)
+
+def export_matrix(mat, out, format='html', entries=None, offset=0, limit=None):
+    r"""
+    Writes the elements of the Combinatorial Matrix mat, restricted to
+    entries, to out.  See ``export_rows`` and ``matrix_rows``.
+    """
+    return export_rows(matrix_rows(mat, entries), out, MATRIX_COLUMNS, format, offset, limit)
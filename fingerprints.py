@@ -0,0 +1,132 @@
+r"""
+Fingerprints
+
+Canonical content hashes of Combinatorial Objects, Combinatorial Scalars,
+matrices, maps and reductions.
+
+Each element is encoded as a string which depends only on its object,
+sign and weight, not on its row or column and not on the order in which
+any set is iterated.  A scalar is fingerprinted by hashing the sorted
+digests of its elements, a map by hashing the sorted digests of the pairs
+(x, f(x)), and matrices and reductions by hashing the fingerprints of their
+parts, so that equal contents always have equal fingerprints.
+
+ReductionMaps and ReductionMapsDict compute their fingerprints once and
+cache them, and compare and hash by them.
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.bijectivematrixalgebra.combinatorial_objects import CombinatorialObject
+import hashlib
+
+
+def _digest(s):
+    return hashlib.sha1(s).hexdigest()
+
+def _encode_object(obj):
+    r"""
+    Returns a canonical string for the object of a Combinatorial Object.
+    """
+    if isinstance(obj,CombinatorialObject):
+        #the encoding of an element, cached on it
+        return obj.get_sort_key()
+    elif type(obj) == tuple:
+        return "T(" + ",".join([_encode_object(x) for x in obj]) + ")"
+    elif isinstance(obj,basestring):
+        return "S" + repr(str(obj))
+    elif isinstance(obj,(int,long)):
+        return "I" + str(obj)
+    elif hasattr(obj,'to_cycles'):
+        #a permutation
+        return "P" + str(list(obj))
+    try:
+        #a set partition, or another set of sets
+        blocks = sorted([sorted(list(block)) for block in obj])
+        return "B" + str(blocks)
+    except TypeError:
+        return "R" + repr(str(obj))
+
+def element_encoding(elm):
+    r"""
+    Returns a canonical string for a Combinatorial Object, determined by
+    its object, sign and weight.
+    """
+    return "O(" + _encode_object(elm.get_object()) + ";" + str(elm.get_sign()) + ";" + str(elm.get_weight()) + ")"
+
+def element_fingerprint(elm, memo=None):
+    r"""
+    Returns the fingerprint of a Combinatorial Object.  The dictionary memo,
+    if given, caches fingerprints by identity for the duration of a call.
+    """
+    if memo is None:
+        return _digest(element_encoding(elm))
+    key = id(elm)
+    if key not in memo:
+        memo[key] = (elm, _digest(element_encoding(elm)))
+    return memo[key][1]
+
+def scalar_fingerprint(scalar, memo=None):
+    r"""
+    Returns the fingerprint of a Combinatorial Scalar, independent of the
+    order in which its elements are iterated.
+    """
+    return _digest("C" + "".join(sorted([element_fingerprint(elm,memo) for elm in scalar])))
+
+def map_fingerprint(func, memo=None):
+    r"""
+    Returns the fingerprint of a map, determined by its pairs (x, f(x)).
+    """
+    pairs = [element_fingerprint(x,memo) + element_fingerprint(func(x),memo) for x in func.domain()]
+    return _digest("M" + "".join(sorted(pairs)))
+
+def matrix_fingerprint(mat, memo=None):
+    r"""
+    Returns the fingerprint of a matrix of Combinatorial Scalars.
+    """
+    parts = ["X%d,%d" % (mat.nrows(),mat.ncols())]
+    for i in range(mat.nrows()):
+        for j in range(mat.ncols()):
+            parts.append(scalar_fingerprint(mat[i,j],memo))
+    return _digest("".join(parts))
+
+def reduction_fingerprint(red, memo=None):
+    r"""
+    Returns the fingerprint of a ReductionMaps.
+    """
+    return _digest("R" + scalar_fingerprint(red.get_A(),memo) + scalar_fingerprint(red.get_B(),memo)
+                   + map_fingerprint(red.get_SRWP(),memo) + map_fingerprint(red.get_SPWP(),memo))
+
+def reduction_dict_fingerprint(red):
+    r"""
+    Returns the fingerprint of a ReductionMapsDict, from the cached
+    fingerprints of its entries.
+    """
+    parts = ["D"]
+    for key in sorted(red.keys()):
+        parts.append("%d,%d:" % key + red[key].get_fingerprint())
+    return _digest("".join(parts))
+
+def loehr_mendes_fingerprint(A, B, red_AB_to_I):
+    r"""
+    Returns the fingerprint of the inputs of the Loehr-Mendes construction.
+    """
+    memo = dict()
+    return _digest("LM" + matrix_fingerprint(A,memo) + matrix_fingerprint(B,memo)
+                   + red_AB_to_I.get_fingerprint())
@@ -0,0 +1,177 @@
+r"""
+Implicit Maps
+
+Maps between Combinatorial Scalars which are not stored as dictionaries.
+
+Most of the reductions built in the Loehr-Mendes construction have an
+identity SRWP involution and an SPWP bijection which only rearranges the
+tuple structure of each object.  Rather than storing a dictionary entry
+for every element of the domain, these maps keep the domain and codomain
+and compute images on access.
+
+They provide the parts of the interface of ``FiniteSetMaps`` elements
+that are used in this package: calling, ``domain``, ``codomain``,
+``image_set`` and ``fibers``.
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.bijectivematrixalgebra.backend import SageObject
+from sage.bijectivematrixalgebra.backend import Set
+
+
+def _identity(elm):
+    return elm
+
+
+class ImplicitMap(SageObject):
+    r"""
+    INPUT:
+     - domain a Combinatorial Scalar
+     - codomain a Combinatorial Scalar
+     - rule a function taking a CombinatorialObject of domain to
+       a CombinatorialObject of codomain
+
+    Base class of maps whose images are computed on access, by applying
+    rule to each element.
+    """
+    def __init__(self, domain, codomain, rule):
+        self._domain = domain
+        self._codomain = codomain
+        self._rule = rule
+
+    def __call__(self, elm):
+        return self._rule(elm)
+
+    def __iter__(self):
+        for elm in self._domain:
+            yield self(elm)
+
+    def __eq__(self, other):
+        if not hasattr(other, 'domain'):
+            return False
+        elif set(self.domain()) != set(other.domain()):
+            return False
+        else:
+            for elm in self.domain():
+                if self(elm) != other(elm):
+                    return False
+            return True
+
+    def __ne__(self, other):
+        return not(self == other)
+
+    def domain(self):
+        return self._domain
+
+    def codomain(self):
+        return self._codomain
+
+    def get_rule(self):
+        return self._rule
+
+    def image_set(self):
+        r"""
+        Returns the set of images of the map.
+        """
+        return Set([self(elm) for elm in self._domain])
+
+    def fibers(self):
+        r"""
+        Returns a dictionary whose keys are the elements of the image
+        and whose values are the sets of their preimages.
+        """
+        d = dict()
+        for elm in self._domain:
+            d.setdefault(self(elm), set()).add(elm)
+        return d
+
+
+class IdentityMap(ImplicitMap):
+    r"""
+    INPUT:
+     - domain a Combinatorial Scalar
+
+    Returns the identity map on domain.  Nothing is stored but the
+    domain itself, and every element is a fixed point.
+
+    EXAMPLES::
+
+        sage: C = CombinatorialScalarWrapper([CombinatorialObject("Rock",1)])
+        sage: f = IdentityMap(C)
+        sage: f(CombinatorialObject("Rock",1))
+        Rock
+        sage: fixed_points(f) is C
+        True
+    """
+    def __init__(self, domain):
+        ImplicitMap.__init__(self, domain, domain, _identity)
+
+    def __repr__(self):
+        return "Identity map on " + str(list(self._domain))
+
+    def __call__(self, elm):
+        return elm
+
+    def image_set(self):
+        return self._domain
+
+    def fibers(self):
+        d = dict()
+        for elm in self._domain:
+            d[elm] = set([elm])
+        return d
+
+
+class RelabelingMap(ImplicitMap):
+    r"""
+    INPUT:
+     - domain a Combinatorial Scalar
+     - codomain a Combinatorial Scalar
+     - rule a function taking a CombinatorialObject of domain to
+       a CombinatorialObject of codomain
+     - inverse_rule (optional) the inverse of rule
+
+    Returns the bijection from domain to codomain given by applying
+    rule to each element on access.  The rule is expected to only
+    rearrange the structure of an object, so that signs and weights
+    are preserved.
+
+    The images are new objects which are equal to (but not necessarily
+    identical with) the elements of codomain; in particular they do not
+    carry the row and column of the element of codomain.
+    """
+    def __init__(self, domain, codomain, rule, inverse_rule=None):
+        ImplicitMap.__init__(self, domain, codomain, rule)
+        self._inverse_rule = inverse_rule
+
+    def __repr__(self):
+        return "Relabeling map from " + str(list(self._domain)) + " to " + str(list(self._codomain))
+
+    def get_inverse_rule(self):
+        return self._inverse_rule
+
+    def inverse(self):
+        r"""
+        Returns the inverse map, which is again implicit when an
+        inverse rule is known.
+        """
+        if self._inverse_rule is None:
+            return None
+        return RelabelingMap(self._codomain, self._domain, self._inverse_rule, self._rule)
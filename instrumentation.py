@@ -0,0 +1,220 @@
+r"""
+Instrumentation
+
+Records, for each stage of a ``Pipeline``, its wall time, CPU time,
+memory use, the number of elements in each entry of its output and the
+number of map images its output stores.
+
+The number of map images is the number of images the maps of the output
+hold, not the number of times maps were evaluated while the stage ran;
+evaluations are not counted, since the maps of ``FiniteSetMaps`` give no
+way to do so without slowing down every call.
+
+Every record holds the peak resident set size of the process so far, which
+covers everything the process did before the stage as well.  The peak
+memory of the stage itself is measured by ``tracemalloc`` when
+trace_memory=True and that module exists, which slows down allocation.
+Otherwise, and always on Python 2, which has no ``tracemalloc``, it is the
+growth of the peak resident set size during the stage: free to read, but
+0 for a stage which stays below an earlier peak.
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+from sage.bijectivematrixalgebra.reduction_maps_dicts import ReductionMapsDict
+from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarWrapper
+from sage.bijectivematrixalgebra.implicit_maps import ImplicitMap
+import json
+import os
+import resource
+import sys
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def _stored_images(func):
+    r"""
+    Returns the number of images stored by a map; implicit maps compute
+    their images on access and store none.
+    """
+    if isinstance(func,ImplicitMap):
+        return 0
+    #the cardinality of a Sage set is a Sage Integer, which json cannot write
+    return int(func.domain().cardinality())
+
+def element_counts(value):
+    r"""
+    Returns the number of elements in each entry of a matrix or of the
+    two sides of a matrix reduction, as lists of lists, or the size of
+    a single Combinatorial Scalar.  Returns None for anything else.
+    """
+    if isinstance(value,ReductionMapsDict):
+        dim = value.get_dim()
+        return {'A':[[value[i,j].get_A().get_size() for j in range(dim)] for i in range(dim)],
+                'B':[[value[i,j].get_B().get_size() for j in range(dim)] for i in range(dim)]}
+    elif isinstance(value,CombinatorialScalarWrapper):
+        return value.get_size()
+    elif hasattr(value,'nrows') and hasattr(value,'ncols'):
+        try:
+            return [[value[i,j].get_size() for j in range(value.ncols())] for i in range(value.nrows())]
+        except AttributeError:
+            return None
+    else:
+        return None
+
+def map_images(value):
+    r"""
+    Returns the number of map images stored by a matrix reduction, or 0
+    for anything else.
+    """
+    if not(isinstance(value,ReductionMapsDict)):
+        return 0
+    total = 0
+    for key in value:
+        total += _stored_images(value[key].get_SRWP()) + _stored_images(value[key].get_SPWP())
+    return total
+
+def _peak_rss():
+    r"""
+    Returns the peak resident set size of the process in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #kilobytes on Linux, bytes on OS X
+    if sys.platform == 'darwin':
+        return peak
+    return peak * 1024
+
+def measure_call(name, function, args, kwargs, trace_memory=False):
+    r"""
+    Calls function and returns the pair (result, record), where record
+    is a dictionary of the measurements of the call.
+    """
+    tracing = trace_memory and tracemalloc is not None
+    if tracing:
+        started = not(tracemalloc.is_tracing())
+        if started:
+            tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+    else:
+        base = _peak_rss()
+    wall = time.time()
+    cpu = os.times()
+    result = function(*args, **kwargs)
+    cpu_after = os.times()
+    wall = time.time() - wall
+    record = {'stage':name,
+              'wall_time':wall,
+              'cpu_time':(cpu_after[0] - cpu[0]) + (cpu_after[1] - cpu[1]),
+              'pid':os.getpid()}
+    process_peak_rss = _peak_rss()
+    if tracing:
+        record['peak_memory'] = tracemalloc.get_traced_memory()[1] - base
+        if started:
+            tracemalloc.stop()
+    else:
+        record['peak_memory'] = process_peak_rss - base
+    #the peak of the whole process, not of the stage
+    record['process_peak_rss'] = process_peak_rss
+    if type(name) == tuple:
+        outputs = result
+    else:
+        outputs = (result,)
+    record['elements'] = [element_counts(value) for value in outputs]
+    record['map_images'] = sum([map_images(value) for value in outputs])
+    return result, record
+
+
+class Instrumentation(SageObject):
+    r"""
+    INPUT:
+     - path (optional) a file to which the report is written as JSON
+       whenever a construction using this instrumentation finishes
+     - trace_memory (optional) if True, measure peak memory per stage
+       with tracemalloc where it exists
+
+    Collects one record per stage run.  Each record is a dictionary with
+    keys 'stage', 'wall_time', 'cpu_time', 'peak_memory' and
+    'process_peak_rss' (both in bytes), 'elements', 'map_images' and 'pid'.
+
+    EXAMPLES::
+
+        sage: m1 = Stirling1Matrix(3); m2 = Stirling2Matrix(3)
+        sage: I = Instrumentation()
+        sage: Ss = I.measure('AB', matrix_multiply, (m2,m1), {})
+        sage: r = I.get_report()[0]
+        sage: sorted(r.keys())
+        ['cpu_time', 'elements', 'map_images', 'peak_memory', 'pid', 'process_peak_rss', 'stage', 'wall_time']
+        sage: r['stage'], r['elements'][0][2], r['peak_memory'] >= 0
+        ('AB', [0, 2, 1], True)
+    """
+    def __init__(self, path=None, trace_memory=False):
+        self._path = path
+        self._trace_memory = trace_memory
+        self._records = list()
+
+    def __repr__(self):
+        return "Instrumentation of " + str(len(self._records)) + " stages"
+
+    def trace_memory(self):
+        return self._trace_memory
+
+    def measure(self, name, function, args, kwargs):
+        r"""
+        Calls function, records its measurements and returns its result.
+        """
+        result, record = measure_call(name, function, args, kwargs, self._trace_memory)
+        self.add_record(record)
+        return result
+
+    def add_record(self, record):
+        self._records.append(record)
+
+    def get_report(self):
+        r"""
+        Returns the list of records, in the order the stages finished.
+        """
+        return list(self._records)
+
+    def total_wall_time(self):
+        return sum([r['wall_time'] for r in self._records])
+
+    def write_json(self, path=None):
+        r"""
+        Writes the report to path, or to the path given at creation.
+        """
+        if path is None:
+            path = self._path
+        if path is None:
+            raise ValueError, "Enter a path for the report"
+        out = open(path, 'w')
+        try:
+            json.dump(self._records, out, indent=1)
+        finally:
+            out.close()
+
+    def finish(self):
+        r"""
+        Writes the report if a path was given at creation.
+        """
+        if self._path is not None:
+            self.write_json()
@@ -31,22 +31,23 @@ from sage.bijectivematrixalgebra.reduction_methods import *
 from sage.sets.finite_set_maps import FiniteSetMaps
 from sage.bijectivematrixalgebra.reduction_maps_dicts import ReductionMapsDict
 from sage.bijectivematrixalgebra.reduction_maps import ReductionMaps
+from sage.structure.sage_object import SageObject
 
 def tab_list(y, headers = None):
     '''
     Converts a list into an html table with borders.
     '''
-    s = '<table border = 1>'
+    s = ['<table border = 1>']
     if headers:
         for q in headers:
-            s = s + '<th>' + str(q) + '</th>'
+            s.append('<th>' + str(q) + '</th>')
     for x in y:
-        s = s + '<tr>'
+        s.append('<tr>')
         for q in x:
-            s = s + '<td>' + str(q) + '</td>'
-        s = s + '</tr>'
-    s = s + '</table>'
-    return s
+            s.append('<td>' + str(q) + '</td>')
+        s.append('</tr>')
+    s.append('</table>')
+    return ''.join(s)
 
 def total_maps(mat):
     nrows = mat.nrows()
@@ -69,7 +70,7 @@ def reduction_identity(mat,involution_dict, st = None):
     for i in range(dim):
         for j in range(dim):
             if i==j:
-                f0s[i,j] = FiniteSetMaps(mat[i,j],I[i,j]).from_dict({mat[i,j].get_set().pop():CombinatorialObject(1,1)})
+                f0s[i,j] = FiniteSetMaps(mat[i,j],I[i,j]).from_dict({iter(mat[i,j]).next():CombinatorialObject(1,1)})
             else:
                 f0s[i,j] = FiniteSetMaps(set(),set()).from_dict({})
     d = dict()
@@ -77,3 +78,184 @@ def reduction_identity(mat,involution_dict, st = None):
         for j in range(dim):
             d[i,j] = ReductionMaps(mat[i,j],I[i,j],fs[i,j],f0s[i,j])
     return ReductionMapsDict(d,st)
+
+class EditableInvolutionDict(SageObject):
+    r"""
+    INPUT:
+     - mat a Combinatorial Matrix which reduces to the identity and is
+       equivalent to a singleton along its diagonal
+     - involution_dict (optional) an involution dictionary to start from
+
+    An involution dictionary built one pair at a time.  For every entry it
+    keeps the number of unmatched elements, of pairs with equal signs, of
+    pairs with different weights, of fixed points and of fixed points which
+    are not of sign 1 and weight 1, updating them in constant time on
+    each edit.  An entry is valid when nothing is unmatched, no pair
+    violates sign or weight, and it has one good fixed point on the
+    diagonal and none elsewhere; the reduction is then built without
+    checking the maps again.
+
+    EXAMPLES::
+
+        sage: Ss = Stirling21Matrix(3)
+        sage: E = EditableInvolutionDict(Ss)
+        sage: E.get_invalid_entries()
+        [(0, 0), (1, 1), (2, 1), (2, 2)]
+        sage: x, y = list(Ss[2,1])
+        sage: E.fix(2,1,x)
+        sage: E.get_state(2,1)['fixed_points'], E.is_entry_valid(2,1)
+        (1, False)
+        sage: E.pair(2,1,x,y)
+        sage: E.get_partner(2,1,x) == y, E.is_entry_valid(2,1)
+        (True, True)
+        sage: for i in range(3):
+        ....:     E.fix(i,i,list(Ss[i,i])[0])
+        sage: E.is_valid()
+        True
+        sage: E.get_reduction() == reduction_identity_matrix(Ss)
+        True
+    """
+    def __init__(self, mat, involution_dict=None):
+        self._mat = mat
+        self._dim = mat.nrows()
+        self._partner = dict()
+        self._info = dict()
+        self._state = dict()
+        for i in range(self._dim):
+            for j in range(self._dim):
+                self._partner[i,j] = dict((x, None) for x in mat[i,j])
+                self._info[i,j] = dict((x, (x, x.get_sign(), str(x.get_weight()))) for x in mat[i,j])
+                self._state[i,j] = {'unmatched': len(self._partner[i,j]),
+                                    'sign_violations': 0,
+                                    'weight_violations': 0,
+                                    'fixed_points': 0,
+                                    'bad_fixed_points': 0}
+        if involution_dict is not None:
+            for (i, j), f in involution_dict.items():
+                for x in self._partner[i,j].keys():
+                    if self._partner[i,j][x] is None:
+                        self.pair(i, j, x, f(x))
+
+    def __repr__(self):
+        return "Editable involution dictionary with " + str(len(self.get_invalid_entries())) + " invalid entries"
+
+    def _element(self, key, x):
+        r"""
+        Returns the element of entry key equal to x.
+        """
+        try:
+            return self._info[key][x][0]
+        except KeyError:
+            raise ValueError, str(x) + " is not in entry " + str(key)
+
+    def _bad_fixed(self, key, x):
+        info = self._info[key][x]
+        return info[1] != 1 or info[2] != '1'
+
+    def _detach(self, key, x):
+        r"""
+        Unmatches x, and its partner.
+        """
+        partner = self._partner[key]
+        state = self._state[key]
+        p = partner[x]
+        if p is None:
+            return
+        if p is x:
+            state['fixed_points'] -= 1
+            state['bad_fixed_points'] -= self._bad_fixed(key, x)
+            partner[x] = None
+            state['unmatched'] += 1
+        else:
+            state['sign_violations'] -= (self._info[key][x][1] == self._info[key][p][1])
+            state['weight_violations'] -= (self._info[key][x][2] != self._info[key][p][2])
+            partner[x] = None
+            partner[p] = None
+            state['unmatched'] += 2
+
+    def pair(self, row, col, x, y):
+        r"""
+        Matches x with y in entry (row,col), unmatching their previous
+        partners; when x equals y, x becomes a fixed point.
+        """
+        key = (row, col)
+        x = self._element(key, x)
+        y = self._element(key, y)
+        if x is y:
+            return self.fix(row, col, x)
+        self._detach(key, x)
+        self._detach(key, y)
+        self._partner[key][x] = y
+        self._partner[key][y] = x
+        state = self._state[key]
+        state['unmatched'] -= 2
+        state['sign_violations'] += (self._info[key][x][1] == self._info[key][y][1])
+        state['weight_violations'] += (self._info[key][x][2] != self._info[key][y][2])
+
+    def fix(self, row, col, x):
+        r"""
+        Makes x a fixed point of the involution of entry (row,col).
+        """
+        key = (row, col)
+        x = self._element(key, x)
+        self._detach(key, x)
+        self._partner[key][x] = x
+        state = self._state[key]
+        state['unmatched'] -= 1
+        state['fixed_points'] += 1
+        state['bad_fixed_points'] += self._bad_fixed(key, x)
+
+    def unmatch(self, row, col, x):
+        r"""
+        Unmatches x, and its partner, in entry (row,col).
+        """
+        key = (row, col)
+        self._detach(key, self._element(key, x))
+
+    def get_partner(self, row, col, x):
+        r"""
+        Returns the element x is matched with, or None.
+        """
+        key = (row, col)
+        return self._partner[key][self._element(key, x)]
+
+    def get_state(self, row, col):
+        r"""
+        Returns the dictionary of counts of entry (row,col).
+        """
+        return dict(self._state[row, col])
+
+    def is_entry_valid(self, row, col):
+        state = self._state[row, col]
+        if row == col:
+            fixed = 1
+        else:
+            fixed = 0
+        return (state['unmatched'] == 0 and state['sign_violations'] == 0 and state['weight_violations'] == 0
+                and state['bad_fixed_points'] == 0 and state['fixed_points'] == fixed)
+
+    def get_invalid_entries(self):
+        return [key for key in sorted(self._state) if not(self.is_entry_valid(*key))]
+
+    def is_valid(self):
+        return not(self.get_invalid_entries())
+
+    def get_involution_dict(self):
+        r"""
+        Returns the involution dictionary, as accepted by
+        ``reduction_identity_matrix``, once every entry is valid.
+        """
+        invalid = self.get_invalid_entries()
+        if invalid:
+            raise ValueError, "The involutions of entries " + str(invalid) + " are not valid"
+        d = dict()
+        for key in self._partner:
+            d[key] = FiniteSetMaps(self._mat[key], self._mat[key]).from_dict(self._partner[key])
+        return d
+
+    def get_reduction(self, st=None):
+        r"""
+        Returns the ReductionMapsDict of the matrix to I given by the
+        involutions, which are not checked again.
+        """
+        return reduction_identity_matrix(self._mat, st, self.get_involution_dict(), check=False)
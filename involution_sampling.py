@@ -0,0 +1,394 @@
+r"""
+Involution Sampling
+
+Samples and enumerates the involutions showing that a matrix reduces to
+the identity, uniformly and reproducibly.
+
+An SRWP involution on a fully cancelled entry is a perfect matching of its
+positive elements with its negative elements of the same weight.  A
+diagonal entry whose generating function is 1 has one more positive than
+negative element of weight 1, and its involution fixes exactly one of them.
+The sampler sorts the elements of each entry into buckets by weight and
+sign once, in a canonical order, and draws each sample by shuffling the
+negative elements of every bucket and matching them with the positive
+elements in order.  Every matching, and on the diagonal every choice of
+fixed point, is equally likely.
+
+Choosing an involution thus amounts to choosing one arrangement, a
+permutation, per bucket.  ``InvolutionEnumerator`` numbers every choice by
+its rank, in mixed radix over the buckets with each arrangement written as
+a Lehmer code, so that any range of ranks can be unranked directly; this is
+what splits the enumeration into shards and resumes it from a cursor.
+
+The samples are valid by construction, so the reductions built from them
+may skip validation with ``reduction_identity_matrix(mat,
+involution_dict=d, check=False)``.
+
+EXAMPLES::
+
+In Stirling21Matrix(4), the entries (3,1) and (3,2) each hold three
+positive and three negative elements of weight 1, and every other entry
+admits a single involution, so there are 3!*3! = 36 choices.  Equal seeds
+give equal samples, and 3600 samples hit every choice about 100 times::
+
+    sage: Ss = Stirling21Matrix(4)
+    sage: S = InvolutionSampler(Ss)
+    sage: d = S.sample(seed=7)
+    sage: red = reduction_identity_matrix(Ss,involution_dict=d,check=False)
+    sage: red == reduction_identity_matrix(Ss,involution_dict=S.sample(seed=7),check=False)
+    True
+    sage: def choice(d):
+    ....:     return tuple([d[key](x) for key in [(3,1),(3,2)] for x in Ss[key]])
+    sage: from collections import Counter
+    sage: counts = Counter([choice(d) for d in S.samples(3600,seed=1)])  # long time
+    sage: len(counts), all([50 < c < 150 for c in counts.values()])  # long time
+    (36, True)
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+from sage.bijectivematrixalgebra.fingerprints import element_encoding
+from sage.sets.finite_set_maps import FiniteSetMaps
+from math import factorial
+import bisect
+import random
+
+
+def weight_buckets(scalar):
+    r"""
+    Returns a list of pairs (positives, negatives), one per weight, of the
+    elements of scalar in canonical order.  The buckets are sorted by the
+    weights they hold.
+    """
+    buckets = dict()
+    for elm in scalar:
+        key = str(elm.get_weight())
+        if key not in buckets:
+            buckets[key] = (list(), list())
+        if elm.get_sign() == 1:
+            buckets[key][0].append(elm)
+        else:
+            buckets[key][1].append(elm)
+    L = list()
+    for key in sorted(buckets):
+        pos, neg = buckets[key]
+        L.append((sorted(pos, key=element_encoding), sorted(neg, key=element_encoding)))
+    return L
+
+def _matrix_buckets(mat):
+    r"""
+    Returns the dictionaries of the weight buckets and of the FiniteSetMaps
+    parents of the entries of mat, checking that mat reduces to the identity.
+    """
+    all_buckets = dict()
+    parents = dict()
+    for i in range(mat.nrows()):
+        for j in range(mat.ncols()):
+            buckets = weight_buckets(mat[i,j])
+            excess = 0
+            for pos, neg in buckets:
+                if len(pos) != len(neg):
+                    if i == j and excess == 0 and len(pos) == len(neg) + 1 and str(pos[0].get_weight()) == '1':
+                        excess = 1
+                    else:
+                        raise ValueError, "Input needs to reduce to the identity."
+            if i == j and excess == 0:
+                raise ValueError, "Input needs to reduce to the identity."
+            all_buckets[i,j] = buckets
+            parents[i,j] = FiniteSetMaps(mat[i,j],mat[i,j])
+    return all_buckets, parents
+
+def _arranged_dict(buckets, arrangements):
+    r"""
+    Returns the involution, as a dictionary, given by one arrangement per
+    bucket.  In a bucket of as many positive as negative elements the i-th
+    positive element is matched with the arrangement[i]-th negative one; in
+    the diagonal bucket with one more positive element, the i-th negative
+    element is matched with the arrangement[i]-th positive one and the last
+    positive element in the arrangement is fixed.
+    """
+    d = dict()
+    for (pos, neg), p in zip(buckets, arrangements):
+        if len(pos) > len(neg):
+            d[pos[p[-1]]] = pos[p[-1]]
+            first, second = neg, pos
+        else:
+            first, second = pos, neg
+        for i in range(len(first)):
+            d[first[i]] = second[p[i]]
+            d[second[p[i]]] = first[i]
+    return d
+
+def _arrangements(buckets, d):
+    r"""
+    Returns the arrangements of the buckets giving the involution d.
+    """
+    L = list()
+    for pos, neg in buckets:
+        if len(pos) > len(neg):
+            index = dict((x, k) for k, x in enumerate(pos))
+            fixed = [x for x in pos if d[x] == x]
+            L.append([index[d[x]] for x in neg] + [index[fixed[0]]])
+        else:
+            index = dict((x, k) for k, x in enumerate(neg))
+            L.append([index[d[x]] for x in pos])
+    return L
+
+def lehmer_unrank(r, m):
+    r"""
+    Returns the permutation of range(m) whose Lehmer code has rank r.
+    """
+    items = range(m)
+    p = list()
+    for i in range(m, 0, -1):
+        q, r = divmod(r, factorial(i - 1))
+        p.append(items.pop(q))
+    return p
+
+def lehmer_rank(p):
+    r"""
+    Returns the rank of the Lehmer code of the permutation p of range(len(p)).
+    """
+    items = range(len(p))
+    r = 0
+    for i, x in enumerate(p):
+        q = items.index(x)
+        items.pop(q)
+        r += q * factorial(len(p) - 1 - i)
+    return r
+
+
+class InvolutionSampler(SageObject):
+    r"""
+    INPUT:
+     - mat a Combinatorial Matrix which reduces to the identity
+
+    Samples involution dictionaries on mat, as accepted by
+    ``reduction_identity_matrix``, uniformly at random.
+    """
+    def __init__(self, mat):
+        self._dim = mat.nrows()
+        self._buckets, self._parents = _matrix_buckets(mat)
+
+    def __repr__(self):
+        return "Involution sampler on a matrix of dimension " + str(self._dim)
+
+    def _sample(self, rng):
+        fs = dict()
+        for key in sorted(self._buckets):
+            arrangements = list()
+            for pos, neg in self._buckets[key]:
+                #in the diagonal bucket of weight 1 the positives are arranged,
+                #so that the one left over, the fixed point, is uniform too
+                p = range(max(len(pos), len(neg)))
+                rng.shuffle(p)
+                arrangements.append(p)
+            fs[key] = self._parents[key].from_dict(_arranged_dict(self._buckets[key], arrangements))
+        return fs
+
+    def sample(self, seed=None):
+        r"""
+        Returns a random involution dictionary; equal seeds give equal samples.
+        """
+        return self._sample(random.Random(seed))
+
+    def samples(self, n=None, seed=None):
+        r"""
+        Returns an iterator over n random involution dictionaries, or over
+        infinitely many when n is missing, drawn from one seeded generator.
+        """
+        rng = random.Random(seed)
+        count = 0
+        while n is None or count < n:
+            yield self._sample(rng)
+            count += 1
+
+def random_involution_dict(mat, seed=None):
+    r"""
+    Returns a uniformly random involution dictionary on mat, a Combinatorial
+    Matrix which reduces to the identity.  See ``InvolutionSampler``, which
+    should be used instead to draw many samples.
+    """
+    return InvolutionSampler(mat).sample(seed)
+
+
+class InvolutionEnumerator(SageObject):
+    r"""
+    INPUT:
+     - mat a Combinatorial Matrix which reduces to the identity
+     - relabelings (optional) a dictionary of lists of dictionaries: for
+       each key (i,j), relabelings of the elements of mat[i,j] which
+       preserve sign and weight and generate a group of symmetries
+
+    Enumerates every involution dictionary on mat, as accepted by
+    ``reduction_identity_matrix``, by rank.  With relabelings, only the
+    choice of least rank among those conjugate under the relabelings of each
+    entry is enumerated.  The relabelings are assumed to be symmetries of
+    whatever the enumeration feeds; nothing checks that.  Finding the least
+    choices visits every choice of each entry with relabelings once (see
+    ``_canonical_ranks``), so the pruning only saves downstream work.
+
+    EXAMPLES::
+
+        sage: E = InvolutionEnumerator(Stirling21Matrix(4))
+        sage: E.cardinality()
+        36
+        sage: all([E.rank(E.unrank(r)) == r for r in range(36)])
+        True
+        sage: E.shards(4)
+        [(0, 9), (9, 18), (18, 27), (27, 36)]
+        sage: [rank for rank, d in E.iterate(9,12)]
+        [9, 10, 11]
+    """
+    def __init__(self, mat, relabelings=None):
+        self._buckets, self._parents = _matrix_buckets(mat)
+        self._keys = sorted(self._buckets)
+        self._canonical = dict()
+        self._counts = dict()
+        for key in self._keys:
+            sizes = [max(len(pos), len(neg)) for pos, neg in self._buckets[key]]
+            count = 1
+            for m in sizes:
+                count *= factorial(m)
+            if relabelings is not None and relabelings.get(key):
+                self._canonical[key] = self._canonical_ranks(key, count, relabelings[key], mat[key])
+                count = len(self._canonical[key])
+            self._counts[key] = count
+
+    def __repr__(self):
+        return "Enumeration of " + str(self.cardinality()) + " involution dictionaries"
+
+    def _local_dict(self, key, r):
+        r"""
+        Returns the involution on entry key of local rank r, as a dictionary.
+        """
+        arrangements = list()
+        for pos, neg in self._buckets[key]:
+            m = max(len(pos), len(neg))
+            r, digit = divmod(r, factorial(m))
+            arrangements.append(lehmer_unrank(digit, m))
+        return _arranged_dict(self._buckets[key], arrangements)
+
+    def _local_rank(self, key, d):
+        r = 0
+        scale = 1
+        for (pos, neg), p in zip(self._buckets[key], _arrangements(self._buckets[key], d)):
+            r += scale * lehmer_rank(p)
+            scale *= factorial(len(p))
+        return r
+
+    def _canonical_ranks(self, key, count, relabelings, scalar):
+        r"""
+        Returns the sorted list of the local ranks which are least in their
+        orbits under conjugation by the relabelings.
+
+        Every one of the count local ranks of the entry is visited, and the
+        ranks already reached are kept in a set of up to count elements, so
+        this takes time and memory proportional to count, the product of the
+        factorials of the bucket sizes.  Representatives are not generated
+        directly, by canonical augmentation, so the pruning saves the runs
+        of the constructions fed by the enumeration, not the cost of
+        building the enumerator.
+        """
+        for s in relabelings:
+            if set(s.keys()) != set(scalar) or set(s.values()) != set(scalar):
+                raise ValueError, "A relabeling of entry " + str(key) + " is not a bijection of the entry"
+            for x in s:
+                if x.get_sign() != s[x].get_sign() or str(x.get_weight()) != str(s[x].get_weight()):
+                    raise ValueError, "A relabeling of entry " + str(key) + " does not preserve sign and weight"
+        seen = set()
+        canonical = list()
+        for r in range(count):
+            if r in seen:
+                continue
+            canonical.append(r)
+            seen.add(r)
+            frontier = [r]
+            while frontier:
+                d = self._local_dict(key, frontier.pop())
+                for s in relabelings:
+                    image = self._local_rank(key, dict((s[x], s[d[x]]) for x in d))
+                    if image not in seen:
+                        seen.add(image)
+                        frontier.append(image)
+        return canonical
+
+    def cardinality(self):
+        total = 1
+        for key in self._keys:
+            total *= self._counts[key]
+        return total
+
+    def rank(self, fs):
+        r"""
+        Returns the rank of the involution dictionary fs, the inverse of
+        ``unrank``.  With relabelings, fs must be the choice of least rank
+        among those conjugate to it.
+        """
+        rank = 0
+        scale = 1
+        for key in self._keys:
+            d = dict()
+            for pos, neg in self._buckets[key]:
+                for x in pos + neg:
+                    d[x] = fs[key](x)
+            r = self._local_rank(key, d)
+            if key in self._canonical:
+                k = bisect.bisect_left(self._canonical[key], r)
+                if k == len(self._canonical[key]) or self._canonical[key][k] != r:
+                    raise ValueError, "The involution of entry " + str(key) + " is not the least of its orbit"
+                r = k
+            rank += scale * r
+            scale *= self._counts[key]
+        return rank
+
+    def unrank(self, rank):
+        r"""
+        Returns the involution dictionary of the given rank.
+        """
+        if rank < 0 or rank >= self.cardinality():
+            raise ValueError, "The rank must be between 0 and " + str(self.cardinality() - 1)
+        fs = dict()
+        for key in self._keys:
+            rank, r = divmod(rank, self._counts[key])
+            if key in self._canonical:
+                r = self._canonical[key][r]
+            fs[key] = self._parents[key].from_dict(self._local_dict(key, r))
+        return fs
+
+    def iterate(self, start=0, stop=None):
+        r"""
+        Returns an iterator over the pairs (rank, involution dictionary) with
+        start <= rank < stop.  A run interrupted after rank r resumes with
+        start = r + 1.
+        """
+        if stop is None or stop > self.cardinality():
+            stop = self.cardinality()
+        rank = start
+        while rank < stop:
+            yield rank, self.unrank(rank)
+            rank += 1
+
+    def shards(self, n):
+        r"""
+        Returns n ranges (start, stop) of ranks covering the enumeration.
+        """
+        total = self.cardinality()
+        return [(k * total // n, (k + 1) * total // n) for k in range(n)]
@@ -27,89 +27,381 @@ AUTHORS:
 
 from sage.structure.all import SageObject
 from sage.bijectivematrixalgebra.matrix_methods import *
-from sage.bijectivematrixalgebra.reduction_methods import *
-
+from sage.bijectivematrixalgebra.reduction_methods import *
+from sage.bijectivematrixalgebra.reduction_methods import _ApBCpD_rule
+from sage.bijectivematrixalgebra.reduction_methods import _ApBCpD_inverse_rule
+from sage.bijectivematrixalgebra.reduction_methods import _pABpCD_rule
+from sage.bijectivematrixalgebra.reduction_methods import _pABpCD_inverse_rule
+from sage.bijectivematrixalgebra.reduction_methods import _remove_middle_rule
+from sage.bijectivematrixalgebra.reduction_methods import _insert_middle_rule
+from sage.bijectivematrixalgebra.reduction_methods import _remove_left_rule
+from sage.bijectivematrixalgebra.reduction_methods import _insert_left_rule
+from sage.bijectivematrixalgebra.point_reductions import EagerPointReduction
+from sage.bijectivematrixalgebra.point_reductions import RelabelingPointReduction
+from sage.bijectivematrixalgebra.point_reductions import MiddleInvolutionPointReduction
+from sage.bijectivematrixalgebra.point_reductions import LeftInvolutionPointReduction
+from sage.bijectivematrixalgebra.point_reductions import point_confluence
+from sage.bijectivematrixalgebra.reduction_maps import ReductionMaps
+from sage.sets.finite_set_maps import FiniteSetMaps
+from sage.bijectivematrixalgebra.pipeline import Stage
+from sage.bijectivematrixalgebra.pipeline import Pipeline
+from sage.bijectivematrixalgebra.instrumentation import Instrumentation
+from sage.bijectivematrixalgebra.checkpoint import Checkpoint
+from sage.bijectivematrixalgebra.fingerprints import loehr_mendes_fingerprint
+from sage.bijectivematrixalgebra.disk_cache import DiskCache
+from collections import OrderedDict
+from copy import copy
+
+#increase whenever the maps constructed in this file change
+LOEHR_MENDES_CODE_VERSION = 2
+
+def _det_times_identity(det_A,A):
+    return matrix_identity_multiply_scalar(det_A,A.nrows(),A.ncols())
+
+def _transitive(first,second,repr=None,progress=None,cancel=None):
+    return first.transitive(second,repr,progress,cancel)
+
+def _confluence(first,second,repr=None,progress=None,cancel=None):
+    return first.confluence(second,repr,progress,cancel)
+
+def _reduction_23(reduction_12,red_AB_to_I):
+    dependencies = dict()
+    reduction_23 = reduction_lemma_28_23(reduction_12.get_matrix_B(),red_AB_to_I,dependencies = dependencies)
+    return reduction_23, dependencies
+
+def _reduction_34(reduction_23,reduction_adj_AA_to_detAI):
+    return reduction_matrix_AIB_AB(reduction_23.get_matrix_B()).transitive(reduction_adj_AA_to_detAI,"reduction_34")
+
+def _reduction_68(reduction_16,reduction_adj_AA_to_I):
+    return reduction_lemma_28_68(reduction_16.get_matrix_B(),reduction_adj_AA_to_I)
+
+def _reduction_89(reduction_68):
+    return reduction_matrix_IAB_AB(reduction_68.get_matrix_B())
+
+def _setup_stages():
+    r"""
+    Returns the stages which depend on A alone.
+    """
+    return [Stage('adj_A',matrix_combinatorial_adjoint,('A',),monitored=True),
+            Stage('adj_AA',matrix_multiply,('adj_A','A'),monitored=True),
+            Stage('det_A',matrix_determinant,('A',),monitored=True),
+            Stage('det_AI',_det_times_identity,('det_A','A')),
+            Stage('reduction_45',reduction_identity_matrix,('det_AI',),{'st':"detAI to I or reduction_45"}),
+            Stage('reduction_adj_AA_to_detAI',reduction_lemma_40,('adj_AA',)),
+            Stage('reduction_adj_AA_to_I',_transitive,('reduction_adj_AA_to_detAI','reduction_45'),monitored=True)]
+
+def loehr_mendes_pipeline(keep = None):
+    r"""
+    Returns the construction of Theorem 47 as a Pipeline whose inputs
+    are named 'A', 'B' and 'red_AB_to_I'.
+
+    The setup stages, the branch through reductions 12, 13 and 15 and the
+    branch through reductions 16, 18 and 19 only meet at the confluence
+    stage 'LoehrMendes', so on a process pool they run concurrently.
+
+    By default the outputs kept are those which ``LoehrMendes`` stores.
+    """
+    if keep is None:
+        keep = ('AB','BA','adj_A','reduction_12','dependencies_23','reduction_35',
+                'reduction_15','reduction_19','LoehrMendes')
+    stages = _setup_stages()
+    stages.extend([
+        Stage('AB',matrix_multiply,('A','B'),monitored=True),
+        Stage('BA',matrix_multiply,('B','A'),monitored=True),
+        Stage('reduction_12',reduction_matrix_ABCD_to_ApBCpD,('adj_A','A','B','A'),{'st':"reduction_12"}),
+        Stage(('reduction_23','dependencies_23'),_reduction_23,('reduction_12','red_AB_to_I')),
+        Stage('reduction_13',_transitive,('reduction_12','reduction_23'),monitored=True),
+        Stage('reduction_34',_reduction_34,('reduction_23','reduction_adj_AA_to_detAI')),
+        Stage('reduction_35',_transitive,('reduction_34','reduction_45'),{'repr':"reduction_35"},monitored=True),
+        Stage('reduction_15',_transitive,('reduction_13','reduction_35'),{'repr':"reduction_15"},monitored=True),
+        Stage('reduction_16',reduction_matrix_ABCD_to_pABpCD,('adj_A','A','B','A'),{'st':"reduction_16"}),
+        Stage('reduction_68',_reduction_68,('reduction_16','reduction_adj_AA_to_I')),
+        Stage('reduction_18',_transitive,('reduction_16','reduction_68'),monitored=True),
+        Stage('reduction_89',_reduction_89,('reduction_68',)),
+        Stage('reduction_19',_transitive,('reduction_18','reduction_89'),{'repr':"reduction_19"},monitored=True),
+        Stage('LoehrMendes',_confluence,('reduction_15','reduction_19'),{'repr':"LoehrMendes"},monitored=True)])
+    return Pipeline(stages,keep)
+
 class LoehrMendes(SageObject):
     r"""
     This class represents the process as outlined in Theorem 47
+
+    INPUT:
+     - A a Combinatorial Matrix
+     - B a Combinatorial Matrix
+     - red_AB_to_I a ReductionMapsDict of AB to I
+     - repr (optional) a description
+     - lazy (optional) if True, nothing is constructed until it is asked for,
+       and ``evaluate`` and ``evaluate_entry`` follow single elements through
+       the construction instead of building every reduction
+     - processes (optional) the number of worker processes on which the
+       independent stages of the construction run concurrently
+     - instrumentation (optional) an Instrumentation recording each stage;
+       by default a new one without memory tracing is used
+     - checkpoint_dir (optional) a directory in which each completed stage
+       is saved, under the fingerprint of A, B and red_AB_to_I and the code
+       version; a construction with the same inputs loads the saved stages
+       instead of running them
+     - progress (optional) a function called with the progress of the
+       construction and of its longest stages; see ``progress``
+     - cancel (optional) a CancellationToken which stops the construction,
+       and the evaluation of entries when lazy, by raising OperationCancelled
     """
     
-    def __init__(self,A,B,red_AB_to_I,repr=None):
+    def __init__(self,A,B,red_AB_to_I,repr=None,lazy=False,processes=None,instrumentation=None,checkpoint_dir=None,progress=None,cancel=None):
         if repr == None:
             self._repr = "description missing"
         else:
             self._repr = repr
-        _dim = A.nrows()
         self._reduction_AB_to_I = red_AB_to_I
+        self._processes = processes
+        if instrumentation is None:
+            self._instrumentation = Instrumentation()
+        else:
+            self._instrumentation = instrumentation
+        self._checkpoint_dir = checkpoint_dir
+        self._checkpoint = None
+        self._progress = progress
+        self._cancel = cancel
+        self._fingerprint = None
         self._A = A
         self._B = B
-        self._AB = matrix_multiply(self._A,self._B)
-        self._BA = matrix_multiply(self._B,self._A)
-        self._adj_A = matrix_combinatorial_adjoint(self._A)
-        _I = identity_matrix(_dim)
-        _adj_AA = matrix_multiply(self._adj_A,self._A)
-        _det_A = matrix_determinant(self._A)
-        _det_AI = matrix_identity_multiply_scalar(_det_A,_dim,_dim)
-        _reduction_45 = reduction_identity_matrix(_det_AI, "detAI to I or reduction_45")
-        _reduction_adj_AA_to_detAI = reduction_lemma_40(_adj_AA)
-        _reduction_adj_AA_to_I = _reduction_adj_AA_to_detAI.transitive(_reduction_45)
-        #the setup complete
-
-        _reduction_AB_to_I = red_AB_to_I
-        
-        _reduction_12 = reduction_matrix_ABCD_to_ApBCpD(self._adj_A,self._A,self._B,self._A,"reduction_12")
-        _mat2 = _reduction_12.get_matrix_B()
-        _reduction_23 = reduction_lemma_28_23(_mat2, self._reduction_AB_to_I)
-        _reduction_13 = _reduction_12.transitive(_reduction_23)
-        _mat3 = _reduction_23.get_matrix_B()
-        #reduction_13 complete...
-        
-        
-        _reduction_34 = reduction_matrix_AIB_AB(_mat3).transitive(_reduction_adj_AA_to_detAI,"reduction_34")
-        _reduction_35 = _reduction_34.transitive(_reduction_45,"reduction_35")
-        #reduction_35 complete...
-        
-        self._reduction_15 = _reduction_13.transitive(_reduction_35,"reduction_15")
-        #reduction_15 and its dependencies complete
-        
-        
-        _reduction_16 = reduction_matrix_ABCD_to_pABpCD(self._adj_A,self._A,self._B,self._A,"reduction_16")
-        _mat6 = _reduction_16.get_matrix_B()
-        _reduction_68 = reduction_lemma_28_68(_mat6,_reduction_adj_AA_to_I)
-        _reduction_18 = _reduction_16.transitive(_reduction_68)
-        _mat8= _reduction_68.get_matrix_B()
-        #reduction_18 complete...
-        
-        _reduction_89 = reduction_matrix_IAB_AB(_mat8)
-        self._reduction_19 = _reduction_18.transitive(_reduction_89,"reduction_19")
-        #reduction_19 complete
-        
-        self._reduction_LoehrMendes = self._reduction_15.confluence(self._reduction_19, "LoehrMendes")
-        #confluence lemma complete#
+        self._AB = None
+        self._BA = None
+        self._adj_A = None
+        self._constructed = False
+        self._point_reductions = None
+        self._point_setup = None
+        self._entries = dict()
+        if not(lazy):
+            self._construct()
+
+    def _get_checkpoint(self):
+        r"""
+        Returns the Checkpoint of the current inputs, or None when no
+        checkpoint directory was given.
+        """
+        if self._checkpoint_dir is None:
+            return None
+        if self._checkpoint is None:
+            #saved stages of an older version of the construction are not reused
+            key = self.get_fingerprint() + '-v' + str(LOEHR_MENDES_CODE_VERSION)
+            self._checkpoint = Checkpoint(self._checkpoint_dir,key)
+        return self._checkpoint
+
+    def get_fingerprint(self):
+        r"""
+        Returns the fingerprint of A, B and red_AB_to_I, which determine
+        the whole construction; see ``loehr_mendes_fingerprint``.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = loehr_mendes_fingerprint(self._A,self._B,self._reduction_AB_to_I)
+        return self._fingerprint
+
+    def _setup(self):
+        r"""
+        Returns the reductions computed from A alone: the reduction of
+        det(A)I to I, of adj(A)A to det(A)I and of adj(A)A to I.
+        """
+        keep = ('adj_A','reduction_45','reduction_adj_AA_to_detAI','reduction_adj_AA_to_I')
+        out = Pipeline(_setup_stages(),keep).run({'A':self._A},self._processes,self._instrumentation,self._get_checkpoint(),
+                                                 self._progress,self._cancel)
+        if self._adj_A is None:
+            self._adj_A = out['adj_A']
+        return out['reduction_45'], out['reduction_adj_AA_to_detAI'], out['reduction_adj_AA_to_I']
+
+    def _construct(self):
+        r"""
+        Constructs every reduction of the process by running the stages of
+        ``loehr_mendes_pipeline``.  Only the outputs kept as attributes
+        outlive the construction.
+        """
+        inputs = {'A':self._A,'B':self._B,'red_AB_to_I':self._reduction_AB_to_I}
+        out = loehr_mendes_pipeline().run(inputs,self._processes,self._instrumentation,self._get_checkpoint(),
+                                          self._progress,self._cancel)
+        self._instrumentation.finish()
+        self._AB = out['AB']
+        self._BA = out['BA']
+        self._adj_A = out['adj_A']
+        self._reduction_12 = out['reduction_12']
+        self._dependencies = out['dependencies_23']
+        #reduction_35 does not depend on the involutions of red_AB_to_I, so it is
+        #kept to recompute entries after a change to one of them
+        self._reduction_35 = out['reduction_35']
+        self._reduction_15 = out['reduction_15']
+        self._reduction_19 = out['reduction_19']
+        self._reduction_LoehrMendes = out['LoehrMendes']
+        self._constructed = True
+
+    def _construct_if_needed(self):
+        if not(self._constructed):
+            self._construct()
+
+    def _get_point_reductions(self):
+        r"""
+        Returns reductions 15 and 19 as PointReductions, which follow one
+        element at a time.  Only the reductions computed from A alone are
+        constructed in full.
+        """
+        if self._point_reductions is None:
+            if self._point_setup is None:
+                self._point_setup = self._setup()
+            _reduction_45, _reduction_adj_AA_to_detAI, _reduction_adj_AA_to_I = self._point_setup
+            _reduction_13 = RelabelingPointReduction(_ApBCpD_rule,_ApBCpD_inverse_rule).transitive(
+                MiddleInvolutionPointReduction(self._adj_A,self._A,self._reduction_AB_to_I))
+            _reduction_34 = RelabelingPointReduction(_remove_middle_rule,_insert_middle_rule).transitive(
+                EagerPointReduction(_reduction_adj_AA_to_detAI))
+            _reduction_35 = _reduction_34.transitive(EagerPointReduction(_reduction_45))
+            _reduction_15 = _reduction_13.transitive(_reduction_35)
+            _reduction_18 = RelabelingPointReduction(_pABpCD_rule,_pABpCD_inverse_rule).transitive(
+                LeftInvolutionPointReduction(self._A,self._B,_reduction_adj_AA_to_I))
+            _reduction_19 = _reduction_18.transitive(RelabelingPointReduction(_remove_left_rule,_insert_left_rule))
+            self._point_reductions = (_reduction_15,_reduction_19)
+        return self._point_reductions
+
+    def get_dependent_entries(self,row,col):
+        r"""
+        Returns the set of entries (i,j) of reductions 23, 13, 15 and of the
+        confluence reduction which use entry (row,col) of red_AB_to_I.
+        """
+        self._construct_if_needed()
+        return set([key for key in self._dependencies if (row,col) in self._dependencies[key]])
+
+    def update_involution(self,row,col,f):
+        r"""
+        INPUT:
+         - row, col an entry of AB
+         - f a new SRWP involution on AB[row,col]
+
+        Replaces the involution of entry (row,col) of red_AB_to_I by f and
+        recomputes only the entries of reductions 15 and of the confluence
+        reduction which depend on it.  Everything computed from A and B alone,
+        including reduction 19, is reused.
+        """
+        old = self._reduction_AB_to_I[row,col]
+        new = reduction_identity_entry(old.get_A(),old.get_B(),f,row==col)
+        self._reduction_AB_to_I = self._reduction_AB_to_I.replace((row,col),new)
+        self._checkpoint = None
+        self._fingerprint = None
+        if not(self._constructed):
+            self._point_reductions = None
+            self._entries = dict()
+            return
+        for key in self.get_dependent_entries(row,col):
+            _reduction_23 = reduction_lemma_28_23_entry(self._reduction_12[key].get_B(),self._reduction_AB_to_I)
+            _reduction_13 = self._reduction_12[key].transitive(_reduction_23)
+            _reduction_15 = _reduction_13.transitive(self._reduction_35[key])
+            self._reduction_15 = self._reduction_15.replace(key,_reduction_15)
+            self._reduction_LoehrMendes = self._reduction_LoehrMendes.replace(key,_reduction_15.confluence(self._reduction_19[key]))
+
+    def evaluate(self,element,row=None,col=None):
+        r"""
+        INPUT:
+         - element an element of BA[row,col]
+         - row, col (optional) the entry of element; taken from
+           element.get_row() and element.get_col() when missing
+
+        Returns the pair (h(element),h0(element)) where h and h0 are the
+        maps of the confluence reduction of BA to I, and h0(element) is None
+        when element is not a fixed point of h.
+
+        When the construction has not been carried out, the element is
+        followed through reductions 15 and 19 without building them.
+        """
+        if row is None:
+            row = element.get_row()
+        if col is None:
+            col = element.get_col()
+        if row < 0 or col < 0:
+            raise ValueError, "The entry of the element is unknown; enter its row and column"
+        if self._constructed:
+            red = self._reduction_LoehrMendes[row,col]
+            image = red.get_SRWP()(element)
+            if image == element:
+                return (element,red.get_SPWP()(element))
+            return (image,None)
+        _reduction_15, _reduction_19 = self._get_point_reductions()
+        return point_confluence(_reduction_15,_reduction_19,element,(row,col))
+
+    def evaluate_entry(self,i,j):
+        r"""
+        Returns the entry (i,j) of the confluence reduction of BA to I.
+
+        When the construction has not been carried out, only this entry is
+        computed, by following each element of BA[i,j] with ``evaluate``.
+        """
+        if self._constructed:
+            return self._reduction_LoehrMendes[i,j]
+        if (i,j) not in self._entries:
+            if self._BA is None:
+                C = matrix_multiply_entry(self._B,self._A,i,j)
+            else:
+                C = self._BA[i,j]
+            I = identity_matrix(self._A.nrows())
+            dic_h = dict()
+            dic_h0 = dict()
+            for c in C:
+                if self._cancel is not None:
+                    self._cancel.check()
+                image, fixed_image = self.evaluate(c,i,j)
+                dic_h[c] = image
+                if fixed_image is not None:
+                    dic_h0[c] = fixed_image
+            h = FiniteSetMaps(C,C).from_dict(dic_h)
+            h0 = FiniteSetMaps(CombinatorialScalarWrapper(dic_h0.keys()),I[i,j]).from_dict(dic_h0)
+            self._entries[i,j] = ReductionMaps(C,I[i,j],h,h0)
+        return self._entries[i,j]
         
     def __repr__(self):
         return "The Loehr-Mendes Bijection: " + self._repr
 
     def __eq__(self,other):
-        if self.get_confluence_reduction() != other.get_confluence_reduction():
-			return False
-        elif self.get_original_reduction() != other.get_original_reduction():
-			return False
-        elif self._A != other._A:
-			return False
-        elif self._B != other._B:
-			return False
-        else: return True
+        r"""
+        The construction is determined by its inputs, so two instances are
+        equal exactly when the fingerprints of their inputs are.  Since
+        ``update_involution`` changes them, instances are not hashable; use
+        ``get_fingerprint()`` as a key instead.
+        """
+        if not(isinstance(other,LoehrMendes)):
+            return False
+        return self.get_fingerprint() == other.get_fingerprint()
+
+    def __ne__(self,other):
+        return not(self == other)
+
+    #update_involution changes the inputs, so an instance is not hashable;
+    #key by get_fingerprint() instead
+    __hash__ = None
     
     def get_reduction15(self):
+        self._construct_if_needed()
         return self._reduction_15
 
     def get_reduction19(self):
+        self._construct_if_needed()
         return self._reduction_19
     
     def get_confluence_reduction(self):
+        self._construct_if_needed()
         return self._reduction_LoehrMendes
     
+    def get_instrumentation(self):
+        return self._instrumentation
+
+    def get_report(self):
+        r"""
+        Returns the list of records of the stages run so far, each with
+        its wall time, CPU time, memory use, element counts per entry and
+        number of stored map images.  See ``Instrumentation``.
+        """
+        return self._instrumentation.get_report()
+
+    def write_report(self,path):
+        r"""
+        Writes the report of the stages run so far to path as JSON.
+        """
+        self._instrumentation.write_json(path)
+
     def get_original_reduction(self):
         return self._reduction_AB_to_I
     
@@ -120,10 +412,211 @@ class LoehrMendes(SageObject):
         return self._B
     
     def get_leftright(self):
+        if self._AB is None:
+            self._AB = matrix_multiply(self._A,self._B)
         return self._AB
     
     def get_rightleft(self):
+        if self._BA is None:
+            self._BA = matrix_multiply(self._B,self._A)
         return self._BA
     
     def get_adjleft(self):
+        if self._adj_A is None:
+            self._adj_A = matrix_combinatorial_adjoint(self._A)
         return self._adj_A
+
+#the keyword arguments of LoehrMendes which do not change the result
+_MEMO_KEYWORDS = ('repr','lazy','processes','instrumentation','checkpoint_dir','progress','cancel')
+
+class LoehrMendesMemo(SageObject):
+    r"""
+    INPUT:
+     - path (optional) a directory holding the on-disk tier
+     - max_entries (optional) the number of results held in memory
+     - max_bytes (optional) the bound on the size of the on-disk tier
+
+    Memoizes the confluence reduction of the Loehr-Mendes construction by
+    the fingerprint of its inputs.  The most recently used results are held
+    in memory; every result is also stored on disk when a path is given,
+    so that later sessions find it too.  Each call returns its own copy of
+    the result, so changing it does not change what later calls return.
+
+    EXAMPLES::
+
+        sage: m1 = Stirling1Matrix(3); m2 = Stirling2Matrix(3)
+        sage: red = reduction_identity_matrix(matrix_multiply(m2,m1))
+        sage: d = tmp_dir()
+        sage: memo = LoehrMendesMemo(d)
+        sage: red_BA = memo.confluence_reduction(m2,m1,red)
+        sage: again = memo.confluence_reduction(m2,m1,red)
+        sage: again == red_BA, again is red_BA
+        (True, False)
+        sage: memo.get_hits(), memo.get_misses()
+        (1, 1)
+
+    A memo on the same directory, as in a later session, finds the
+    result on disk::
+
+        sage: other = LoehrMendesMemo(d)
+        sage: other.confluence_reduction(m2,m1,red) == red_BA, other.get_misses()
+        (True, 0)
+    """
+    def __init__(self,path=None,max_entries=32,max_bytes=2**30):
+        self._memory = OrderedDict()
+        self._max_entries = max_entries
+        if path is None:
+            self._disk = None
+        else:
+            self._disk = DiskCache(path,max_bytes)
+        self._hits = 0
+        self._misses = 0
+
+    def __repr__(self):
+        return "Memo of " + str(len(self._memory)) + " Loehr-Mendes results in memory"
+
+    def _remember(self,key,value):
+        self._memory[key] = value
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def confluence_reduction(self,A,B,red_AB_to_I,**kwds):
+        r"""
+        Returns a copy of the confluence reduction of
+        LoehrMendes(A,B,red_AB_to_I), constructing it, with the keyword
+        arguments kwds, only when the inputs have not been seen before.
+
+        Only the keyword arguments of ``LoehrMendes`` which do not change
+        the result, listed in ``_MEMO_KEYWORDS``, are accepted, since they
+        are not part of the key.
+        """
+        for name in kwds:
+            if name not in _MEMO_KEYWORDS:
+                raise ValueError, "The keyword argument " + name + " is not accepted by a memo"
+        key = ('LoehrMendes',loehr_mendes_fingerprint(A,B,red_AB_to_I),LOEHR_MENDES_CODE_VERSION)
+        if key in self._memory:
+            self._hits += 1
+            value = self._memory.pop(key)
+            self._memory[key] = value
+            return copy(value)
+        if self._disk is not None:
+            try:
+                value = self._disk.get(key)
+                self._hits += 1
+                self._remember(key,value)
+                return copy(value)
+            except KeyError:
+                pass
+        self._misses += 1
+        value = LoehrMendes(A,B,red_AB_to_I,**kwds).get_confluence_reduction()
+        self._remember(key,value)
+        if self._disk is not None:
+            self._disk.set(key,value)
+        return copy(value)
+
+    def get_hits(self):
+        return self._hits
+
+    def get_misses(self):
+        return self._misses
+
+    def clear(self):
+        r"""
+        Forgets every result, in memory and on disk.
+        """
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+class LoehrMendesIteration(SageObject):
+    r"""
+    INPUT:
+     - A a Combinatorial Matrix
+     - B a Combinatorial Matrix
+     - red_AB_to_I a ReductionMapsDict of AB to I
+     - max_iterations (optional) the number of constructions after which to
+       stop when no cycle has been found
+     - memo (optional) a LoehrMendesMemo through which the constructions run
+     - kwds (optional) keyword arguments passed to ``LoehrMendes``
+
+    Iterates the Loehr-Mendes construction: the confluence reduction of BA
+    to I becomes the reduction of the next state, with the roles of A and
+    B swapped.  Each state (A,B,red_AB_to_I) is fingerprinted, and the
+    iteration stops as soon as a state repeats.
+
+    The construction is an involution on the initial state exactly when
+    the cycle starts at state 0 and has length 2.
+
+    EXAMPLES::
+
+        sage: m1 = Stirling1Matrix(3); m2 = Stirling2Matrix(3)
+        sage: red = reduction_identity_matrix(matrix_multiply(m2,m1))
+        sage: It = LoehrMendesIteration(m2,m1,red,max_iterations=1)
+        sage: It
+        Loehr-Mendes iteration of 2 states without a cycle
+        sage: It.get_cycle_start(), It.is_involution()
+        (None, False)
+        sage: It.get_reductions()[1].get_dim()
+        3
+    """
+    def __init__(self,A,B,red_AB_to_I,max_iterations=100,memo=None,**kwds):
+        self._fingerprints = list()
+        self._reductions = list()
+        self._cycle_start = None
+        self._cycle_length = None
+        seen = dict()
+        red = red_AB_to_I
+        for step in range(max_iterations + 1):
+            key = loehr_mendes_fingerprint(A,B,red)
+            if key in seen:
+                self._cycle_start = seen[key]
+                self._cycle_length = step - seen[key]
+                break
+            seen[key] = step
+            self._fingerprints.append(key)
+            self._reductions.append(red)
+            if step == max_iterations:
+                break
+            if memo is None:
+                red = LoehrMendes(A,B,red,**kwds).get_confluence_reduction()
+            else:
+                red = memo.confluence_reduction(A,B,red,**kwds)
+            A, B = B, A
+
+    def __repr__(self):
+        if self._cycle_start is None:
+            return "Loehr-Mendes iteration of " + str(len(self._reductions)) + " states without a cycle"
+        return "Loehr-Mendes iteration with a cycle of length " + str(self._cycle_length) + " starting at state " + str(self._cycle_start)
+
+    def found_cycle(self):
+        return self._cycle_start is not None
+
+    def get_cycle_start(self):
+        r"""
+        Returns the index of the first state of the cycle, or None if no
+        state repeated within max_iterations.
+        """
+        return self._cycle_start
+
+    def get_cycle_length(self):
+        return self._cycle_length
+
+    def is_involution(self):
+        r"""
+        Returns True if applying the construction twice returns the initial state.
+        """
+        return self._cycle_start == 0 and self._cycle_length == 2
+
+    def get_fingerprints(self):
+        r"""
+        Returns the fingerprints of the distinct states, in order.
+        """
+        return list(self._fingerprints)
+
+    def get_reductions(self):
+        r"""
+        Returns the reductions of the distinct states, in order; the
+        reductions of the odd states are reductions of BA to I.
+        """
+        return list(self._reductions)
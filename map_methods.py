@@ -21,9 +21,11 @@ AUTHORS:
 #                  http://www.gnu.org/licenses/
 #*****************************************************************************
 
-from sage.sets.finite_set_maps import FiniteSetMaps
-from sage.sets.set import Set
+from sage.bijectivematrixalgebra.backend import FiniteSetMaps
+from sage.bijectivematrixalgebra.backend import Set
 from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarWrapper
+from sage.bijectivematrixalgebra.implicit_maps import IdentityMap
+from sage.bijectivematrixalgebra.implicit_maps import RelabelingMap
 
 
 def is_bijection(func):
@@ -64,7 +66,9 @@ def is_involution(func):
 	r"""
 	Returns True if the function is an involution; False otherwise.
 	"""
-	if func.domain() != func.codomain() and not(is_bijection(func)):
+	if isinstance(func,IdentityMap):
+		return True
+	elif func.domain() != func.codomain() and not(is_bijection(func)):
 		return False
 	else:
 		for i in func.domain():
@@ -75,7 +79,12 @@ def is_involution(func):
 def fixed_points(func):
     r"""
     Returns the Combinatorial Scalar of the fixed points of a map.
+    For an IdentityMap this is the whole domain, found without a scan.
     """
+    if isinstance(func,IdentityMap):
+        if isinstance(func.domain(),CombinatorialScalarWrapper):
+            return func.domain()
+        return CombinatorialScalarWrapper(func.domain())
     S = set()
     for i in func.domain():
         if func(i) == i:
@@ -86,6 +95,8 @@ def not_fixed_points(func):
     r"""
     Returns the Combinatorial Scalar of the non-fixed points of a map.
     """
+    if isinstance(func,IdentityMap):
+        return CombinatorialScalarWrapper(set())
     return CombinatorialScalarWrapper(set(func.domain()).difference(fixed_points(func)))
 
 def restrict_map_fixed(func):
@@ -136,7 +147,9 @@ def is_SRWP_involution(func):
     r"""
     Returns True if the function is a sign reversing, weight preserving involution; False otherwise.
     """
-    if not(is_involution(func)):
+    if isinstance(func,IdentityMap):
+        return True
+    elif not(is_involution(func)):
     	return False
     elif is_SRWP(func):
     	return True
@@ -150,6 +163,13 @@ def is_SPWP_bijection(func):
     return is_SPWP and is_bijection(func)
             
 def inverse(func):
+    r"""
+    Returns the inverse of a bijection.
+    """
+    if isinstance(func,IdentityMap):
+        return func
+    elif isinstance(func,RelabelingMap) and func.get_inverse_rule() is not None:
+        return func.inverse()
     dic = func.fibers()
     for i in func.codomain():
         dic[i] = set(dic[i]).pop()
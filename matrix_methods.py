@@ -27,6 +27,8 @@ AUTHORS:
 
 
 from sage.rings.polynomial.polynomial_ring import PolynomialRing_general
+from sage.rings.polynomial.polynomial_ring_constructor import PolynomialRing
+from sage.rings.integer_ring import ZZ
 from sage.matrix.all import matrix
 from sage.matrix.all import MatrixSpace
 from sage.combinat.permutation import *
@@ -35,23 +37,47 @@ from sage.bijectivematrixalgebra.combinatorial_objects import CombinatorialObjec
 from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarWrapper
 from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarRing
 from sage.sets.finite_set_maps import FiniteSetMaps
+from sage.bijectivematrixalgebra.progress import ProgressMonitor
 from copy import copy
 from copy import deepcopy
 
 
-def _product_row(mat1, mat2, row):
+def _product_row(mat1, mat2, row, monitor=None):
     dim = mat1.nrows()
     r = list()
     for j in range(dim):
-        C = CombinatorialScalarWrapper(set())
-        for k in range(dim):
-            C = C + (mat1[row,k]*mat2[k,j])
-            for elm in C:
-                elm.set_row(row)
-                elm.set_col(j)
-        r.append(C)
+        r.append(matrix_multiply_entry(mat1,mat2,row,j,monitor))
     return r
 
+def _product_size(mat1, mat2):
+    r"""
+    Returns the number of elements of the product of mat1 and mat2.
+    """
+    total = 0
+    for i in range(mat1.nrows()):
+        for j in range(mat2.ncols()):
+            for k in range(mat1.ncols()):
+                total += mat1[i,k].get_size()*mat2[k,j].get_size()
+    return total
+
+def matrix_multiply_entry(mat1,mat2,row,col,monitor=None):
+    r"""
+    Returns the entry in position (row,col) of the product of mat1 and mat2
+    without computing the rest of the product.
+    """
+    dim = mat1.ncols()
+    C = CombinatorialScalarWrapper(set())
+    for k in range(dim):
+        C = C + (mat1[row,k]*mat2[k,col])
+        if monitor is not None:
+            monitor.element(mat1[row,k].get_size()*mat2[k,col].get_size())
+    for elm in C:
+        elm.set_row(row)
+        elm.set_col(col)
+    if monitor is not None:
+        monitor.entry_done()
+    return C
+
 def identity_matrix(dim):
     r"""
     Returns standard combinatorial identity matrix
@@ -68,15 +94,21 @@ def identity_matrix(dim):
                 L[i].append(prnt._zero())
     return mat_space(L)
 
-def matrix_multiply(mat1,mat2):
+def matrix_multiply(mat1,mat2,progress=None,cancel=None):
     r"""
     Only works for square matrices.
+
+    Progress is reported after each entry; see ``ProgressMonitor``.
     """
     mat_space = mat1.matrix_space()
     dim = mat_space.nrows()
+    estimate = None
+    if progress is not None:
+        estimate = _product_size(mat1,mat2)
+    monitor = ProgressMonitor("matrix_multiply",dim*dim,estimate,progress,cancel)
     l = list()
     for row in range(dim):
-        l.append(_product_row(mat1,mat2,row))
+        l.append(_product_row(mat1,mat2,row,monitor))
     return mat_space(l)
 
 def matrix_generating_function(m):
@@ -107,14 +139,25 @@ def matrix_remove_row_col(mat,row,col):
             L[len(L)-1].append(mat[x,y])
     return matrix(mat.parent().base_ring(),len(newrows),len(newcols),L)
 
-def matrix_determinant(mat):
+def matrix_determinant(mat,progress=None,cancel=None):
     r"""
     Return determinant scalar, the form of which is:
     (\sigma,a_1,...,a_n) where sign \sigma is sgn(\sigma)
     and weight \sigma is 1.
+
+    Progress is reported after each permutation; see ``ProgressMonitor``.
     """
     dim = mat.nrows()
     P = Permutations(dim)
+    estimate = None
+    if progress is not None:
+        estimate = 0
+        for p in P:
+            size = 1
+            for i in range(1,dim+1):
+                size *= mat[i-1,p(i)-1].get_size()
+            estimate += size
+    monitor = ProgressMonitor("matrix_determinant",P.cardinality(),estimate,progress,cancel)
     S = set()
     for p in P:
         l = list()
@@ -129,11 +172,15 @@ def matrix_determinant(mat):
                 sign = sign*elm.get_sign()
                 weight = weight*elm.get_weight()
             S.add(CombinatorialObject(tuple(i),sign,weight))
+            monitor.element()
+        monitor.entry_done()
     return CombinatorialScalarWrapper(S)
 
-def matrix_combinatorial_adjoint(mat):
+def matrix_combinatorial_adjoint(mat,progress=None,cancel=None):
     r"""
     Return Combinatorial Adjoint.
+
+    Progress is reported after each permutation; see ``ProgressMonitor``.
     """
     dim = mat.nrows()
     M = list()
@@ -146,6 +193,17 @@ def matrix_combinatorial_adjoint(mat):
         for j in range(dim+1):
             L[i].append(set())
     P = Permutations(dim)
+    estimate = None
+    if progress is not None:
+        estimate = 0
+        for p in P:
+            for i in range(1,dim+1):
+                size = 1
+                for k in range(1,dim+1):
+                    if k != i:
+                        size *= mat[p(k)-1,k-1].get_size()
+                estimate += size
+    monitor = ProgressMonitor("matrix_combinatorial_adjoint",P.cardinality(),estimate,progress,cancel)
     for p in P:
         p_comb = CombinatorialScalarWrapper([CombinatorialObject(p,p.signature())])
         l = list()
@@ -168,6 +226,8 @@ def matrix_combinatorial_adjoint(mat):
                     tupel_sign = tupel_sign*elm.get_sign()
                     tupel_weight = tupel_weight*elm.get_weight()
                 L[i][p(i)].add(CombinatorialObject(tupel,tupel_sign,tupel_weight))
+                monitor.element()
+        monitor.entry_done()
     #turn these sets into CombinatorialScalars
     for i in range(1,dim+1):
         l = list()
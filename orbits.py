@@ -0,0 +1,212 @@
+r"""
+Orbits
+
+The orbit decomposition of two SRWP involutions f and g on the same
+scalar, as followed by the confluence lemma (see ``ReductionMaps.confluence``).
+
+The orbits of the group generated by f and g, which are those of f∘g
+together with their reflections, are the components of the graph joining
+each x to f(x) and to g(x).  Each is either a path, alternating between f
+and g, whose two ends are fixed points of f or of g, or a cycle.  The
+engine walks every path from its ends and then every cycle, visiting each
+element once, and returns the result as arrays over the elements sorted by
+fingerprint:
+
+ - orbit[k], the orbit of the k-th element
+ - sequence, the elements orbit by orbit in the order of the walk, with
+   the orbit t occupying sequence[offsets[t]:offsets[t+1]]
+ - lengths[t], the number of elements of the orbit t
+ - endpoints[t], the first and last elements of the path t, or -1 for a cycle
+ - terminations[t], for each end of the orbit t, FIXED_F, FIXED_G or
+   FIXED_BOTH according to the fixed point sets it lies in, or CYCLE
+
+EXAMPLES:
+
+The involution f exchanging 0 with 1 and 3 with 4, and g exchanging 1 with
+2 and 3 with 4, have a path from 0, fixed by g, to 2, fixed by f, and a
+cycle through 3 and 4::
+
+    sage: from sage.bijectivematrixalgebra.orbits import orbit_arrays
+    sage: orbit, sequence, offsets, endpoints, terminations = orbit_arrays([1,0,2,4,3],[0,2,1,4,3])
+    sage: orbit.tolist(), sequence.tolist(), offsets.tolist()
+    ([0, 0, 0, 1, 1], [0, 1, 2, 3, 4], [0, 3, 5])
+    sage: endpoints.tolist(), terminations.tolist()
+    ([[0, 2], [-1, -1]], [[2, 1], [0, 0]])
+
+In entry (3,1) of Stirling21Matrix(4), the involutions of ranks 0 and 1 of
+``InvolutionEnumerator`` share one pair and exchange the other two, which
+gives a cycle of 2 elements and one of 4::
+
+    sage: Ss = Stirling21Matrix(4)
+    sage: E = InvolutionEnumerator(Ss)
+    sage: O = orbit_decomposition(reduction_identity_matrix(Ss,involution_dict=E.unrank(0)),
+    ....:                         reduction_identity_matrix(Ss,involution_dict=E.unrank(1)))
+    sage: O[3,1].number_of_orbits(), sorted(O[3,1].get_lengths().tolist())
+    (2, [2, 4])
+    sage: O[3,1].get_terminations().tolist()
+    [[0, 0], [0, 0]]
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+from sage.bijectivematrixalgebra.reduction_diff import EncodedReduction
+from sage.bijectivematrixalgebra.reduction_maps import ReductionMaps
+import numpy
+
+CYCLE = 0
+FIXED_F = 1
+FIXED_G = 2
+FIXED_BOTH = 3
+
+
+def orbit_arrays(f, g):
+    r"""
+    INPUT:
+     - f, g lists of the images of range(n) under two involutions
+
+    Returns the tuple (orbit, sequence, offsets, endpoints, terminations)
+    of arrays described in the module documentation.
+    """
+    n = len(f)
+    orbit = [-1] * n
+    sequence = list()
+    offsets = [0]
+    endpoints = list()
+    terminations = list()
+    maps = (f, g)
+    def fixed_by(x):
+        return (f[x] == x and FIXED_F) | (g[x] == x and FIXED_G)
+    #paths, from an end
+    for x in range(n):
+        if orbit[x] >= 0 or (f[x] != x and g[x] != x):
+            continue
+        t = len(offsets) - 1
+        start = fixed_by(x)
+        #leave x by the map which does not fix it
+        m = 1 if f[x] == x else 0
+        y = x
+        orbit[y] = t
+        sequence.append(y)
+        while maps[m][y] != y:
+            y = maps[m][y]
+            orbit[y] = t
+            sequence.append(y)
+            m = 1 - m
+        if y == x:
+            end = start
+        else:
+            end = FIXED_G if m == 1 else FIXED_F
+        offsets.append(len(sequence))
+        endpoints.append((x, y))
+        terminations.append((start, end))
+    #cycles
+    for x in range(n):
+        if orbit[x] >= 0:
+            continue
+        t = len(offsets) - 1
+        y = x
+        m = 0
+        while orbit[y] < 0:
+            orbit[y] = t
+            sequence.append(y)
+            y = maps[m][y]
+            m = 1 - m
+        offsets.append(len(sequence))
+        endpoints.append((-1, -1))
+        terminations.append((CYCLE, CYCLE))
+    return (numpy.array(orbit, dtype=numpy.int32),
+            numpy.array(sequence, dtype=numpy.int32),
+            numpy.array(offsets, dtype=numpy.int32),
+            numpy.array(endpoints, dtype=numpy.int32).reshape(len(endpoints), 2),
+            numpy.array(terminations, dtype=numpy.int8).reshape(len(terminations), 2))
+
+
+class OrbitDecomposition(SageObject):
+    r"""
+    INPUT:
+     - first a ReductionMaps of A, with SRWP involution f
+     - second a ReductionMaps of the same A, with SRWP involution g
+
+    The orbits of f and g on A, as arrays over the elements of A sorted
+    by fingerprint; see the module documentation.
+    """
+    def __init__(self, first, second, memo=None):
+        if memo is None:
+            memo = dict()
+        enc_f = EncodedReduction(first, memo)
+        enc_g = EncodedReduction(second, memo)
+        if enc_f.digests_A != enc_g.digests_A:
+            raise ValueError, "The reductions must have the same first scalar"
+        self._elements = enc_f.A
+        self._orbit, self._sequence, self._offsets, self._endpoints, self._terminations = \
+            orbit_arrays(enc_f.f.tolist(), enc_g.f.tolist())
+
+    def __repr__(self):
+        return "Orbit decomposition of " + str(len(self._elements)) + " elements into " + str(self.number_of_orbits()) + " orbits"
+
+    def number_of_orbits(self):
+        return len(self._offsets) - 1
+
+    def get_elements(self):
+        r"""
+        Returns the elements of A in the order indexing the arrays.
+        """
+        return list(self._elements)
+
+    def get_orbit_ids(self):
+        return self._orbit
+
+    def get_sequence(self):
+        return self._sequence
+
+    def get_offsets(self):
+        return self._offsets
+
+    def get_lengths(self):
+        return numpy.diff(self._offsets)
+
+    def get_endpoints(self):
+        return self._endpoints
+
+    def get_terminations(self):
+        return self._terminations
+
+    def get_orbit(self, t):
+        r"""
+        Returns the elements of the orbit t in the order of the walk.
+        """
+        return [self._elements[k] for k in self._sequence[self._offsets[t]:self._offsets[t+1]]]
+
+
+def orbit_decomposition(first, second):
+    r"""
+    INPUT:
+     - first, second two ReductionMapsDicts with the same matrix A, or
+       two ReductionMaps with the same scalar A
+
+    Returns the OrbitDecomposition of their SRWP involutions, or for
+    matrix reductions a dictionary of them keyed by entry.
+    """
+    if isinstance(first, ReductionMaps):
+        return OrbitDecomposition(first, second)
+    if sorted(first.keys()) != sorted(second.keys()):
+        raise ValueError, "The reductions must have the same entries"
+    memo = dict()
+    return dict((key, OrbitDecomposition(first[key], second[key], memo)) for key in first.keys())
@@ -0,0 +1,389 @@
+r"""
+Pipeline
+
+A pipeline is a collection of named stages, each of which is a function
+of the outputs of other stages.  The stages form a directed acyclic graph,
+and the scheduler runs every stage once all of the stages it depends on
+have finished, either in this process or concurrently on a process pool.
+
+The output of a stage is dropped as soon as every stage depending on it
+has finished, unless it is asked to be kept.  This is how the constructions
+of the Loehr-Mendes bijection avoid holding every intermediate reduction
+in memory at once.
+
+Given a ``Checkpoint``, the scheduler saves the result of every stage it
+runs and, on the next run, loads the saved stages instead of running them.
+Only the stages whose outputs are still needed, and which were not saved,
+are run again.
+
+Given a progress function or a ``CancellationToken``, the scheduler reports
+each finished stage as an operation named 'pipeline', whose entries are
+its stages, and checks the token between stages.  Both are also passed on
+to the monitored stages, so that a long stage is stopped while it runs;
+on a process pool only the token is, and it then cancels by its timeout
+alone, since a call to ``cancel`` in this process does not reach the
+workers.  A cancelled run terminates the pool.
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+from sage.bijectivematrixalgebra.instrumentation import measure_call
+from sage.bijectivematrixalgebra.progress import ProgressMonitor
+from multiprocessing import Pool
+import traceback
+
+
+def _call_stage(name, function, args, kwargs, trace_memory=None):
+    r"""
+    Runs a stage in a worker process.  Exceptions are returned rather
+    than raised so that the scheduler can report them.  Unless trace_memory
+    is None, the stage is measured and its record returned with its result.
+    """
+    try:
+        if trace_memory is None:
+            return (name, True, (function(*args, **kwargs), None))
+        else:
+            return (name, True, measure_call(name, function, args, kwargs, trace_memory))
+    except Exception:
+        return (name, False, traceback.format_exc())
+
+
+class Stage(SageObject):
+    r"""
+    INPUT:
+     - name the name of the output of the stage, or a tuple of names
+       when function returns a tuple of that length
+     - function a function; for use on a process pool it must be
+       defined at the top level of a module
+     - dependencies the names of the outputs passed to function,
+       in order, as positional arguments
+     - kwargs (optional) a dictionary of further keyword arguments
+     - monitored (optional) if True, function accepts the keyword arguments
+       progress and cancel of ``progress``, which the scheduler passes on
+    """
+    def __init__(self, name, function, dependencies=(), kwargs=None, monitored=False):
+        self._name = name
+        self._function = function
+        self._dependencies = tuple(dependencies)
+        if kwargs is None:
+            self._kwargs = dict()
+        else:
+            self._kwargs = kwargs
+        self._monitored = monitored
+
+    def __repr__(self):
+        return "Stage " + str(self._name) + " depending on " + str(list(self._dependencies))
+
+    def get_name(self):
+        return self._name
+
+    def get_outputs(self):
+        r"""
+        Returns the tuple of names of the outputs of the stage.
+        """
+        if type(self._name) == tuple:
+            return self._name
+        else:
+            return (self._name,)
+
+    def get_function(self):
+        return self._function
+
+    def get_dependencies(self):
+        return self._dependencies
+
+    def get_kwargs(self):
+        return self._kwargs
+
+    def is_monitored(self):
+        return self._monitored
+
+    def get_call_kwargs(self, progress=None, cancel=None):
+        r"""
+        Returns the keyword arguments of function, with progress and
+        cancel added when the stage is monitored.
+        """
+        if not(self._monitored):
+            return self._kwargs
+        kwargs = dict(self._kwargs)
+        kwargs['progress'] = progress
+        kwargs['cancel'] = cancel
+        return kwargs
+
+
+class Pipeline(SageObject):
+    r"""
+    INPUT:
+     - stages (optional) a list of Stages
+     - keep (optional) the names of the outputs returned by ``run``;
+       all other outputs are dropped once they are no longer needed.
+       If missing, every output is kept.
+
+    EXAMPLES::
+
+        sage: m1 = Stirling1Matrix(3); m2 = Stirling2Matrix(3)
+        sage: P = Pipeline([Stage('AB', matrix_multiply, ('A','B')),
+        ....:               Stage('BA', matrix_multiply, ('B','A'))])
+        sage: out = P.run({'A':m2,'B':m1}, processes=2)
+        sage: sorted(out.keys())
+        ['A', 'AB', 'B', 'BA']
+        sage: out['AB'][2,1].get_size(), out['BA'][2,1].get_size()
+        (2, 2)
+
+    Only the outputs in keep are returned::
+
+        sage: P = Pipeline([Stage('AB', matrix_multiply, ('A','B')),
+        ....:               Stage('ABA', matrix_multiply, ('AB','A'))], keep=['ABA'])
+        sage: P.run({'A':m2,'B':m1}).keys()
+        ['ABA']
+
+    A monitored stage reports its own progress, and the run reports each
+    finished stage; a cancelled token stops the run::
+
+        sage: P = Pipeline([Stage('AB', matrix_multiply, ('A','B'), monitored=True)])
+        sage: reports = []
+        sage: out = P.run({'A':m2,'B':m1}, progress=reports.append)
+        sage: [(r['operation'], r['entries_done']) for r in reports[-2:]]
+        [('matrix_multiply', 9), ('pipeline', 1)]
+        sage: token = CancellationToken()
+        sage: token.cancel()
+        sage: P.run({'A':m2,'B':m1}, cancel=token)
+        Traceback (most recent call last):
+        ...
+        OperationCancelled: The operation was cancelled
+    """
+    def __init__(self, stages=None, keep=None):
+        self._stages = list()
+        self._producers = dict()
+        if keep is None:
+            self._keep = None
+        else:
+            self._keep = set(keep)
+        if stages is not None:
+            for stage in stages:
+                self.add_stage(stage)
+
+    def __repr__(self):
+        return "Pipeline of " + str(len(self._stages)) + " stages"
+
+    def add_stage(self, stage):
+        for name in stage.get_outputs():
+            if name in self._producers:
+                raise ValueError, "Two stages produce " + str(name)
+            self._producers[name] = stage
+        self._stages.append(stage)
+
+    def get_stages(self):
+        return self._stages
+
+    def get_order(self, inputs=(), stages=None):
+        r"""
+        Returns the stages, or the given subset of them, in an order in
+        which each stage comes after the stages it depends on.
+        """
+        if stages is None:
+            stages = self._stages
+        available = set(inputs)
+        order = list()
+        remaining = list(stages)
+        while remaining:
+            ready = [s for s in remaining if available.issuperset(s.get_dependencies())]
+            if not ready:
+                missing = set()
+                for s in remaining:
+                    missing.update(set(s.get_dependencies()).difference(available))
+                raise ValueError, "The stages depend on missing or cyclic outputs " + str(sorted(missing))
+            for s in ready:
+                order.append(s)
+                available.update(s.get_outputs())
+                remaining.remove(s)
+        return order
+
+    def _consumers(self, inputs, stages=None):
+        r"""
+        Returns a dictionary counting the stages which use each output.
+        """
+        if stages is None:
+            stages = self._stages
+        count = dict()
+        for name in inputs:
+            count[name] = 0
+        for stage in stages:
+            for name in stage.get_outputs():
+                count.setdefault(name, 0)
+            for name in stage.get_dependencies():
+                count[name] = count.get(name, 0) + 1
+        return count
+
+    def _store(self, values, stage, result):
+        outputs = stage.get_outputs()
+        if type(stage.get_name()) == tuple:
+            if len(result) != len(outputs):
+                raise ValueError, "Stage " + str(stage.get_name()) + " returned the wrong number of outputs"
+            for name, value in zip(outputs, result):
+                values[name] = value
+        else:
+            values[outputs[0]] = result
+
+    def _release(self, values, consumers, stage):
+        r"""
+        Drops the outputs used by stage which no remaining stage needs.
+        """
+        for name in stage.get_dependencies():
+            consumers[name] -= 1
+            if consumers[name] == 0 and self._keep is not None and name not in self._keep:
+                del values[name]
+        for name in stage.get_outputs():
+            if consumers[name] == 0 and self._keep is not None and name not in self._keep:
+                del values[name]
+
+    def _resume(self, inputs, checkpoint):
+        r"""
+        Returns the pair (stages, loaded) where stages are the stages which
+        must be run and loaded is a dictionary of the outputs of the saved
+        stages which are needed.  A saved stage is loaded instead of run,
+        and the stages it depends on are then not needed on its account.
+        """
+        if self._keep is None:
+            wanted = list(self._producers)
+        else:
+            wanted = [name for name in self._keep if name in self._producers]
+        needed = set()
+        loaded = dict()
+        seen = set()
+        while wanted:
+            name = wanted.pop()
+            if name in inputs or name not in self._producers:
+                continue
+            stage = self._producers[name]
+            if stage.get_outputs() in seen:
+                continue
+            seen.add(stage.get_outputs())
+            if checkpoint.has_stage(stage):
+                self._store(loaded, stage, checkpoint.load_stage(stage))
+            else:
+                needed.add(stage.get_outputs())
+                wanted.extend(stage.get_dependencies())
+        return [s for s in self._stages if s.get_outputs() in needed], loaded
+
+    def _execute(self, stage, args, instrumentation=None, progress=None, cancel=None):
+        r"""
+        Runs a stage in this process.
+        """
+        kwargs = stage.get_call_kwargs(progress, cancel)
+        if instrumentation is None:
+            return stage.get_function()(*args, **kwargs)
+        else:
+            return instrumentation.measure(stage.get_name(), stage.get_function(), args, kwargs)
+
+    def run(self, inputs, processes=None, instrumentation=None, checkpoint=None, progress=None, cancel=None):
+        r"""
+        INPUT:
+         - inputs a dictionary of the outputs which are given rather than computed
+         - processes (optional) the number of worker processes; if missing or 1,
+           the stages are run one at a time in this process
+         - instrumentation (optional) an Instrumentation recording each stage
+         - checkpoint (optional) a Checkpoint from which saved stages are
+           loaded and to which every stage run is saved
+         - progress (optional) a function called with the progress of the run
+         - cancel (optional) a CancellationToken stopping the run
+
+        Returns a dictionary of the outputs to be kept.
+        """
+        if checkpoint is None:
+            stages = self._stages
+            values = dict(inputs)
+        else:
+            stages, values = self._resume(inputs, checkpoint)
+            values.update(inputs)
+        order = self.get_order(values.keys(), stages)
+        consumers = self._consumers(values, stages)
+        monitor = ProgressMonitor("pipeline", len(order), None, progress, cancel)
+        if processes is None or processes <= 1:
+            for stage in order:
+                args = [values[name] for name in stage.get_dependencies()]
+                result = self._execute(stage, args, instrumentation, progress, cancel)
+                del args
+                if checkpoint is not None:
+                    checkpoint.save_stage(stage, result)
+                self._store(values, stage, result)
+                del result
+                self._release(values, consumers, stage)
+                monitor.entry_done()
+        else:
+            self._run_pool(order, values, consumers, processes, instrumentation, checkpoint, monitor, cancel)
+        if self._keep is None:
+            return values
+        return dict((name, values[name]) for name in values if name in self._keep)
+
+    def _run_pool(self, order, values, consumers, processes, instrumentation=None, checkpoint=None, monitor=None, cancel=None):
+        r"""
+        Runs the stages on a pool of worker processes, starting each stage
+        as soon as the stages it depends on have finished.  The outputs of
+        the stages, and their inputs, must be picklable; a stage whose
+        arguments or result cannot be pickled fails the run.
+
+        The monitor counts the finished stages, and cancel, which is checked
+        while waiting on them, is passed on to the monitored stages.
+        """
+        if instrumentation is None:
+            trace_memory = None
+        else:
+            trace_memory = instrumentation.trace_memory()
+        waiting = list(order)
+        running = dict()
+        pool = Pool(processes)
+        try:
+            while waiting or running:
+                for stage in list(waiting):
+                    if all([name in values for name in stage.get_dependencies()]):
+                        args = [values[name] for name in stage.get_dependencies()]
+                        kwargs = stage.get_call_kwargs(None, cancel)
+                        pending = pool.apply_async(_call_stage, (stage.get_name(), stage.get_function(), args, kwargs, trace_memory))
+                        running[stage.get_outputs()] = (stage, pending)
+                        waiting.remove(stage)
+                done = [outputs for outputs in running if running[outputs][1].ready()]
+                if cancel is not None:
+                    cancel.check()
+                if not(done):
+                    #wait on the results themselves rather than on a callback,
+                    #which is never called when a result fails to pickle
+                    running.values()[0][1].wait(0.1)
+                    continue
+                outputs = done[0]
+                stage, pending = running.pop(outputs)
+                ok, result = pending.get()[1:]
+                if not(ok):
+                    raise RuntimeError, "Stage " + str(stage.get_name()) + " failed:\n" + result
+                result, record = result
+                if record is not None:
+                    instrumentation.add_record(record)
+                if checkpoint is not None:
+                    checkpoint.save_stage(stage, result)
+                self._store(values, stage, result)
+                self._release(values, consumers, stage)
+                if monitor is not None:
+                    monitor.entry_done()
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
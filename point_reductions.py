@@ -0,0 +1,292 @@
+r"""
+Point Reductions
+
+Reductions which are evaluated one element at a time.
+
+A ``PointReduction`` represents the reduction of a matrix A to a matrix B
+entry by entry, as a ``ReductionMapsDict`` does, but it never builds the
+maps.  Instead it answers, for a single element x of A[i,j], whether x is
+a fixed point of the SRWP involution, where the involution sends x, where
+the SPWP bijection sends x, and which element the SPWP bijection sends to
+a given element of B[i,j].
+
+These four queries are enough to follow an element through the transitivity
+and confluence lemmas, which is how the Loehr-Mendes bijection is evaluated
+on a handful of elements without constructing every reduction in full.
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.bijectivematrixalgebra.backend import SageObject
+from sage.bijectivematrixalgebra.combinatorial_objects import CombinatorialObject
+from sage.bijectivematrixalgebra.map_methods import inverse
+
+
+def _find_col(mat,row,elm):
+    r"""
+    Returns the column of the entry in the given row of mat containing elm,
+    which must lie in exactly one entry of the row.
+    """
+    cols = [col for col in range(mat.ncols()) if elm in mat[row,col]]
+    if len(cols) == 0:
+        raise ValueError, "Element " + str(elm) + " is not in row " + str(row)
+    elif len(cols) > 1:
+        raise ValueError, "Element " + str(elm) + " is in more than one entry of row " + str(row) + ", in columns " + str(cols)
+    return cols[0]
+
+def _find_row(mat,col,elm):
+    r"""
+    Returns the row of the entry in the given column of mat containing elm,
+    which must lie in exactly one entry of the column.
+    """
+    rows = [row for row in range(mat.nrows()) if elm in mat[row,col]]
+    if len(rows) == 0:
+        raise ValueError, "Element " + str(elm) + " is not in column " + str(col)
+    elif len(rows) > 1:
+        raise ValueError, "Element " + str(elm) + " is in more than one entry of column " + str(col) + ", in rows " + str(rows)
+    return rows[0]
+
+def _triple(a,b,c):
+    return CombinatorialObject((a,b,c),a.get_sign()*b.get_sign()*c.get_sign(),a.get_weight()*b.get_weight()*c.get_weight())
+
+
+class PointReduction(SageObject):
+    r"""
+    Base class of reductions evaluated one element at a time.
+
+    Every method takes an element together with the key (i,j) of the
+    entry it belongs to.  Subclasses must implement is_fixed, srwp, spwp
+    and spwp_inverse.
+    """
+    def _abstract(self,name):
+        raise NotImplementedError, self.__class__.__name__ + " does not implement " + name + ", which every PointReduction must provide"
+
+    def is_fixed(self,x,key):
+        r"""
+        Returns True if x is a fixed point of the SRWP involution.
+        """
+        self._abstract("is_fixed")
+
+    def srwp(self,x,key):
+        r"""
+        Returns the image of x under the SRWP involution.
+        """
+        self._abstract("srwp")
+
+    def spwp(self,x,key):
+        r"""
+        Returns the image of the fixed point x under the SPWP bijection.
+        """
+        self._abstract("spwp")
+
+    def spwp_inverse(self,y,key):
+        r"""
+        Returns the fixed point which the SPWP bijection sends to y.
+        """
+        self._abstract("spwp_inverse")
+
+    def transitive(self,other):
+        return TransitivePointReduction(self,other)
+
+
+class EagerPointReduction(PointReduction):
+    r"""
+    INPUT:
+     - reduction a ReductionMapsDict
+
+    Answers point queries by looking them up in a reduction which has
+    already been constructed.
+    """
+    def __init__(self,reduction):
+        self._reduction = reduction
+        self._inverses = dict()
+
+    def is_fixed(self,x,key):
+        return self._reduction[key].get_SRWP()(x) == x
+
+    def srwp(self,x,key):
+        return self._reduction[key].get_SRWP()(x)
+
+    def spwp(self,x,key):
+        return self._reduction[key].get_SPWP()(x)
+
+    def spwp_inverse(self,y,key):
+        if key not in self._inverses:
+            self._inverses[key] = inverse(self._reduction[key].get_SPWP())
+        return self._inverses[key](y)
+
+
+class RelabelingPointReduction(PointReduction):
+    r"""
+    INPUT:
+     - rule a function rearranging the structure of an object
+     - inverse_rule the inverse of rule
+
+    A reduction whose SRWP involution is the identity and whose SPWP
+    bijection is given by rule, as built by ``reduction_matrix_AIB_AB``,
+    ``reduction_matrix_IAB_AB`` and the ``reduction_matrix_ABCD_*`` methods.
+    """
+    def __init__(self,rule,inverse_rule):
+        self._rule = rule
+        self._inverse_rule = inverse_rule
+
+    def is_fixed(self,x,key):
+        return True
+
+    def srwp(self,x,key):
+        return x
+
+    def spwp(self,x,key):
+        return self._rule(x)
+
+    def spwp_inverse(self,y,key):
+        return self._inverse_rule(y)
+
+
+class TransitivePointReduction(PointReduction):
+    r"""
+    INPUT:
+     - first a PointReduction of A to B
+     - second a PointReduction of B to C
+
+    The reduction of A to C given by the transitivity lemma,
+    see ``ReductionMaps.transitive``.
+    """
+    def __init__(self,first,second):
+        self._first = first
+        self._second = second
+
+    def is_fixed(self,x,key):
+        if not(self._first.is_fixed(x,key)):
+            return False
+        return self._second.is_fixed(self._first.spwp(x,key),key)
+
+    def srwp(self,x,key):
+        if not(self._first.is_fixed(x,key)):
+            return self._first.srwp(x,key)
+        y = self._first.spwp(x,key)
+        if self._second.is_fixed(y,key):
+            return x
+        return self._first.spwp_inverse(self._second.srwp(y,key),key)
+
+    def spwp(self,x,key):
+        return self._second.spwp(self._first.spwp(x,key),key)
+
+    def spwp_inverse(self,z,key):
+        return self._first.spwp_inverse(self._second.spwp_inverse(z,key),key)
+
+
+class MiddleInvolutionPointReduction(PointReduction):
+    r"""
+    INPUT:
+     - adj_A the combinatorial adjoint of A
+     - A a matrix
+     - red_AB_to_I a ReductionMapsDict of AB to I
+
+    The reduction of adj(A)(AB)A to adj(A)IA given by lemma 28,
+    see ``reduction_lemma_28_23``.  The entry of AB containing the
+    middle element of (a,m,d) in entry (i,j) is located from a and d.
+    """
+    def __init__(self,adj_A,A,red_AB_to_I):
+        self._adj_A = adj_A
+        self._A = A
+        self._reduction = EagerPointReduction(red_AB_to_I)
+
+    def _key(self,x,key):
+        obj = x.get_object()
+        return (_find_col(self._adj_A,key[0],obj[0]),_find_row(self._A,key[1],obj[2]))
+
+    def is_fixed(self,x,key):
+        return self._reduction.is_fixed(x.get_object()[1],self._key(x,key))
+
+    def srwp(self,x,key):
+        obj = x.get_object()
+        return _triple(obj[0],self._reduction.srwp(obj[1],self._key(x,key)),obj[2])
+
+    def spwp(self,x,key):
+        obj = x.get_object()
+        tmp = self._reduction.spwp(obj[1],self._key(x,key))
+        return CombinatorialObject((obj[0],tmp,obj[2]),x.get_sign(),x.get_weight())
+
+    def spwp_inverse(self,y,key):
+        obj = y.get_object()
+        tmp = self._reduction.spwp_inverse(obj[1],self._key(y,key))
+        return CombinatorialObject((obj[0],tmp,obj[2]),y.get_sign(),y.get_weight())
+
+
+class LeftInvolutionPointReduction(PointReduction):
+    r"""
+    INPUT:
+     - A a matrix
+     - B a matrix
+     - red_adjAA_to_I a ReductionMapsDict of adj(A)A to I
+
+    The reduction of (adj(A)A)BA to IBA given by lemma 28,
+    see ``reduction_lemma_28_68``.  The entry of adj(A)A containing the
+    left element of (p,c,d) in entry (i,j) is located from c and d.
+    """
+    def __init__(self,A,B,red_adjAA_to_I):
+        self._A = A
+        self._B = B
+        self._reduction = EagerPointReduction(red_adjAA_to_I)
+
+    def _key(self,x,key):
+        obj = x.get_object()
+        m = _find_row(self._A,key[1],obj[2])
+        return (key[0],_find_row(self._B,m,obj[1]))
+
+    def is_fixed(self,x,key):
+        return self._reduction.is_fixed(x.get_object()[0],self._key(x,key))
+
+    def srwp(self,x,key):
+        obj = x.get_object()
+        return _triple(self._reduction.srwp(obj[0],self._key(x,key)),obj[1],obj[2])
+
+    def spwp(self,x,key):
+        obj = x.get_object()
+        tmp = self._reduction.spwp(obj[0],self._key(x,key))
+        return CombinatorialObject((tmp,obj[1],obj[2]),x.get_sign(),x.get_weight())
+
+    def spwp_inverse(self,y,key):
+        obj = y.get_object()
+        tmp = self._reduction.spwp_inverse(obj[0],self._key(y,key))
+        return CombinatorialObject((tmp,obj[1],obj[2]),y.get_sign(),y.get_weight())
+
+
+def point_confluence(left,right,c,key):
+    r"""
+    INPUT:
+     - left a PointReduction of X to B, B fully cancelled
+     - right a PointReduction of X to C
+     - c an element of C[key]
+
+    Returns the pair (h(c),h0(c)) where h and h0 are the maps of the
+    reduction of C to B given by the confluence lemma, and h0(c) is None
+    when c is not a fixed point of h.  See ``ReductionMaps.confluence``.
+    """
+    x = right.spwp_inverse(c,key)
+    while True:
+        if left.is_fixed(x,key): #a fixed point of h
+            return (c,left.spwp(x,key))
+        else:
+            x = left.srwp(x,key)
+        if right.is_fixed(x,key): #not a fixed point of h
+            return (right.spwp(x,key),None)
+        else:
+            x = right.srwp(x,key)
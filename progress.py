@@ -0,0 +1,149 @@
+r"""
+Progress and Cancellation
+
+Long-running constructions (``matrix_multiply``, ``matrix_determinant``,
+``matrix_combinatorial_adjoint``, the ``transitive`` and ``confluence``
+methods of ``ReductionMapsDict``, ``Pipeline.run`` and ``LoehrMendes``)
+accept two optional arguments:
+
+ - progress a function called with a dictionary describing the progress
+   of the operation, with keys 'operation', 'entries_done', 'entries_total',
+   'elements' and 'estimated_elements'
+ - cancel a CancellationToken which the operation checks periodically,
+   raising OperationCancelled once it has been cancelled
+
+EXAMPLES::
+
+    sage: m1 = Stirling1Matrix(3); m2 = Stirling2Matrix(3)
+    sage: reports = []
+    sage: Ss = matrix_multiply(m2,m1,progress=reports.append,cancel=CancellationToken(timeout=600))
+    sage: len(reports)
+    9
+    sage: p = reports[-1]
+    sage: p['operation'], p['entries_done'], p['entries_total'], p['elements'], p['estimated_elements']
+    ('matrix_multiply', 9, 9, 5, 5)
+    sage: token = CancellationToken()
+    sage: token.cancel()
+    sage: matrix_multiply(m2,m1,cancel=token)
+    Traceback (most recent call last):
+    ...
+    OperationCancelled: The operation was cancelled
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+import time
+
+
+class OperationCancelled(Exception):
+    r"""
+    Raised by an operation whose CancellationToken has been cancelled.
+    """
+    pass
+
+
+class CancellationToken(object):
+    r"""
+    INPUT:
+     - timeout (optional) a number of seconds after which the token
+       cancels itself
+
+    A flag shared between an operation and whoever may want to stop it.
+    """
+    def __init__(self, timeout=None):
+        self._cancelled = False
+        if timeout is None:
+            self._deadline = None
+        else:
+            self._deadline = time.time() + timeout
+
+    def __repr__(self):
+        if self.is_cancelled():
+            return "Cancelled token"
+        return "Cancellation token"
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        if not(self._cancelled) and self._deadline is not None and time.time() >= self._deadline:
+            self._cancelled = True
+        return self._cancelled
+
+    def check(self):
+        r"""
+        Raises OperationCancelled if the token has been cancelled.
+        """
+        if self.is_cancelled():
+            raise OperationCancelled, "The operation was cancelled"
+
+
+class ProgressMonitor(object):
+    r"""
+    INPUT:
+     - operation the name of the operation
+     - entries_total the number of entries the operation computes
+     - estimated_elements (optional) the number of elements it is expected to produce
+     - progress (optional) a function called with the progress of the operation
+     - cancel (optional) a CancellationToken
+     - period (optional) the number of elements between checks of cancel
+
+    Used inside an operation to count its work, report it and check for
+    cancellation.  Progress is reported after each entry.
+    """
+    def __init__(self, operation, entries_total, estimated_elements=None, progress=None, cancel=None, period=1024):
+        self._operation = operation
+        self._entries_total = entries_total
+        self._entries_done = 0
+        self._elements = 0
+        self._estimated_elements = estimated_elements
+        self._progress = progress
+        self._cancel = cancel
+        self._period = period
+        self._countdown = period
+        if cancel is not None:
+            cancel.check()
+
+    def element(self, n=1):
+        r"""
+        Counts n produced elements, checking for cancellation periodically.
+        """
+        self._elements += n
+        self._countdown -= n
+        if self._countdown <= 0:
+            self._countdown = self._period
+            if self._cancel is not None:
+                self._cancel.check()
+
+    def entry_done(self):
+        r"""
+        Counts a finished entry, checks for cancellation and reports progress.
+        """
+        self._entries_done += 1
+        if self._cancel is not None:
+            self._cancel.check()
+        if self._progress is not None:
+            self._progress(self.get_progress())
+
+    def get_progress(self):
+        return {'operation':self._operation,
+                'entries_done':self._entries_done,
+                'entries_total':self._entries_total,
+                'elements':self._elements,
+                'estimated_elements':self._estimated_elements}
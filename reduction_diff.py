@@ -0,0 +1,205 @@
+r"""
+Reduction Diff
+
+Compares two ReductionMapsDicts entry by entry and reports the elements
+on which they differ.
+
+Entries with equal fingerprints are skipped at once.  The others are
+encoded as arrays: the elements of each side sorted by fingerprint, f as
+the array of the positions of the images of the elements of A, and f0 as
+the array of the positions in B of the images of the fixed points, or -1.
+When both reductions of an entry have the same A and B, which is the case
+when comparing an output of the Loehr-Mendes construction with an earlier
+one, the maps are compared as integer arrays in one step.
+
+EXAMPLES::
+
+Two reductions of Stirling21Matrix(4) to I, built from the same
+involutions, do not differ::
+
+    sage: Ss = Stirling21Matrix(4)
+    sage: E = InvolutionEnumerator(Ss)
+    sage: D = diff_reductions(reduction_identity_matrix(Ss,involution_dict=E.unrank(0)),
+    ....:                     reduction_identity_matrix(Ss,involution_dict=E.unrank(0)))
+    sage: D
+    Difference of two reductions in 0 entries
+    sage: D.is_empty(), D.get_differences(3,1)
+    (True, [])
+
+Ranks 0 and 1 differ only in the involution of entry (3,1), on two of
+its three pairs, so on four of its six elements::
+
+    sage: D = diff_reductions(reduction_identity_matrix(Ss,involution_dict=E.unrank(0)),
+    ....:                     reduction_identity_matrix(Ss,involution_dict=E.unrank(1)))
+    sage: D.get_differing_entries()
+    [(3, 1)]
+    sage: s = D.get_summary()[3,1]
+    sage: s['only_first'], s['only_second'], s['srwp'], s['spwp']
+    (0, 0, 4, 0)
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+from sage.bijectivematrixalgebra.fingerprints import element_fingerprint
+import numpy
+
+
+class EncodedReduction(object):
+    r"""
+    INPUT:
+     - red a ReductionMaps
+
+    The maps of red as integer arrays over its elements sorted by fingerprint.
+    """
+    def __init__(self, red, memo=None):
+        if memo is None:
+            memo = dict()
+        A = list(red.get_A())
+        B = list(red.get_B())
+        digests_A = [element_fingerprint(x, memo) for x in A]
+        digests_B = [element_fingerprint(y, memo) for y in B]
+        order_A = sorted(range(len(A)), key=digests_A.__getitem__)
+        order_B = sorted(range(len(B)), key=digests_B.__getitem__)
+        self.A = [A[k] for k in order_A]
+        self.B = [B[k] for k in order_B]
+        self.digests_A = [digests_A[k] for k in order_A]
+        self.digests_B = [digests_B[k] for k in order_B]
+        position_A = dict((d, k) for k, d in enumerate(self.digests_A))
+        position_B = dict((d, k) for k, d in enumerate(self.digests_B))
+        f = red.get_SRWP()
+        f0 = red.get_SPWP()
+        self.f = numpy.empty(len(A), dtype=numpy.int32)
+        self.f0 = numpy.empty(len(A), dtype=numpy.int32)
+        for k, x in enumerate(self.A):
+            self.f[k] = position_A[element_fingerprint(f(x), memo)]
+            if self.f[k] == k:
+                self.f0[k] = position_B[element_fingerprint(f0(x), memo)]
+            else:
+                self.f0[k] = -1
+
+    def srwp_image(self, k):
+        return self.A[self.f[k]]
+
+    def spwp_image(self, k):
+        if self.f0[k] < 0:
+            return None
+        return self.B[self.f0[k]]
+
+
+def _diff_entry(first, second):
+    r"""
+    Returns the pair (summary, differences) for two EncodedReductions.
+    """
+    if first.digests_A == second.digests_A and first.digests_B == second.digests_B:
+        only_first = only_second = 0
+        srwp = first.f != second.f
+        spwp = first.f0 != second.f0
+        pairs = [(k, k) for k in numpy.nonzero(srwp | spwp)[0]]
+    else:
+        position = dict((d, k) for k, d in enumerate(second.digests_A))
+        matched = [(k, position[d]) for k, d in enumerate(first.digests_A) if d in position]
+        only_first = len(first.A) - len(matched)
+        only_second = len(second.A) - len(matched)
+        if matched:
+            k1 = numpy.array([m[0] for m in matched])
+            k2 = numpy.array([m[1] for m in matched])
+        else:
+            k1 = k2 = numpy.zeros(0, dtype=numpy.int64)
+        #compare images by their fingerprints, as the sides may be ordered differently
+        digests_A1 = numpy.array(first.digests_A + [''], dtype=object)
+        digests_A2 = numpy.array(second.digests_A + [''], dtype=object)
+        digests_B1 = numpy.array(first.digests_B + [''], dtype=object)
+        digests_B2 = numpy.array(second.digests_B + [''], dtype=object)
+        srwp = digests_A1[first.f[k1]] != digests_A2[second.f[k2]]
+        spwp = digests_B1[first.f0[k1]] != digests_B2[second.f0[k2]]
+        pairs = [(int(k1[m]), int(k2[m])) for m in numpy.nonzero(srwp | spwp)[0]]
+    summary = {'only_first': only_first,
+               'only_second': only_second,
+               'srwp': int(numpy.count_nonzero(srwp)),
+               'spwp': int(numpy.count_nonzero(spwp))}
+    differences = list()
+    for k1, k2 in pairs:
+        differences.append({'element': first.A[k1],
+                            'srwp': (first.srwp_image(k1), second.srwp_image(k2)),
+                            'spwp': (first.spwp_image(k1), second.spwp_image(k2))})
+    return summary, differences
+
+
+class ReductionDiff(SageObject):
+    r"""
+    INPUT:
+     - first a ReductionMapsDict
+     - second a ReductionMapsDict of the same dimension
+
+    The differences between first and second.  For each entry the summary
+    counts the elements of A found in only one of them, and the common
+    elements whose SRWP images, or SPWP images, differ.  Each difference
+    is a dictionary with the element and the pairs of its images under
+    the SRWP involutions and under the SPWP bijections, None standing for
+    no image.
+    """
+    def __init__(self, first, second):
+        if sorted(first.keys()) != sorted(second.keys()):
+            raise ValueError, "The reductions must have the same entries"
+        self._summary = dict()
+        self._differences = dict()
+        memo = dict()
+        for key in sorted(first.keys()):
+            if first[key].get_fingerprint() == second[key].get_fingerprint():
+                self._summary[key] = {'only_first':0, 'only_second':0, 'srwp':0, 'spwp':0}
+                self._differences[key] = list()
+            else:
+                self._summary[key], self._differences[key] = _diff_entry(
+                    EncodedReduction(first[key], memo), EncodedReduction(second[key], memo))
+
+    def __repr__(self):
+        return "Difference of two reductions in " + str(len(self.get_differing_entries())) + " entries"
+
+    def is_empty(self):
+        return not(self.get_differing_entries())
+
+    def get_differing_entries(self):
+        return [key for key in sorted(self._summary) if any(self._summary[key].values())]
+
+    def get_summary(self):
+        r"""
+        Returns the dictionary of the summary counts of each entry.
+        """
+        return dict(self._summary)
+
+    def get_differences(self, i, j):
+        r"""
+        Returns the list of differences in entry (i,j).
+        """
+        return list(self._differences[i,j])
+
+    def print_differences(self):
+        for key in self.get_differing_entries():
+            print "row: " + str(key[0]) + ", column: " + str(key[1]) + ", " + str(self._summary[key])
+            for d in self._differences[key]:
+                print str(d['element']) + ": SRWP " + str(d['srwp'][0]) + " vs " + str(d['srwp'][1]) + \
+                      ", SPWP " + str(d['spwp'][0]) + " vs " + str(d['spwp'][1])
+            print "***********************************"
+
+def diff_reductions(first, second):
+    r"""
+    Returns the ReductionDiff of two ReductionMapsDicts.
+    """
+    return ReductionDiff(first, second)
@@ -33,11 +33,15 @@ from sage.bijectivematrixalgebra.map_methods import fixed_points
 from sage.bijectivematrixalgebra.map_methods import is_SRWP_involution
 from sage.bijectivematrixalgebra.map_methods import is_SPWP_bijection
 from sage.bijectivematrixalgebra.map_methods import inverse
-from sage.sets.finite_set_maps import FiniteSetMaps
-from sage.structure.sage_object import SageObject
-from sage.sets.finite_set_map_cy import FiniteSetEndoMap_Set
-from sage.sets.finite_set_maps import FiniteSetMap_Set
+from sage.bijectivematrixalgebra.fingerprints import reduction_fingerprint
+from sage.bijectivematrixalgebra.implicit_maps import ImplicitMap
+from sage.bijectivematrixalgebra.implicit_maps import IdentityMap
+from sage.bijectivematrixalgebra.backend import FiniteSetMaps
+from sage.bijectivematrixalgebra.backend import SageObject
+from sage.bijectivematrixalgebra.backend import FiniteSetEndoMap_Set
+from sage.bijectivematrixalgebra.backend import FiniteSetMap_Set
 from copy import copy
+from array import array
 #from sage.symbolic.expression import Expression
 
 
@@ -49,6 +53,9 @@ class ReductionMaps(SageObject):
      - B a Combinatorial Scalar
      - f a SRWP involution on A
      - f0 a SPWP bijection from fixed(f) to B
+
+    The maps f and f0 are either maps in FiniteSetMaps or implicit maps
+    (see ``IdentityMap`` and ``RelabelingMap``).
     
         
     EXAMPLES::
@@ -56,20 +63,29 @@ class ReductionMaps(SageObject):
     TBD
 
     """
-    def __init__(self, A,B,f,f0):
+    def __init__(self, A,B,f,f0,check=True):
         r"""
-        TBD
+        Checks the inputs unless check is False, which is meant for maps
+        already known to be valid, such as those of ``InvolutionSampler``.
         """
-        
+        if check:
+            self._check(A,B,f,f0)
+        self._A = A
+        self._B = B
+        self._f = f
+        self._f0 = f0
+        self._fingerprint = None
+
+    def _check(self,A,B,f,f0):
         if type(A)!=CombinatorialScalarWrapper:
             raise ValueError, "The first input must be a Combinatorial Scalar Wrapper"
         elif type(B)!=CombinatorialScalarWrapper:
             raise ValueError, "The second input must be a Combinatorial Scalar Wrapper"
         elif not(bool(A.get_generating_function()==B.get_generating_function())):
             raise ValueError, "The generating functions of the scalars are not equal"
-        elif type(f)!= FiniteSetMap_Set and type(f) != FiniteSetEndoMap_Set:
+        elif type(f)!= FiniteSetMap_Set and type(f) != FiniteSetEndoMap_Set and not(isinstance(f,ImplicitMap)):
             raise ValueError, "The third input must be a map in FiniteSetMaps"
-        elif type(f0) != FiniteSetMap_Set and type(f0) != FiniteSetEndoMap_Set:
+        elif type(f0) != FiniteSetMap_Set and type(f0) != FiniteSetEndoMap_Set and not(isinstance(f0,ImplicitMap)):
             raise ValueError, "The fourth input must be a map in FiniteSetMaps"
         elif set(f.domain()) != set(A):
             raise ValueError, "The third input must have domain of first input"
@@ -81,23 +97,62 @@ class ReductionMaps(SageObject):
             raise ValueError, "The third input must be an SRWP involution"
         elif not(is_SPWP_bijection(f0)):
             raise ValueError, "The fourth input must be an SPWP bijection"
-        else:
-            self._A = A
-            self._B = B
-            self._f = f
-            self._f0 = f0
 
     def __eq__(self,other):
-        if self.get_A() != other.get_A():
-            return False
-        elif self.get_B() != other.get_B():
-            return False
-        elif self.get_SRWP() != other.get_SRWP():
-            return False
-        elif self.get_SPWP() != other.get_SPWP():
+        if not(isinstance(other,ReductionMaps)):
             return False
+        return self.get_fingerprint() == other.get_fingerprint()
+
+    def __ne__(self,other):
+        return not(self == other)
+
+    def __hash__(self):
+        return hash(self.get_fingerprint())
+
+    def __reduce__(self):
+        r"""
+        Pickles the reduction as its scalars, the lists of their elements,
+        and its maps as strings of indices into those lists, -1 standing for
+        no image.  Implicit maps are pickled as they are.
+
+        EXAMPLES::
+
+            sage: red = reduction_identity_matrix(Stirling21Matrix(4))
+            sage: loads(dumps(red[3,1])) == red[3,1]
+            True
+            sage: R = loads(dumps(red))
+            sage: R == red, R.get_dim()
+            (True, 4)
+        """
+        A = list(self._A)
+        B = list(self._B)
+        if isinstance(self._f,ImplicitMap):
+            f = self._f
+        else:
+            index_A = dict((x,k) for k,x in enumerate(A))
+            f = array('i',[index_A[self._f(x)] for x in A]).tostring()
+        if isinstance(self._f0,ImplicitMap):
+            f0 = self._f0
         else:
-            return True
+            index_B = dict((y,k) for k,y in enumerate(B))
+            fixed = set(self._f0.domain())
+            f0 = array('i',[index_B[self._f0(x)] if x in fixed else -1 for x in A]).tostring()
+        return (_unpickle_reduction,(self._A,self._B,A,B,f,f0,getattr(self,'_fingerprint',None)))
+
+    def __copy__(self):
+        red = type(self).__new__(type(self))
+        red.__dict__.update(self.__dict__)
+        return red
+
+    def get_fingerprint(self):
+        r"""
+        Returns the canonical content hash of this reduction, computed on
+        first use; see ``reduction_fingerprint``.  Two reductions are equal
+        exactly when their fingerprints are.
+        """
+        if getattr(self,'_fingerprint',None) is None:
+            self._fingerprint = reduction_fingerprint(self)
+        return self._fingerprint
 
     def __repr__(self):
         return "This represents the reduction of " + str(list(self._A)) + " to " + str(list(self._B)) + "."
@@ -129,7 +184,8 @@ class ReductionMaps(SageObject):
     def print_involution(self):
         func = self.get_SRWP()
         for i in func.domain():
-            print str(i) + ", " + str(i.get_sign()) + " --> " + str(func(i)) + ", " + str(func(i).get_sign())
+            image = func(i)
+            print "%s, %s --> %s, %s" % (i, i.get_sign(), image, image.get_sign())
 
     def reverse(self):
         if self.get_A().get_size() != self.get_B().get_size():
@@ -138,15 +194,14 @@ class ReductionMaps(SageObject):
             A = self.get_B()
             B = self.get_A()
             f0 = inverse(self.get_SPWP())
-            dic_f = dict()
-            for elm in A:
-                dic_f[elm] = elm
-            f = FiniteSetMaps(A,A).from_dict(dic_f)
+            f = IdentityMap(A)
             return ReductionMaps(A,B,f,f0)
 
-    def transitive(self,other=None):
+    def transitive(self,other=None,monitor=None):
         r"""
-        TBD
+        Returns the reduction of A to C, where the usage is:
+        r1.transitive(r2), and r1 maps A to B and r2 maps B to C.
+        Each element is counted by monitor, a ProgressMonitor, if given.
         """
         if other is None:
             raise ValueError, "Enter a reduction map as a parameter"
@@ -171,15 +226,18 @@ class ReductionMaps(SageObject):
                         dic_h[elm] = inverse(f0)(g(f0(elm)))
                 else:
                     dic_h[elm] = f(elm)
+                if monitor is not None:
+                    monitor.element()
             h = FiniteSetMaps(A,A).from_dict(dic_h)
             h0 = FiniteSetMaps(CombinatorialScalarWrapper(dic_h0.keys()),C).from_dict(dic_h0)
             return ReductionMaps(A,C,h,h0)
 
-    def confluence(self,other=None):
+    def confluence(self,other=None,monitor=None):
         r"""
         Returns the reduction of C to B, where the usage is:
         r1.confluence(r2), and r1 maps A to B, B fully cancelled,
         and r2 maps A to C.
+        Each element is counted by monitor, a ProgressMonitor, if given.
         """
         if other is None:
             raise ValueError, "Enter a redution map as a parameter"
@@ -213,6 +271,25 @@ class ReductionMaps(SageObject):
                         break
                     else:
                         x = g(x)
+                if monitor is not None:
+                    monitor.element()
             h = FiniteSetMaps(C,C).from_dict(dic_h)
             h0 = FiniteSetMaps(CombinatorialScalarWrapper(dic_h0.keys()),B).from_dict(dic_h0)
             return ReductionMaps(C,B,h,h0)
+
+def _unpickle_reduction(A,B,elements_A,elements_B,f,f0,fingerprint):
+    r"""
+    Rebuilds a reduction pickled by ``ReductionMaps.__reduce__``.
+    """
+    if not(isinstance(f,ImplicitMap)):
+        images = array('i')
+        images.fromstring(f)
+        f = FiniteSetMaps(A,A).from_dict(dict((x,elements_A[k]) for x,k in zip(elements_A,images)))
+    if not(isinstance(f0,ImplicitMap)):
+        images = array('i')
+        images.fromstring(f0)
+        d = dict((x,elements_B[k]) for x,k in zip(elements_A,images) if k >= 0)
+        f0 = FiniteSetMaps(CombinatorialScalarWrapper(d.keys()),B).from_dict(d)
+    red = ReductionMaps(A,B,f,f0,check=False)
+    red._fingerprint = fingerprint
+    return red
@@ -28,11 +28,11 @@ AUTHORS:
 #*****************************************************************************
 
 from sage.bijectivematrixalgebra.reduction_maps import ReductionMaps
-from sage.functions.other import sqrt
-from sage.matrix.all import matrix
-from sage.matrix.all import MatrixSpace
 from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarRing
-from copy import copy
+from sage.bijectivematrixalgebra.progress import ProgressMonitor
+from sage.bijectivematrixalgebra.fingerprints import reduction_dict_fingerprint
+from copy import copy
+import math
 
 
 
@@ -51,7 +51,7 @@ class ReductionMapsDict(dict):
         self._reduction_dic = dic
         for key in dic.keys():
             self[key] = copy(dic[key])
-        self._dim = int(sqrt(len(self.keys())))
+        self._dim = int(math.sqrt(len(self.keys())))
         self._repr = repr
         if self._repr is None:
             self._repr = "This is a matrix reduction object: description missing"
@@ -62,8 +62,69 @@ class ReductionMapsDict(dict):
 
     def __repr__(self):
         return self._repr
+
+    def __setitem__(self,key,value):
+        self._fingerprint = None
+        dict.__setitem__(self,key,value)
+
+    def __delitem__(self,key):
+        self._fingerprint = None
+        dict.__delitem__(self,key)
+
+    #the other mutators of dict do not go through __setitem__ or __delitem__,
+    #so each of them also forgets the fingerprint
+
+    def update(self,*args,**kwds):
+        self._fingerprint = None
+        dict.update(self,*args,**kwds)
+
+    def pop(self,*args):
+        self._fingerprint = None
+        return dict.pop(self,*args)
+
+    def popitem(self):
+        self._fingerprint = None
+        return dict.popitem(self)
+
+    def setdefault(self,key,default=None):
+        self._fingerprint = None
+        return dict.setdefault(self,key,default)
+
+    def clear(self):
+        self._fingerprint = None
+        dict.clear(self)
+
+    def __eq__(self,other):
+        if not(isinstance(other,ReductionMapsDict)):
+            return False
+        return self.get_fingerprint() == other.get_fingerprint()
+
+    def __ne__(self,other):
+        return not(self == other)
+
+    #a mutable dictionary is not hashable; key by get_fingerprint() instead
+    __hash__ = None
+
+    def __reduce__(self):
+        r"""
+        Pickles the entries once, rather than together with the dictionary
+        they were copied from.
+        """
+        return (ReductionMapsDict,(dict(self),),{'_repr':self._repr,'_fingerprint':getattr(self,'_fingerprint',None)})
+
+    def get_fingerprint(self):
+        r"""
+        Returns the canonical content hash of this matrix reduction, computed
+        on first use and again only after an entry is set; see
+        ``reduction_dict_fingerprint``.
+        """
+        if getattr(self,'_fingerprint',None) is None:
+            self._fingerprint = reduction_dict_fingerprint(self)
+        return self._fingerprint
         
     def get_matrix_A(self):
+        #imported here so that the plain Python backend can load this module
+        from sage.matrix.all import MatrixSpace
         dim = self.get_dim()
         mat_space = MatrixSpace(CombinatorialScalarRing(),dim)
         L = list()
@@ -74,6 +135,7 @@ class ReductionMapsDict(dict):
         return mat_space(L)
 
     def get_matrix_B(self):
+        from sage.matrix.all import MatrixSpace
         dim = self.get_dim()
         mat_space = MatrixSpace(CombinatorialScalarRing(),dim)
         L = list()
@@ -89,6 +151,17 @@ class ReductionMapsDict(dict):
     def get_dim(self):
         return self._dim
 
+    def replace(self,key,reduction):
+        r"""
+        Returns a copy of this matrix reduction with the entry key
+        replaced by the ReductionMaps reduction.
+        """
+        d = dict(self.get_reduction_dict())
+        d[key] = reduction
+        new = ReductionMapsDict(d)
+        new._repr = self._repr
+        return new
+
     def reverse(self,repr=None):
         dim = self.get_dim()
         d = dict()
@@ -104,24 +177,34 @@ class ReductionMapsDict(dict):
             self[key].print_involution()
             print "***********************************"       
         
-    def transitive(self,other,repr=None):
+    def transitive(self,other,repr=None,progress=None,cancel=None):
         r"""
         Implement transitivity lemma for matrices
+
+        Progress is reported after each entry; see ``ProgressMonitor``.
         """
         dim = self.get_dim()
+        estimate = sum([self[key].get_A().get_size() for key in self])
+        monitor = ProgressMonitor("transitive",dim*dim,estimate,progress,cancel)
         d = dict()
         for i in range(dim):
             for j in range(dim):
-                d[i,j] = self.get_reduction_dict()[i,j].transitive(other.get_reduction_dict()[i,j])
+                d[i,j] = self.get_reduction_dict()[i,j].transitive(other.get_reduction_dict()[i,j],monitor)
+                monitor.entry_done()
         return ReductionMapsDict(d,repr)
     
-    def confluence(self,other,repr=None):
+    def confluence(self,other,repr=None,progress=None,cancel=None):
         r"""
         Implement confluence lemma for matrices
+
+        Progress is reported after each entry; see ``ProgressMonitor``.
         """
         dim = self.get_dim()
+        estimate = sum([other[key].get_B().get_size() for key in other])
+        monitor = ProgressMonitor("confluence",dim*dim,estimate,progress,cancel)
         d = dict()
         for i in range(dim):
             for j in range(dim):
-                d[i,j] = self.get_reduction_dict()[i,j].confluence(other.get_reduction_dict()[i,j])
+                d[i,j] = self.get_reduction_dict()[i,j].confluence(other.get_reduction_dict()[i,j],monitor)
+                monitor.entry_done()
         return ReductionMapsDict(d,repr)   
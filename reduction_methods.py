@@ -36,9 +36,69 @@ from sage.sets.finite_set_maps import FiniteSetMaps
 from sage.bijectivematrixalgebra.map_methods import fixed_points
 from sage.bijectivematrixalgebra.reduction_maps_dicts import ReductionMapsDict
 from sage.bijectivematrixalgebra.reduction_maps import ReductionMaps
-import sage.bijectivematrixalgebra.stirling as stirling
+from sage.bijectivematrixalgebra.implicit_maps import IdentityMap
+from sage.bijectivematrixalgebra.implicit_maps import RelabelingMap
 from copy import copy
 
+def _clean_up_rule(elm):
+    return elm.get_cleaned_up_version()
+
+def _remove_middle_rule(elm):
+    r"""
+    (a,1,b) --> ab
+    """
+    return elm.get_object()[0]*elm.get_object()[2]
+
+def _insert_middle_rule(elm):
+    r"""
+    ab --> (a,1,b)
+    """
+    obj = elm.get_object()
+    return CombinatorialObject((obj[0],CombinatorialObject(1,1),obj[1]),elm.get_sign(),elm.get_weight())
+
+def _remove_left_rule(elm):
+    r"""
+    (1,a,b) --> ab
+    """
+    return elm.get_object()[1]*elm.get_object()[2]
+
+def _insert_left_rule(elm):
+    r"""
+    ab --> (1,a,b)
+    """
+    obj = elm.get_object()
+    return CombinatorialObject((CombinatorialObject(1,1),obj[0],obj[1]),elm.get_sign(),elm.get_weight())
+
+def _ApBCpD_rule(elm):
+    r"""
+    (a,b,c,d) --> (a,bc,d)
+    """
+    obj = elm.get_object()
+    return CombinatorialObject((obj[0],obj[1]*obj[2],obj[3]),elm.get_sign(),elm.get_weight())
+
+def _ApBCpD_inverse_rule(elm):
+    r"""
+    (a,bc,d) --> (a,b,c,d)
+    """
+    obj = elm.get_object()
+    mid = obj[1].get_object()
+    return CombinatorialObject((obj[0],mid[0],mid[1],obj[2]),elm.get_sign(),elm.get_weight())
+
+def _pABpCD_rule(elm):
+    r"""
+    (a,b,c,d) --> (ab,c,d)
+    """
+    obj = elm.get_object()
+    return CombinatorialObject((obj[0]*obj[1],obj[2],obj[3]),elm.get_sign(),elm.get_weight())
+
+def _pABpCD_inverse_rule(elm):
+    r"""
+    (ab,c,d) --> (a,b,c,d)
+    """
+    obj = elm.get_object()
+    left = obj[0].get_object()
+    return CombinatorialObject((left[0],left[1],obj[1],obj[2]),elm.get_sign(),elm.get_weight())
+
 def _involution_dict(mat):
     r"""
     Returns a dictionary of arbitrary involutions on the entries of a Combinatorial Matrix.
@@ -67,41 +127,44 @@ def reduction_matrix_clean_up(mat, st="standard clean up"):
     A = mat
     for i in range(dim):
         for j in range(dim):
-            dic_f = dict()
-            dic_f0 = dict()
-            for elm in A[i,j]:
-                dic_f[elm] = elm
-                dic_f0[elm] = elm.get_cleaned_up_version()
-            f = FiniteSetMaps(A[i,j],A[i,j]).from_dict(dic_f)
-            f0 = FiniteSetMaps(A[i,j],B[i,j]).from_dict(dic_f0)
+            f = IdentityMap(A[i,j])
+            f0 = RelabelingMap(A[i,j],B[i,j],_clean_up_rule)
             d[i,j] = ReductionMaps(A[i,j],B[i,j],f,f0)
     return ReductionMapsDict(d,st)
 
-def reduction_identity_matrix(mat,st=None,involution_dict=None):
+def reduction_identity_matrix(mat,st=None,involution_dict=None,check=True):
     r"""
     When a matrix reduces to the identity, this returns
     a ReductionMapDict of from a matrix to I.
+
+    With check=False the involutions are trusted to be valid, as those of
+    ``InvolutionSampler`` are, and the reductions are not checked.
     """
     dim = mat.nrows()
     if involution_dict is None:
         fs = _involution_dict(mat)
     else:
         fs = involution_dict
-    f0s = dict()
     I = identity_matrix(dim)
-    for i in range(dim):
-        for j in range(dim):
-            if i==j:
-                tmp = CombinatorialScalarWrapper(set(fixed_points(fs[i,j])))
-                f0s[i,j] = FiniteSetMaps(tmp,I[i,j]).from_dict({tmp.get_set().pop():CombinatorialObject(1,1)})
-            else:
-                f0s[i,j] = FiniteSetMaps(set(),set()).from_dict({})
     d = dict()
     for i in range(dim):
         for j in range(dim):
-            d[i,j] = ReductionMaps(mat[i,j],I[i,j],fs[i,j],f0s[i,j])
+            d[i,j] = reduction_identity_entry(mat[i,j],I[i,j],fs[i,j],i==j,check)
     return ReductionMapsDict(d,st)
 
+def reduction_identity_entry(scalar,target,f,diagonal,check=True):
+    r"""
+    Returns the reduction of a single entry of a matrix which reduces
+    to the identity, given its SRWP involution f.  On the diagonal the
+    fixed point of f is sent to the element of target.
+    """
+    if diagonal:
+        tmp = CombinatorialScalarWrapper(set(fixed_points(f)))
+        f0 = FiniteSetMaps(tmp,target).from_dict({iter(tmp).next():CombinatorialObject(1,1)})
+    else:
+        f0 = FiniteSetMaps(set(),set()).from_dict({})
+    return ReductionMaps(scalar,target,f,f0,check)
+
 def reduction_lemma_40(mat, st = "lemma 40"):
     r"""
     Returns the reduction of mat = adj_A times A
@@ -122,9 +185,9 @@ def reduction_lemma_40(mat, st = "lemma 40"):
                     #object is tuple, elements come from the actual tuple, hence double get_object()
                     index = tmp.index(CombinatorialObject('_',1))
                     tmp[index]=elm.get_object()[1]
-                    dic_f[elm] = elm
                     copyelm= deepcopy(elm)
                     dic_f0[elm] = copyelm.set_object(tuple(tmp))
+                f = IdentityMap(A[i,j])
                 f0 = FiniteSetMaps(A[i,j],B[i,j]).from_dict(dic_f0)
             else:
                 for elm in copyset:
@@ -146,8 +209,8 @@ def reduction_lemma_40(mat, st = "lemma 40"):
                     elm_range1 = CombinatorialObject(tuple(tmp),sgn,weight)
                     elm_range = CombinatorialObject((elm_range1,elm_range2),elm_range1.get_sign()*elm_range2.get_sign(),elm_range1.get_weight()*elm_range2.get_weight())
                     dic_f[elm] = elm_range
+                f = FiniteSetMaps(A[i,j],A[i,j]).from_dict(dic_f)
                 f0 = FiniteSetMaps(set(),set()).from_dict({})
-            f = FiniteSetMaps(A[i,j],A[i,j]).from_dict(dic_f)
             d[i,j] = ReductionMaps(A[i,j],B[i,j],f,f0)
     return ReductionMapsDict(d,st)
 
@@ -164,19 +227,13 @@ def reduction_matrix_AIB_AB(mat,st = "remove middle Identity matrix"):
         d = dict()
         for i in range(dim):
             for j in range(dim):
-                dic_f0 = dict()
-                dic_f = dict()
                 newset = set()
                 for elm in mat[i,j]:
-                    newelm0 = elm.get_object()[0]
-                    newelm1 = elm.get_object()[2]
-                    tmp = newelm0*newelm1
-                    newset.add(tmp)
-                    dic_f[elm] = elm
-                    dic_f0[elm] = tmp
-                f = FiniteSetMaps(mat[i,j],mat[i,j]).from_dict(dic_f)
-                f0 = FiniteSetMaps(mat[i,j],newset).from_dict(dic_f0)
-                d[i,j] = ReductionMaps(mat[i,j],CombinatorialScalarWrapper(newset),f,f0)
+                    newset.add(_remove_middle_rule(elm))
+                B = CombinatorialScalarWrapper(newset)
+                f = IdentityMap(mat[i,j])
+                f0 = RelabelingMap(mat[i,j],B,_remove_middle_rule,_insert_middle_rule)
+                d[i,j] = ReductionMaps(mat[i,j],B,f,f0)
         return ReductionMapsDict(d,st)
 
 def reduction_matrix_IAB_AB(mat,st = "remove left Identity matrix"):
@@ -192,19 +249,13 @@ def reduction_matrix_IAB_AB(mat,st = "remove left Identity matrix"):
         d = dict()
         for i in range(dim):
             for j in range(dim):
-                dic_f0 = dict()
-                dic_f = dict()
                 newset = set()
                 for elm in mat[i,j]:
-                    newelm1 = elm.get_object()[1]
-                    newelm2 = elm.get_object()[2]
-                    tmp = newelm1*newelm2
-                    newset.add(tmp)
-                    dic_f[elm] = elm
-                    dic_f0[elm] = tmp
-                f = FiniteSetMaps(mat[i,j],mat[i,j]).from_dict(dic_f)
-                f0 = FiniteSetMaps(mat[i,j],newset).from_dict(dic_f0)
-                d[i,j] = ReductionMaps(mat[i,j],CombinatorialScalarWrapper(newset),f,f0)
+                    newset.add(_remove_left_rule(elm))
+                B = CombinatorialScalarWrapper(newset)
+                f = IdentityMap(mat[i,j])
+                f0 = RelabelingMap(mat[i,j],B,_remove_left_rule,_insert_left_rule)
+                d[i,j] = ReductionMaps(mat[i,j],B,f,f0)
         return ReductionMapsDict(d,st)
 
 def reduction_matrix_ABCD_to_ApBCpD(A,B,C,D,st = None):
@@ -219,8 +270,6 @@ def reduction_matrix_ABCD_to_ApBCpD(A,B,C,D,st = None):
         for j in range(dim):
             newsetA = set()
             newsetB = set()
-            dic_f = dict()
-            dic_f0 = dict()
             for elm in mat[i,j]:
                 tmp0 = elm.get_object()[0]
                 tmp1 = elm.get_object()[1].get_object()[0]
@@ -231,11 +280,11 @@ def reduction_matrix_ABCD_to_ApBCpD(A,B,C,D,st = None):
                 tmp11 = tmp1.get_object()[1]
                 tmpA = CombinatorialObject((tmp0,tmp10,tmp11,tmp2),elm.get_sign(),elm.get_weight())
                 newsetA.add(tmpA)
-                dic_f[tmpA] = tmpA
-                dic_f0[tmpA] = tmpB
-            f = FiniteSetMaps(newsetA,newsetA).from_dict(dic_f)
-            f0 = FiniteSetMaps(newsetA,newsetB).from_dict(dic_f0)
-            d[i,j] = ReductionMaps(CombinatorialScalarWrapper(newsetA),CombinatorialScalarWrapper(newsetB),f,f0)
+            scalarA = CombinatorialScalarWrapper(newsetA)
+            scalarB = CombinatorialScalarWrapper(newsetB)
+            f = IdentityMap(scalarA)
+            f0 = RelabelingMap(scalarA,scalarB,_ApBCpD_rule,_ApBCpD_inverse_rule)
+            d[i,j] = ReductionMaps(scalarA,scalarB,f,f0)
     return ReductionMapsDict(d,st)
     
 def reduction_matrix_ABCD_to_pABpCD(A,B,C,D,st = None,reduction = None):
@@ -253,8 +302,6 @@ def reduction_matrix_ABCD_to_pABpCD(A,B,C,D,st = None,reduction = None):
         for j in range(dim):
             newsetA = set()
             newsetB = set()
-            dic_f = dict()
-            dic_f0 = dict()
             for elm in mat[i,j]:
                 tmp0 = elm.get_object()[0].get_object()[0]
                 tmp01 = tmp0.get_object()[0]
@@ -265,50 +312,69 @@ def reduction_matrix_ABCD_to_pABpCD(A,B,C,D,st = None,reduction = None):
                 newsetB.add(tmpB)
                 tmpA = CombinatorialObject((tmp01,tmp02,tmp1,tmp2),elm.get_sign(),elm.get_weight())
                 newsetA.add(tmpA)
-                dic_f[tmpA] = tmpA
-                dic_f0[tmpA] = tmpB
-            f = FiniteSetMaps(newsetA,newsetA).from_dict(dic_f)
-            f0 = FiniteSetMaps(newsetA,newsetB).from_dict(dic_f0)
-            d[i,j] = ReductionMaps(CombinatorialScalarWrapper(newsetA),CombinatorialScalarWrapper(newsetB),f,f0)
+            scalarA = CombinatorialScalarWrapper(newsetA)
+            scalarB = CombinatorialScalarWrapper(newsetB)
+            f = IdentityMap(scalarA)
+            f0 = RelabelingMap(scalarA,scalarB,_pABpCD_rule,_pABpCD_inverse_rule)
+            d[i,j] = ReductionMaps(scalarA,scalarB,f,f0)
     return ReductionMapsDict(d,st)
 
-def reduction_lemma_28_23(mat, red_AB_to_I, st = "an application of lemma 28, reduction_23"):
+def reduction_lemma_28_23(mat, red_AB_to_I, st = "an application of lemma 28, reduction_23", dependencies = None):
     r"""
     Because only one matrix here has a nontrivial SRWP map,
     we need not apply the formal indexing given in the proof
     of lemma 28.  Simply enter a matrix adj_A(AB)A and the 
     reduction of AB to I.
+
+    If a dictionary dependencies is given, dependencies[i,j] is set
+    to the set of keys of red_AB_to_I used by entry (i,j).
     """
     d = dict()
     dim = mat.nrows()
     for i in range(dim):
         for j in range(dim):
-            dic_f = dict()
-            dic_f0 = dict()
-            newset = set()
-            for elm in mat[i,j]:
-                #break tuple apart
-                tmp0 = elm.get_object()[0]
-                tmp1 = elm.get_object()[1]
-                tmp2 = elm.get_object()[2]
-                row = tmp1.get_row()
-                col = tmp1.get_col()
-                f_row_col = red_AB_to_I[row,col].get_SRWP()
-                f0_row_col = red_AB_to_I[row,col].get_SPWP()
-                #assign map
-                tmp = f_row_col(tmp1)
-                sign = tmp.get_sign()*tmp0.get_sign()*tmp2.get_sign()
-                weight = tmp.get_weight()*tmp0.get_weight()*tmp2.get_weight()
-                dic_f[elm] = CombinatorialObject((tmp0,tmp,tmp2),sign,weight)
-                if tmp1 in fixed_points(f_row_col):
-                    tmpfxd = CombinatorialObject((tmp0,f0_row_col(tmp1),tmp2),elm.get_sign(),elm.get_weight())
-                    dic_f0[elm] = tmpfxd
-                    newset.add(tmpfxd)
-            f = FiniteSetMaps(mat[i,j],mat[i,j]).from_dict(dic_f)
-            f0 = FiniteSetMaps(dic_f0.keys(),newset).from_dict(dic_f0)
-            d[i,j] = ReductionMaps(mat[i,j],CombinatorialScalarWrapper(newset),f,f0)
+            keys = set()
+            d[i,j] = reduction_lemma_28_23_entry(mat[i,j],red_AB_to_I,keys)
+            if dependencies is not None:
+                dependencies[i,j] = keys
     return ReductionMapsDict(d,st)
 
+def reduction_lemma_28_23_entry(scalar, red_AB_to_I, keys = None):
+    r"""
+    Returns a single entry of reduction_lemma_28_23, where scalar
+    is an entry of adj_A(AB)A.  The keys of red_AB_to_I which are
+    used are added to the set keys, if given.
+    """
+    dic_f = dict()
+    dic_f0 = dict()
+    newset = set()
+    fxd = dict()
+    for elm in scalar:
+        #break tuple apart
+        tmp0 = elm.get_object()[0]
+        tmp1 = elm.get_object()[1]
+        tmp2 = elm.get_object()[2]
+        row = tmp1.get_row()
+        col = tmp1.get_col()
+        f_row_col = red_AB_to_I[row,col].get_SRWP()
+        f0_row_col = red_AB_to_I[row,col].get_SPWP()
+        if (row,col) not in fxd:
+            fxd[row,col] = fixed_points(f_row_col)
+        #assign map
+        tmp = f_row_col(tmp1)
+        sign = tmp.get_sign()*tmp0.get_sign()*tmp2.get_sign()
+        weight = tmp.get_weight()*tmp0.get_weight()*tmp2.get_weight()
+        dic_f[elm] = CombinatorialObject((tmp0,tmp,tmp2),sign,weight)
+        if tmp1 in fxd[row,col]:
+            tmpfxd = CombinatorialObject((tmp0,f0_row_col(tmp1),tmp2),elm.get_sign(),elm.get_weight())
+            dic_f0[elm] = tmpfxd
+            newset.add(tmpfxd)
+    if keys is not None:
+        keys.update(fxd.keys())
+    f = FiniteSetMaps(scalar,scalar).from_dict(dic_f)
+    f0 = FiniteSetMaps(dic_f0.keys(),newset).from_dict(dic_f0)
+    return ReductionMaps(scalar,CombinatorialScalarWrapper(newset),f,f0)
+
 def reduction_lemma_28_68(mat, red_adjAA_to_I, st = "an application of lemma 28, reduction_68"):
     r"""
     Because only one matrix here has a nontrivial SRWP map,
@@ -0,0 +1,446 @@
+r"""
+Serialization
+
+A compact binary format for ReductionMaps, ReductionMapsDicts and
+Combinatorial Matrices.
+
+Pickling a reduction stores the Sage parents of its maps, a symbolic
+expression per element and every nested object in full.  An archive
+instead stores:
+
+ - a table of nodes, one per distinct Combinatorial Object (the elements
+   of the entries and the objects nested inside them), with a sign, a
+   vector of exponents of the weight monomial in x1, x2, ... and a row
+   and column
+ - the object of each node as a stream of int32 tokens in prefix form,
+   referring to other nodes and to a table of leaves (the permutations,
+   set partitions, strings and numbers at the bottom of the objects),
+   each leaf pickled on its own and located by an offset table
+ - per entry, the nodes of A and of B
+ - per entry, one int32 array for each map: f[i] is the index in A of the
+   image of the i-th element of A, and f0[i] the index in B of the image
+   of the i-th element of A, or -1 when it is not a fixed point of f
+
+A matrix is stored as the nodes of its entries, as A, with no B and no maps.
+
+Every array is stored uncompressed at an aligned offset, so that opening an
+archive only memory-maps the file; elements, and the leaves inside them,
+are decoded when they are asked for.
+
+File layout: the magic string 'BMAR', the format version and the length of
+a JSON header as little-endian integers, the header, and the arrays.
+
+EXAMPLES:
+
+Entry (2,1) of Stirling21Matrix(3) holds two elements of opposite signs,
+which the involution exchanges, and entry (2,2) a single fixed point::
+
+    sage: red = reduction_identity_matrix(Stirling21Matrix(3))
+    sage: save_reduction_archive(red,'red.bmar')
+    sage: R = open_reduction_archive('red.bmar')
+    sage: R.get_kind()
+    'reduction_dict'
+    sage: R.get_sizes((2,1)), R.get_sizes((2,2))
+    ((2, 0), (1, 1))
+    sage: R.srwp_index((2,1),0)
+    1
+    sage: R.spwp_index((2,2),0)
+    0
+    sage: R.get_reductions() == red
+    True
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+from sage.bijectivematrixalgebra.combinatorial_objects import CombinatorialObject
+from sage.bijectivematrixalgebra.combinatorial_objects import assign_weight_monomial
+from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarWrapper
+from sage.bijectivematrixalgebra.reduction_maps import ReductionMaps
+from sage.bijectivematrixalgebra.reduction_maps_dicts import ReductionMapsDict
+from sage.bijectivematrixalgebra.implicit_maps import IdentityMap
+from sage.bijectivematrixalgebra.checkpoint import write_atomically
+from sage.bijectivematrixalgebra.backend import weight_exponents
+from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarRing
+from sage.sets.finite_set_maps import FiniteSetMaps
+from sage.matrix.all import MatrixSpace
+import cPickle
+import json
+import struct
+import numpy
+
+_MAGIC = "BMAR"
+_VERSION = 2
+_ALIGN = 16
+#tokens of the object streams
+_NODE = -1
+_LEAF = -2
+_TUPLE = -3
+
+
+def _aligned(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class _Encoder(object):
+    r"""
+    Assigns node and leaf numbers to Combinatorial Objects and their
+    contents, and collects the tables of an archive.
+    """
+    def __init__(self):
+        self.nodes = list()
+        self.node_ids = dict()
+        self.leaves = list()
+        self.leaf_ids = dict()
+        self.tokens = list()
+        self.offsets = [0]
+
+    def node(self, elm):
+        key = id(elm)
+        if key not in self.node_ids:
+            local = list()
+            self._encode(elm.get_object(), local)
+            self.node_ids[key] = len(self.nodes)
+            self.nodes.append(elm)
+            self.tokens.extend(local)
+            self.offsets.append(len(self.tokens))
+        return self.node_ids[key]
+
+    def _encode(self, obj, local):
+        if isinstance(obj, CombinatorialObject):
+            local.extend([_NODE, self.node(obj)])
+        elif type(obj) == tuple:
+            local.extend([_TUPLE, len(obj)])
+            for x in obj:
+                self._encode(x, local)
+        else:
+            key = id(obj)
+            if key not in self.leaf_ids:
+                self.leaf_ids[key] = len(self.leaves)
+                self.leaves.append(obj)
+            local.extend([_LEAF, self.leaf_ids[key]])
+
+    def node_arrays(self):
+        n = len(self.nodes)
+        exps = [weight_exponents(elm.get_weight()) for elm in self.nodes]
+        nvars = max([0] + [max(e.keys()) for e in exps if e])
+        exponents = numpy.zeros((n, nvars), dtype=numpy.int32)
+        for k in range(n):
+            for i, e in exps[k].items():
+                exponents[k, i - 1] = e
+        #each leaf is pickled alone, so that it can be unpickled alone
+        pickles = [cPickle.dumps(leaf, cPickle.HIGHEST_PROTOCOL) for leaf in self.leaves]
+        leaf_offsets = [0]
+        for s in pickles:
+            leaf_offsets.append(leaf_offsets[-1] + len(s))
+        return {'sign': numpy.array([elm.get_sign() for elm in self.nodes], dtype=numpy.int8).reshape(n),
+                'exponents': exponents,
+                'rowcol': numpy.array([(elm.get_row(), elm.get_col()) for elm in self.nodes], dtype=numpy.int32).reshape(n, 2),
+                'node_offsets': numpy.array(self.offsets, dtype=numpy.int64),
+                'tokens': numpy.array(self.tokens, dtype=numpy.int32),
+                'leaf_offsets': numpy.array(leaf_offsets, dtype=numpy.int64),
+                'leaves': numpy.array(bytearray("".join(pickles)), dtype=numpy.uint8)}
+
+
+def save_reduction_archive(red, path):
+    r"""
+    INPUT:
+     - red a ReductionMaps or a ReductionMapsDict
+     - path the file to write
+
+    Writes red to path in the archive format.
+    """
+    if isinstance(red, ReductionMapsDict):
+        kind = 'reduction_dict'
+        keys = sorted(red.keys())
+        entries = [red[key] for key in keys]
+        repr = red._repr
+    elif isinstance(red, ReductionMaps):
+        kind = 'reduction'
+        keys = [(0, 0)]
+        entries = [red]
+        repr = None
+    else:
+        raise ValueError, "Enter a ReductionMaps or a ReductionMapsDict"
+    enc = _Encoder()
+    A_nodes, B_nodes, f, f0 = list(), list(), list(), list()
+    A_offsets, B_offsets = [0], [0]
+    for red_entry in entries:
+        A = list(red_entry.get_A())
+        B = list(red_entry.get_B())
+        index_A = dict((x, i) for i, x in enumerate(A))
+        index_B = dict((y, j) for j, y in enumerate(B))
+        func = red_entry.get_SRWP()
+        func0 = red_entry.get_SPWP()
+        for i, x in enumerate(A):
+            k = index_A[func(x)]
+            f.append(k)
+            if k == i:
+                f0.append(index_B[func0(x)])
+            else:
+                f0.append(-1)
+        A_nodes.extend([enc.node(x) for x in A])
+        B_nodes.extend([enc.node(y) for y in B])
+        A_offsets.append(len(A_nodes))
+        B_offsets.append(len(B_nodes))
+    _write_archive(path, kind, repr, enc, keys, A_nodes, A_offsets, B_nodes, B_offsets, f, f0)
+
+def save_matrix_archive(mat, path):
+    r"""
+    INPUT:
+     - mat a Combinatorial Matrix
+     - path the file to write
+
+    Writes mat to path in the archive format.
+    """
+    keys = [(i, j) for i in range(mat.nrows()) for j in range(mat.ncols())]
+    enc = _Encoder()
+    A_nodes = list()
+    A_offsets = [0]
+    for key in keys:
+        A_nodes.extend([enc.node(x) for x in mat[key]])
+        A_offsets.append(len(A_nodes))
+    _write_archive(path, 'matrix', None, enc, keys, A_nodes, A_offsets, [], [0] * len(A_offsets), [], [])
+
+def _write_archive(path, kind, repr, enc, keys, A_nodes, A_offsets, B_nodes, B_offsets, f, f0):
+    arrays = enc.node_arrays()
+    arrays.update({'keys': numpy.array(keys, dtype=numpy.int32).reshape(len(keys), 2),
+                   'A_nodes': numpy.array(A_nodes, dtype=numpy.int32),
+                   'A_offsets': numpy.array(A_offsets, dtype=numpy.int64),
+                   'B_nodes': numpy.array(B_nodes, dtype=numpy.int32),
+                   'B_offsets': numpy.array(B_offsets, dtype=numpy.int64),
+                   'f': numpy.array(f, dtype=numpy.int32),
+                   'f0': numpy.array(f0, dtype=numpy.int32)})
+    layout = dict()
+    offset = 0
+    for name in sorted(arrays):
+        a = numpy.ascontiguousarray(arrays[name])
+        arrays[name] = a
+        layout[name] = {'offset': offset, 'dtype': a.dtype.str, 'shape': list(a.shape)}
+        offset = _aligned(offset + a.nbytes)
+    header = json.dumps({'kind': kind, 'repr': repr, 'arrays': layout})
+    start = _aligned(16 + len(header))
+    parts = [_MAGIC, struct.pack('<IQ', _VERSION, len(header)), header, "\0" * (start - 16 - len(header))]
+    position = 0
+    for name in sorted(arrays):
+        parts.append("\0" * (layout[name]['offset'] - position))
+        parts.append(arrays[name].tostring())
+        position = layout[name]['offset'] + arrays[name].nbytes
+    write_atomically(path, "".join(parts))
+
+def open_reduction_archive(path):
+    r"""
+    Returns the ReductionArchive stored at path, by either
+    ``save_reduction_archive`` or ``save_matrix_archive``.
+    """
+    return ReductionArchive(path)
+
+
+class ReductionArchive(SageObject):
+    r"""
+    INPUT:
+     - path a file written by ``save_reduction_archive`` or ``save_matrix_archive``
+
+    A reduction, or a matrix, stored in the archive format.  The arrays of the file are
+    memory-mapped, and the entries and elements are decoded only when they
+    are asked for, so the maps of a large reduction can be queried by index
+    without reading the whole file.
+    """
+    def __init__(self, path):
+        inp = open(path, 'rb')
+        try:
+            start = inp.read(16)
+            if len(start) < 16 or start[:4] != _MAGIC:
+                raise ValueError, path + " is not a reduction archive"
+            version, length = struct.unpack('<IQ', start[4:])
+            if version != _VERSION:
+                raise ValueError, "Unsupported archive version " + str(version)
+            header = json.loads(inp.read(length))
+        finally:
+            inp.close()
+        self._path = path
+        self._kind = header['kind']
+        self._repr = header['repr']
+        data = numpy.memmap(path, dtype=numpy.uint8, mode='r')[_aligned(16 + length):]
+        self._arrays = dict()
+        for name, spec in header['arrays'].items():
+            dtype = numpy.dtype(str(spec['dtype']))
+            size = dtype.itemsize * int(numpy.prod(spec['shape']))
+            chunk = data[spec['offset']:spec['offset'] + size]
+            self._arrays[name] = chunk.view(dtype).reshape(tuple(spec['shape']))
+        self._leaves = dict()
+        self._entries = dict((tuple(int(i) for i in key), e) for e, key in enumerate(self._arrays['keys']))
+        self._elements = dict()
+
+    def __repr__(self):
+        if self._kind == 'matrix':
+            return "Matrix archive " + self._path + " of " + str(len(self._entries)) + " entries"
+        return "Reduction archive " + self._path + " of " + str(len(self._entries)) + " entries"
+
+    def keys(self):
+        return sorted(self._entries)
+
+    def get_dim(self):
+        return int(round(len(self._entries) ** 0.5))
+
+    def _entry(self, key):
+        if self._kind == 'reduction':
+            return 0
+        return self._entries[key]
+
+    def _slice(self, name, key):
+        e = self._entry(key)
+        offsets = self._arrays[name[0] + '_offsets']
+        return int(offsets[e]), int(offsets[e + 1])
+
+    def get_sizes(self, key=None):
+        r"""
+        Returns the pair (|A|,|B|) of the sizes of the entry key.
+        """
+        a0, a1 = self._slice('A', key)
+        b0, b1 = self._slice('B', key)
+        return (a1 - a0, b1 - b0)
+
+    def element(self, node):
+        r"""
+        Returns the Combinatorial Object stored as the given node.
+        """
+        if node not in self._elements:
+            tokens = self._arrays['tokens']
+            offsets = self._arrays['node_offsets']
+            obj, end = self._decode(tokens, int(offsets[node]))
+            exponents = [int(e) for e in self._arrays['exponents'][node]]
+            row, col = self._arrays['rowcol'][node]
+            self._elements[node] = CombinatorialObject(obj, int(self._arrays['sign'][node]),
+                                                       assign_weight_monomial(exponents), int(row), int(col))
+        return self._elements[node]
+
+    def leaf(self, k):
+        r"""
+        Returns the k-th leaf, unpickled on first use.
+        """
+        if k not in self._leaves:
+            offsets = self._arrays['leaf_offsets']
+            data = self._arrays['leaves'][int(offsets[k]):int(offsets[k + 1])]
+            self._leaves[k] = cPickle.loads(data.tostring())
+        return self._leaves[k]
+
+    def _decode(self, tokens, pos):
+        token = int(tokens[pos])
+        if token == _NODE:
+            return self.element(int(tokens[pos + 1])), pos + 2
+        elif token == _LEAF:
+            return self.leaf(int(tokens[pos + 1])), pos + 2
+        else:
+            L = list()
+            pos += 2
+            for i in range(int(tokens[pos - 1])):
+                obj, pos = self._decode(tokens, pos)
+                L.append(obj)
+            return tuple(L), pos
+
+    def get_A_element(self, key, i):
+        r"""
+        Returns the i-th element of A in the entry key.
+        """
+        return self.element(int(self._arrays['A_nodes'][self._slice('A', key)[0] + i]))
+
+    def get_B_element(self, key, j):
+        return self.element(int(self._arrays['B_nodes'][self._slice('B', key)[0] + j]))
+
+    def srwp_index(self, key, i):
+        r"""
+        Returns the index in A of the image of the i-th element of A under
+        the SRWP involution of the entry key.
+        """
+        return int(self._arrays['f'][self._slice('A', key)[0] + i])
+
+    def spwp_index(self, key, i):
+        r"""
+        Returns the index in B of the image of the i-th element of A under
+        the SPWP bijection of the entry key, or None if it is not a fixed point.
+        """
+        j = int(self._arrays['f0'][self._slice('A', key)[0] + i])
+        if j < 0:
+            return None
+        return j
+
+    def fixed_point_indices(self, key):
+        r"""
+        Returns the array of indices of the fixed points of the SRWP involution
+        of the entry key.
+        """
+        a0, a1 = self._slice('A', key)
+        return numpy.nonzero(self._arrays['f0'][a0:a1] >= 0)[0]
+
+    def get_kind(self):
+        r"""
+        Returns 'reduction', 'reduction_dict' or 'matrix'.
+        """
+        return self._kind
+
+    def get_entry(self, i, j):
+        r"""
+        Returns the entry (i,j) of a stored matrix as a Combinatorial Scalar.
+        """
+        if self._kind != 'matrix':
+            raise ValueError, "The archive does not hold a matrix"
+        a0, a1 = self._slice('A', (i, j))
+        return CombinatorialScalarWrapper([self.get_A_element((i, j), k) for k in range(a1 - a0)])
+
+    def get_matrix(self):
+        r"""
+        Returns the stored Combinatorial Matrix.
+        """
+        dim = self.get_dim()
+        mat_space = MatrixSpace(CombinatorialScalarRing(), dim)
+        return mat_space([[self.get_entry(i, j) for j in range(dim)] for i in range(dim)])
+
+    def get_reduction(self, i=0, j=0):
+        r"""
+        Returns the entry (i,j) as a ReductionMaps.
+        """
+        if self._kind == 'matrix':
+            raise ValueError, "The archive holds a matrix, not a reduction"
+        key = (i, j)
+        a0, a1 = self._slice('A', key)
+        b0, b1 = self._slice('B', key)
+        A_list = [self.get_A_element(key, k) for k in range(a1 - a0)]
+        B_list = [self.get_B_element(key, k) for k in range(b1 - b0)]
+        f = self._arrays['f'][a0:a1]
+        f0 = self._arrays['f0'][a0:a1]
+        A = CombinatorialScalarWrapper(A_list)
+        B = CombinatorialScalarWrapper(B_list)
+        if (f == numpy.arange(a1 - a0)).all():
+            func = IdentityMap(A)
+        else:
+            func = FiniteSetMaps(A, A).from_dict(dict((A_list[k], A_list[int(f[k])]) for k in range(a1 - a0)))
+        dic0 = dict((A_list[k], B_list[int(f0[k])]) for k in range(a1 - a0) if f0[k] >= 0)
+        func0 = FiniteSetMaps(CombinatorialScalarWrapper(dic0.keys()), B).from_dict(dic0)
+        return ReductionMaps(A, B, func, func0)
+
+    def get_reductions(self):
+        r"""
+        Returns the stored ReductionMaps or ReductionMapsDict.
+        """
+        if self._kind == 'reduction':
+            return self.get_reduction()
+        new = ReductionMapsDict(dict((key, self.get_reduction(*key)) for key in self.keys()))
+        new._repr = self._repr
+        return new
@@ -0,0 +1,181 @@
+r"""
+Shared Archives
+
+Publishes a Combinatorial Matrix or a reduction once, in shared memory, for
+the worker processes of a pool to read without copies.
+
+The object is written in the archive format of ``save_reduction_archive``
+to a file in /dev/shm, which lives in memory; where there is no /dev/shm
+the temporary directory is used instead.  Each worker opens it as a
+``ReductionArchive``, which memory-maps the file read-only, so that every
+process reads the same pages.  The maps are queried as index arrays and the
+elements decoded only when asked for.
+
+A ``SharedArchive`` pickles as its path, so it can be passed to the
+initializer of a pool, and its file is removed by ``unlink``, on leaving a
+``with`` block or at the latest when the publishing process exits.  Workers
+never remove it.  A worker which has already attached keeps reading the
+mapped pages after the file is removed.
+
+EXAMPLES:
+
+A copy made by pickling, as a pool does for the arguments of its
+initializer, attaches to the same file but does not own it::
+
+    sage: import os
+    sage: red = reduction_identity_matrix(Stirling21Matrix(3))
+    sage: S = SharedArchive(red)
+    sage: os.path.exists(S.get_path())
+    True
+    sage: T = loads(dumps(S))
+    sage: T.get_path() == S.get_path(), T.is_owner(), S.is_owner()
+    (True, False, True)
+    sage: R = T.attach()
+    sage: R.get_sizes((2,1)), R.srwp_index((2,1),0)
+    ((2, 0), 1)
+    sage: T.unlink()
+    sage: os.path.exists(S.get_path())
+    True
+    sage: S.unlink()
+    sage: os.path.exists(S.get_path())
+    False
+    sage: R.get_reductions() == red
+    True
+
+Leaving a ``with`` block unlinks the file::
+
+    sage: with SharedArchive(Stirling1Matrix(4)) as S:
+    ....:     S.attach().get_entry(3,2).get_size()
+    3
+    sage: os.path.exists(S.get_path())
+    False
+
+AUTHORS:
+
+- Steven Tartakovsky (2012): initial version
+"""
+#*****************************************************************************
+#       Copyright (C) 2012 Steven Tartakovsky <startakovsky@gmail.com>,
+#
+#  Distributed under the terms of the GNU General Public License (GPL)
+#
+#    This code is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    General Public License for more details.
+#
+#  The full text of the GPL is available at:
+#
+#                  http://www.gnu.org/licenses/
+#*****************************************************************************
+
+from sage.structure.sage_object import SageObject
+from sage.bijectivematrixalgebra.reduction_maps import ReductionMaps
+from sage.bijectivematrixalgebra.reduction_maps_dicts import ReductionMapsDict
+from sage.bijectivematrixalgebra.serialization import save_reduction_archive
+from sage.bijectivematrixalgebra.serialization import save_matrix_archive
+from sage.bijectivematrixalgebra.serialization import ReductionArchive
+import atexit
+import os
+import tempfile
+
+#the paths published and not yet unlinked, with the processes which
+#published them; forked children inherit this but own none of it
+_published = dict()
+
+
+def shared_directory():
+    r"""
+    Returns /dev/shm if it is a writable directory, or else the temporary
+    directory.
+    """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+def _unlink_published():
+    for path, pid in _published.items():
+        if pid == os.getpid():
+            _unlink(path)
+
+def _unlink(path):
+    _published.pop(path, None)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+atexit.register(_unlink_published)
+
+
+class SharedArchive(SageObject):
+    r"""
+    INPUT:
+     - obj a Combinatorial Matrix, a ReductionMaps or a ReductionMapsDict
+
+    Publishes obj in shared memory.  See the module documentation.
+    """
+    def __init__(self, obj):
+        handle, path = tempfile.mkstemp(prefix='bmar-', suffix='.bmar', dir=shared_directory())
+        os.close(handle)
+        self._path = path
+        self._owner = os.getpid()
+        self._archive = None
+        _published[path] = self._owner
+        try:
+            if isinstance(obj, (ReductionMaps, ReductionMapsDict)):
+                save_reduction_archive(obj, path)
+            else:
+                save_matrix_archive(obj, path)
+        except:
+            _unlink(path)
+            raise
+
+    def __reduce__(self):
+        return (attach_shared_archive, (self._path,))
+
+    def __repr__(self):
+        return "Shared archive " + self._path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.unlink()
+        return False
+
+    def get_path(self):
+        return self._path
+
+    def is_owner(self):
+        r"""
+        Returns True in the process which published the archive.
+        """
+        return self._owner == os.getpid()
+
+    def attach(self):
+        r"""
+        Returns the ReductionArchive mapping the published object, opened
+        once per process.
+        """
+        if self._archive is None:
+            self._archive = ReductionArchive(self._path)
+        return self._archive
+
+    def unlink(self):
+        r"""
+        Removes the file, if this is the publishing process; processes
+        already attached keep their mappings.
+        """
+        if self.is_owner():
+            _unlink(self._path)
+
+def attach_shared_archive(path):
+    r"""
+    Returns a SharedArchive, not owning its file, for the archive at path.
+    """
+    shared = SharedArchive.__new__(SharedArchive)
+    shared._path = path
+    shared._owner = None
+    shared._archive = None
+    return shared
@@ -4,6 +4,17 @@ This file contains the methods used in the Bijective Matrix Algebra package.
 
 It generates the standard combinatorial interpretations of Stirling Matrices.
 
+Each row is built from the previous one by inserting the new element, as in
+the recurrences of the Stirling numbers, so that a whole matrix costs time
+linear in its size; see ``permutation_rows`` and ``set_partition_rows``.
+
+Generated matrices, and the products of the two Stirling matrices, can be
+kept in a persistent ``DiskCache`` keyed by family, dimension and
+STIRLING_CODE_VERSION, so that later sessions load them instead of
+generating them again.  Caching is off unless it is asked for: by passing
+cache, by ``set_matrix_cache``, or by naming a cache directory in the
+environment variable BIJECTIVEMATRIXALGEBRA_CACHE.
+
 AUTHORS:
 
 - Steven Tartakovsky (2012): initial version
@@ -29,56 +40,169 @@ from sage.matrix.all import matrix
 from sage.matrix.all import MatrixSpace
 from sage.combinat.permutation import *
 from sage.combinat.set_partition import *
+from sage.sets.set import Set
 from sage.bijectivematrixalgebra.combinatorial_objects import CombinatorialObject
 from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarWrapper
 from sage.bijectivematrixalgebra.combinatorial_scalar_rings_and_elements import CombinatorialScalarRing
+from sage.bijectivematrixalgebra.matrix_methods import matrix_multiply
+from sage.bijectivematrixalgebra.disk_cache import DiskCache
+import os
 
 PermutationOptions(display = 'cycle')
 PermutationOptions(display = 'singleton')
 
-def _stirling1_row(row,dim):
+#increase whenever the matrices generated in this file change
+STIRLING_CODE_VERSION = 2
+_matrix_cache = None
+
+def get_matrix_cache():
+    r"""
+    Returns the DiskCache of generated matrices, or False if caching is
+    disabled, which it is by default.  The default cache is the one in the
+    directory named by BIJECTIVEMATRIXALGEBRA_CACHE, when that is set.
+    """
+    global _matrix_cache
+    if _matrix_cache is None:
+        path = os.environ.get('BIJECTIVEMATRIXALGEBRA_CACHE')
+        if path is None:
+            _matrix_cache = False
+        else:
+            _matrix_cache = DiskCache(path)
+    return _matrix_cache
+
+def set_matrix_cache(cache):
+    r"""
+    Sets the DiskCache of generated matrices.  False disables caching and
+    None restores the default, which depends on BIJECTIVEMATRIXALGEBRA_CACHE.
+    """
+    global _matrix_cache
+    _matrix_cache = cache
+
+def _cached(key,function,args,cache):
+    if cache is None:
+        cache = get_matrix_cache()
+    if cache is False:
+        return function(*args)
+    return cache.get_or_compute(key + (STIRLING_CODE_VERSION,),function,*args)
+
+def permutation_rows(dim):
+    r"""
+    Returns an iterator over the rows 0, ..., dim-1 of the Stirling1 matrix,
+    each a list of triples (one-line notation, number of cycles, sign).
+
+    Row n is derived from row n-1: n is inserted either as a new cycle,
+    which keeps the column and the sign (-1)^(n-cycles), or after one of
+    1, ..., n-1 in its cycle, which keeps the column and flips the sign.
+    """
+    current = [([],0,1)]
+    for n in range(dim):
+        if n > 0:
+            new = list()
+            for p, c, s in current:
+                new.append((p + [n],c + 1,s))
+                for i in range(n - 1):
+                    #send i+1 to n and n to the old image of i+1
+                    q = p + [p[i]]
+                    q[i] = n
+                    new.append((q,c,-s))
+            current = new
+        yield current
+
+def set_partition_rows(dim):
+    r"""
+    Returns an iterator over the rows 0, ..., dim-1 of the Stirling2 matrix,
+    each a list of set partitions given as lists of blocks.
+
+    Row n is derived from row n-1: n is added either as a new block, in the
+    next column, or to one of the existing blocks, in the same column.
+    """
+    current = [[]]
+    for n in range(dim):
+        if n > 0:
+            new = list()
+            for blocks in current:
+                new.append(blocks + [[n]])
+                for k in range(len(blocks)):
+                    b = list(blocks)
+                    b[k] = blocks[k] + [n]
+                    new.append(b)
+            current = new
+        yield current
+
+def _stirling1_row(perms,dim):
     r = list()
     for i in range(dim):
         r.append(set())
-    P = Permutations(row)
-    for p in P:
-        t = CombinatorialObject(p,(-1)**(row-len(p.to_cycles())))
-        r[len(p.to_cycles())].add(t)
+    for p, c, s in perms:
+        r[c].add(CombinatorialObject(Permutation(p),s))
     for j in range(dim):
         r[j] = CombinatorialScalarWrapper(r[j])
     return r
 
-def _stirling2_row(row,dim):
+def _stirling2_row(partitions,dim):
     r = list()
     for j in range(dim):
         r.append(set())
-    for p in SetPartitions(row):
-        t = CombinatorialObject(p,1)
-        r[len(p)].add(t)
+    for blocks in partitions:
+        r[len(blocks)].add(CombinatorialObject(Set([Set(b) for b in blocks]),1))
     for j in range(dim):
         r[j] = CombinatorialScalarWrapper(r[j])
     return r
 
 
-def Stirling1Matrix(dim):
-    r"""
-    Returns Stirling1 Matrix whose entries are Combinatorial Scalars of signed permutations.
-    """
+def _stirling1_matrix(dim):
     mat_space = MatrixSpace(CombinatorialScalarRing(),dim)
     l = list()
-    for row in range(dim):
-        l.append(_stirling1_row(row,dim))
+    for perms in permutation_rows(dim):
+        l.append(_stirling1_row(perms,dim))
     return mat_space(l)
 
-def Stirling2Matrix(dim):
-    r"""
-    Returns Stirling2 Matrix whose entries are Combinatorial Scalars of set partitions.
-    """ 
+def _stirling2_matrix(dim):
     mat_space = MatrixSpace(CombinatorialScalarRing(),dim)
     l = list()
-    for row in range(dim):
-        l.append(_stirling2_row(row,dim))
+    for partitions in set_partition_rows(dim):
+        l.append(_stirling2_row(partitions,dim))
     return mat_space(l)
+
+def Stirling1Matrix(dim,cache=None):
+    r"""
+    Returns Stirling1 Matrix whose entries are Combinatorial Scalars of signed permutations.
+
+    The matrix is loaded from cache, a DiskCache, when it is stored there;
+    by default the cache of ``get_matrix_cache`` is used, which is none
+    unless one was set, and cache=False disables it.
+    """
+    return _cached(('Stirling1Matrix',dim),_stirling1_matrix,(dim,),cache)
+
+def Stirling2Matrix(dim,cache=None):
+    r"""
+    Returns Stirling2 Matrix whose entries are Combinatorial Scalars of set partitions.
+
+    See ``Stirling1Matrix`` for cache.
+    """
+    return _cached(('Stirling2Matrix',dim),_stirling2_matrix,(dim,),cache)
+
+def _stirling12_matrix(dim,cache):
+    return matrix_multiply(Stirling1Matrix(dim,cache),Stirling2Matrix(dim,cache))
+
+def _stirling21_matrix(dim,cache):
+    return matrix_multiply(Stirling2Matrix(dim,cache),Stirling1Matrix(dim,cache))
+
+def Stirling12Matrix(dim,cache=None):
+    r"""
+    Returns the product of Stirling1Matrix(dim) and Stirling2Matrix(dim).
+
+    See ``Stirling1Matrix`` for cache.
+    """
+    return _cached(('Stirling12Matrix',dim),_stirling12_matrix,(dim,cache),cache)
+
+def Stirling21Matrix(dim,cache=None):
+    r"""
+    Returns the product of Stirling2Matrix(dim) and Stirling1Matrix(dim).
+
+    See ``Stirling1Matrix`` for cache.
+    """
+    return _cached(('Stirling21Matrix',dim),_stirling21_matrix,(dim,cache),cache)
 
 def find_row(elm):
     obj = elm.get_object()